@@ -0,0 +1,38 @@
+"""
+gunicorn.conf.py — Gunicorn settings for the prediction API.
+"""
+
+import gc
+import os
+import shutil
+import sys
+import tempfile
+
+# Import the app (and load the models) once in the master process. Workers
+# are forked afterwards and share the model memory copy-on-write. With
+# FAST_STARTUP=1 each worker imports the app itself and loads the models in
+# a background thread (a thread started in the master would not survive the
+# fork), so workers accept connections before the models are ready.
+preload_app = os.environ.get("FAST_STARTUP", "0") != "1"
+
+# Prometheus multiprocess mode: every worker writes its samples to files in
+# this directory and /metrics merges them, so counters and histograms cover
+# all workers. It must be set before prometheus_client is imported, and is
+# emptied on a fresh start (not when a HUP re-reads this file).
+METRICS_DIR = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "churn_api_metrics"))
+if "prometheus_client" not in sys.modules:
+    shutil.rmtree(METRICS_DIR, ignore_errors=True)
+os.makedirs(METRICS_DIR, exist_ok=True)
+
+
+def pre_fork(server, worker):
+    """Keep the garbage collector from touching (and so copying) preloaded objects."""
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    """Drop a dead worker's live gauges from the merged metrics."""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
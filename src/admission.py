@@ -0,0 +1,40 @@
+"""
+admission.py — Bounded in-flight counters for admission control.
+
+An ``InFlightLimiter`` allows at most ``limit`` concurrent holders per key
+(a model version). ``try_acquire`` never waits: a request that finds its
+version at the limit is turned away straight away, with a status the client
+can retry, instead of queueing behind work it cannot overtake.
+"""
+
+import threading
+
+
+class InFlightLimiter:
+    """Per-key concurrency limit without blocking (limit 0 means unlimited)."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def try_acquire(self, key):
+        """Take a slot for ``key``; returns False if all slots are in use."""
+        with self._lock:
+            count = self._counts.get(key, 0)
+            if self.limit and count >= self.limit:
+                return False
+            self._counts[key] = count + 1
+            return True
+
+    def release(self, key):
+        with self._lock:
+            count = self._counts.get(key, 0) - 1
+            if count > 0:
+                self._counts[key] = count
+            else:
+                self._counts.pop(key, None)
+
+    def in_flight(self, key):
+        with self._lock:
+            return self._counts.get(key, 0)
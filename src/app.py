@@ -1,174 +1,79 @@
 """
 app.py — Flask REST API for the churn prediction service.
+Validation, scoring and metrics live in service.py, shared with asgi.py.
 """
 
 import os
-import logging
-import pickle
-import pandas as pd
-from flask import Flask, jsonify, request
-from flasgger import Swagger
+from flask import Flask, Response, request, send_file, stream_with_context
 from prometheus_flask_exporter import PrometheusMetrics
-from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
-from prometheus_client import Counter, Histogram, Gauge
+from prometheus_client import CONTENT_TYPE_LATEST
 
-# ---- Logging configuration ----
+import multimodel
+import service
+from serialization import dumps
+from service import logger, registry
 
-log_dir = os.environ.get("LOG_DIR", "logs")
-os.makedirs(log_dir, exist_ok=True)
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(os.path.join(log_dir, "api.log")),
-    ],
-)
-
-logger = logging.getLogger("churn_api")
+# OpenAPI spec written by `python src/startup.py --export-spec`. With
+# FAST_STARTUP=1 flasgger is not imported at all and this file, if present,
+# is served at /apispec_1.json instead.
+SWAGGER_SPEC_FILE = os.environ.get("SWAGGER_SPEC_FILE", "apispec.json")
 
 
 app = Flask(__name__)
-swagger = Swagger(app)
 
-# ---- Prometheus metrics ----
+if service.FAST_STARTUP:
+    swagger = None
+    if os.path.exists(SWAGGER_SPEC_FILE):
+        spec_path = os.path.abspath(SWAGGER_SPEC_FILE)
+        app.add_url_rule("/apispec_1.json", "apispec_1",
+                         lambda: send_file(spec_path, mimetype="application/json"))
+else:
+    from flasgger import Swagger
+
+    swagger = Swagger(app)
 
 # Auto-instrument all routes (request count, latency histograms)
 metrics = PrometheusMetrics(app, path=None)
 
-# Custom application-level metrics
-PREDICTION_REQUESTS = Counter(
-    "prediction_requests_total",
-    "Total prediction requests by model version and outcome",
-    ["model_version", "status"],
-)
-
-PREDICTION_LATENCY = Histogram(
-    "prediction_duration_seconds",
-    "Time spent processing a prediction request",
-    ["model_version"],
-    buckets=[0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5],
-)
-
-ACTIVE_MODELS = Gauge(
-    "active_models_loaded",
-    "Number of models currently loaded in memory",
-)
-
-
-# ---- Load models at startup ----
-
-def load_model(path):
-    """Load a pickled pipeline from disk."""
-    with open(path, "rb") as f:
-        return pickle.load(f)
-
-
-MODEL_DIR = os.path.join(os.path.dirname(__file__), "..", "models")
-
-model_v1 = load_model(os.path.join(MODEL_DIR, "model_v1.pkl"))
-model_v2 = load_model(os.path.join(MODEL_DIR, "model_v2.pkl"))
-
-ACTIVE_MODELS.set(2)
-
-logger.info("Loaded model_v1 and model_v2 from %s", MODEL_DIR)
-
-
-# ---- Feature definitions ----
-
-NUMERICAL_FEATURES = ["tenure", "MonthlyCharges", "TotalCharges"]
-
-CATEGORICAL_FEATURES = [
-    "gender", "SeniorCitizen", "Partner", "Dependents",
-    "PhoneService", "MultipleLines", "InternetService",
-    "OnlineSecurity", "OnlineBackup", "DeviceProtection",
-    "TechSupport", "StreamingTV", "StreamingMovies",
-    "Contract", "PaperlessBilling", "PaymentMethod",
-]
-
-REQUIRED_FEATURES = NUMERICAL_FEATURES + CATEGORICAL_FEATURES
 
+def json_response(body, status=200):
+    """Serialise a response body with the configured fast JSON encoder."""
+    return Response(dumps(body), status=status, mimetype="application/json",
+                    headers=service.response_headers(status))
 
-# ---- Validation ----
 
-def validate_input(record):
+def limit_body_size(model_label):
     """
-    Check that a single record has all required features with correct types.
-    Returns (error_message, status_code) or (None, 200) if valid.
+    Cap this request's body at MAX_REQUEST_BYTES (Werkzeug enforces it while
+    reading bodies without a Content-Length). Returns a 413 response if the
+    declared length is already over the limit, else None.
     """
-    missing = [f for f in REQUIRED_FEATURES if f not in record]
-    if missing:
-        return f"Missing required features: {', '.join(missing)}", 400
+    request.max_content_length = service.MAX_REQUEST_BYTES or None
+    error = service.request_too_large(model_label, request.content_length)
+    return json_response(*error) if error else None
 
-    for feat in NUMERICAL_FEATURES:
-        if not isinstance(record[feat], (int, float)):
-            return (f"Invalid type for {feat}: expected a number, "
-                    f"got {type(record[feat]).__name__}"), 400
 
-    for feat in CATEGORICAL_FEATURES:
-        if not isinstance(record[feat], str):
-            return (f"Invalid type for {feat}: expected a string, "
-                    f"got {type(record[feat]).__name__}"), 400
+@app.errorhandler(413)
+def request_entity_too_large(error):
+    """JSON 413 for bodies Werkzeug cut off at MAX_REQUEST_BYTES while reading."""
+    model_label = (request.view_args or {}).get("version", "multi")
+    return json_response(*service.reject(
+        model_label, "bytes", 413,
+        f"Request body exceeds the limit of {service.MAX_REQUEST_BYTES} bytes"))
 
-    return None, 200
 
+# ---- Endpoints ----
 
-# ---- Prediction helper ----
+@app.before_request
+def start_model_watcher():
+    """Start the MODEL_DIR watcher in each serving process (not in a preloading master)."""
+    registry.start_watching(service.MODEL_WATCH_INTERVAL)
 
-def run_prediction(model, model_label, json_data):
-    """
-    Validate, predict, and format results.
-    Handles both single records and batches.
-    """
-    import time
-    start_time = time.time()
-
-    is_batch = isinstance(json_data, list)
-    records = json_data if is_batch else [json_data]
-
-    # Validate every record before touching the model
-    for record in records:
-        error, status = validate_input(record)
-        if error:
-            PREDICTION_REQUESTS.labels(model_version=model_label, status="validation_error").inc()
-            logger.warning("Validation failed for %s: %s", model_label, error)
-            return jsonify({"error": error}), status
-
-    try:
-        input_df = pd.DataFrame(records)[REQUIRED_FEATURES]
-        yhat = model.predict(input_df)
-        proba = model.predict_proba(input_df)
-    except Exception as e:
-        PREDICTION_REQUESTS.labels(model_version=model_label, status="error").inc()
-        logger.error("Prediction failed for %s: %s", model_label, str(e))
-        return jsonify({"error": f"Prediction failed: {str(e)}"}), 500
-
-    duration = time.time() - start_time
-    PREDICTION_REQUESTS.labels(model_version=model_label, status="success").inc()
-    PREDICTION_LATENCY.labels(model_version=model_label).observe(duration)
-
-    results = []
-    for i in range(len(yhat)):
-        results.append({
-            "prediction": "Yes" if yhat[i] == 1 else "No",
-            "probability": float(proba[i][yhat[i]]),
-            "model_version": model_label,
-        })
-
-    logger.info("Prediction successful: %s, %d record(s), result=%s",
-                model_label, len(records),
-                [r["prediction"] for r in results])
-
-    return jsonify(results if is_batch else results[0])
-
-
-# ---- Endpoints ----
 
 @app.route("/metrics", methods=["GET"])
 def prometheus_metrics():
     """Expose Prometheus metrics."""
-    return generate_latest(), 200, {"Content-Type": CONTENT_TYPE_LATEST}
+    return service.metrics_payload(), 200, {"Content-Type": CONTENT_TYPE_LATEST}
 
 @app.route("/health", methods=["GET"])
 def health():
@@ -179,7 +84,24 @@ def health():
       200:
         description: API is alive and running.
     """
-    return jsonify({"status": "ok"})
+    return json_response({"status": "ok"})
+
+
+@app.route("/ready", methods=["GET"])
+def ready():
+    """
+    Readiness Check
+    Returns 503 until the models have been loaded (FAST_STARTUP=1 loads
+    them in the background), then 200 with the loaded versions. Stays 503,
+    listing the errors, while any model file in MODEL_DIR fails to load.
+    ---
+    responses:
+      200:
+        description: Models are loaded and predictions can be served.
+      503:
+        description: Models are still loading, or a model file failed to load.
+    """
+    return json_response(*service.readiness())
 
 
 @app.route("/info", methods=["GET"])
@@ -193,60 +115,35 @@ def info():
       200:
         description: API information and usage guide.
     """
-    return jsonify({
-        "message": "Telco Customer Churn Prediction API",
-        "endpoints": {
-            "health": "GET /health",
-            "info": "GET /info",
-            "predict_v1": "POST /v1/predict",
-            "predict_v2": "POST /v2/predict",
-            "docs": "GET /apidocs/",
-            "metrics": "GET /metrics",
-        },
-        "required_input_format": {
-            "numerical_features": NUMERICAL_FEATURES,
-            "categorical_features": CATEGORICAL_FEATURES,
-            "example": {
-                "tenure": 12,
-                "MonthlyCharges": 59.95,
-                "TotalCharges": 720.50,
-                "Contract": "One year",
-                "PaymentMethod": "Electronic check",
-                "OnlineSecurity": "No",
-                "TechSupport": "No",
-                "InternetService": "DSL",
-                "gender": "Female",
-                "SeniorCitizen": "No",
-                "Partner": "Yes",
-                "Dependents": "No",
-                "PhoneService": "Yes",
-                "MultipleLines": "No",
-                "PaperlessBilling": "Yes",
-                "OnlineBackup": "Yes",
-                "DeviceProtection": "No",
-                "StreamingTV": "No",
-                "StreamingMovies": "No",
-            },
-        },
-    })
-
-
-@app.route("/v1/predict", methods=["POST"])
-def predict_v1():
+    return json_response(service.api_info())
+
+
+@app.route("/<version>/predict", methods=["POST"])
+def predict(version):
     """
-    Predict churn using model v1
+    Predict churn using a loaded model version
     ---
     tags:
       - Predictions
     consumes:
       - application/json
+      - application/x-npz
+      - application/vnd.apache.arrow.stream
     parameters:
+      - in: path
+        name: version
+        type: string
+        required: true
+        description: Model version, e.g. v1 or v2 (see GET /models).
       - in: body
         name: body
         required: true
         description: >
           Customer data. Send a single JSON object or a list of objects
-          for batch prediction.
+          for batch prediction. Batches can also be sent column-oriented:
+          a JSON object with one array per feature, a NumPy .npz archive
+          (application/x-npz) or an Arrow IPC stream
+          (application/vnd.apache.arrow.stream).
         schema:
           type: object
           properties:
@@ -307,110 +204,207 @@ def predict_v1():
             PaymentMethod:
               type: string
               example: "Electronic check"
+      - in: query
+        name: partial
+        type: boolean
+        required: false
+        description: >
+          Score the valid rows of a batch and return the invalid ones as
+          indexed errors instead of rejecting the whole batch.
+      - in: query
+        name: shape
+        type: string
+        enum: [records, compact]
+        required: false
+        description: >
+          Batch response layout. "compact" returns parallel "prediction" and
+          "probability" arrays instead of one object per row.
     responses:
       200:
         description: Prediction successful.
       400:
         description: Invalid input data.
+      404:
+        description: Unknown model version.
+      413:
+        description: Body or batch larger than MAX_REQUEST_BYTES / MAX_BATCH_ROWS.
+      429:
+        description: Too many requests in flight for this version; retry after Retry-After.
       500:
         description: Internal server error.
     """
-    json_data = request.get_json()
-    if not json_data:
-        logger.warning("v1/predict called with no input data")
-        return jsonify({"error": "No input data provided"}), 400
-    return run_prediction(model_v1, "v1", json_data)
-
-
-@app.route("/v2/predict", methods=["POST"])
-def predict_v2():
+    error = limit_body_size(version)
+    if error:
+        return error
+    body, status = service.predict_version(
+        version, request.mimetype, request.get_data(),
+        partial=service.parse_flag(request.args.get("partial")),
+        shape=request.args.get("shape"),
+    )
+    return Response(service.encode_prediction(body, status, version), status=status,
+                    mimetype="application/json",
+                    headers=service.response_headers(status))
+
+
+@app.route("/predict", methods=["POST"])
+def predict_models():
     """
-    Predict churn using model v2
+    Multi-model prediction
+    Scores one body with several model versions, parsing, validating and
+    building the input frame once. Accepts the same bodies as
+    /{version}/predict.
     ---
-    tags:
-      - Predictions
-    consumes:
-      - application/json
     parameters:
+      - in: query
+        name: models
+        type: string
+        required: true
+        description: Comma-separated model versions to score, e.g. v1,v2.
+      - in: query
+        name: shadow
+        type: string
+        required: false
+        description: >
+          Comma-separated versions scored in the background after the
+          response is built; only their agreement with the first model in
+          "models" is recorded, as the shadow_predictions_total metric.
+      - in: query
+        name: partial
+        type: boolean
+        required: false
+      - in: query
+        name: shape
+        type: string
+        enum: [records, compact]
+        required: false
       - in: body
         name: body
         required: true
-        description: >
-          Customer data. Send a single JSON object or a list of objects
-          for batch prediction.
+        description: Customer record, list of records or column-oriented batch.
         schema:
           type: object
-          properties:
-            tenure:
-              type: integer
-              example: 12
-            MonthlyCharges:
-              type: number
-              example: 59.95
-            TotalCharges:
-              type: number
-              example: 720.50
-            Contract:
-              type: string
-              example: "One year"
-            gender:
-              type: string
-              example: "Female"
-            SeniorCitizen:
-              type: string
-              example: "No"
-            Partner:
-              type: string
-              example: "Yes"
-            Dependents:
-              type: string
-              example: "No"
-            PhoneService:
-              type: string
-              example: "Yes"
-            MultipleLines:
-              type: string
-              example: "No"
-            InternetService:
-              type: string
-              example: "DSL"
-            OnlineSecurity:
-              type: string
-              example: "No"
-            OnlineBackup:
-              type: string
-              example: "Yes"
-            DeviceProtection:
-              type: string
-              example: "No"
-            TechSupport:
-              type: string
-              example: "No"
-            StreamingTV:
-              type: string
-              example: "No"
-            StreamingMovies:
-              type: string
-              example: "No"
-            PaperlessBilling:
-              type: string
-              example: "Yes"
-            PaymentMethod:
-              type: string
-              example: "Electronic check"
     responses:
       200:
-        description: Prediction successful.
+        description: >
+          {"models": [...], "predictions": {version: results}}; "errors"
+          is added with partial=true and "shadow" when shadow versions run.
       400:
-        description: Invalid input data.
-      500:
-        description: Internal server error.
+        description: Invalid input data or missing models parameter.
+      404:
+        description: Unknown model version.
+      413:
+        description: Body or batch larger than MAX_REQUEST_BYTES / MAX_BATCH_ROWS.
+      429:
+        description: Too many requests in flight for a version; retry after Retry-After.
+    """
+    error = limit_body_size("multi")
+    if error:
+        return error
+    body, status = multimodel.predict_models(
+        request.args.get("models"), request.mimetype, request.get_data(),
+        shadow=request.args.get("shadow"),
+        partial=service.parse_flag(request.args.get("partial")),
+        shape=request.args.get("shape"),
+    )
+    return Response(service.encode_prediction(body, status, "multi"), status=status,
+                    mimetype="application/json",
+                    headers=service.response_headers(status))
+
+
+@app.route("/<version>/predict/stream", methods=["POST"])
+def predict_stream(version):
+    """
+    Streaming prediction
+    Scores a newline-delimited JSON upload (one record per line) in
+    fixed-size chunks and streams one NDJSON result line per record back as
+    each chunk completes, so memory stays bounded for any upload size.
+    ---
+    consumes:
+      - application/x-ndjson
+    produces:
+      - application/x-ndjson
+    parameters:
+      - in: path
+        name: version
+        type: string
+        required: true
+        description: Model version, e.g. v1.
+      - in: body
+        name: body
+        required: true
+        description: One customer record per line.
+        schema:
+          type: string
+    responses:
+      200:
+        description: >
+          One line per record with its index and either the prediction or
+          an error.
+      404:
+        description: Unknown model version.
+      415:
+        description: Body is not application/x-ndjson.
+      429:
+        description: Too many streams in flight for this version; retry after Retry-After.
+    """
+    stream, error = service.open_stream(version, request.mimetype)
+    if error:
+        body, status = error
+        return json_response(body, status)
+    response = Response(
+        stream_with_context(service.stream_predictions(stream, request.stream)),
+        mimetype=service.NDJSON_MIMETYPE,
+    )
+    # Frees the stream's slots even if the body is never iterated
+    response.call_on_close(stream.release)
+    return response
+
+
+@app.route("/models", methods=["GET"])
+def list_models():
+    """
+    Loaded models
+    Lists the model versions currently served and when each was loaded.
+    ---
+    responses:
+      200:
+        description: Loaded model versions.
+    """
+    return json_response(service.list_models())
+
+
+@app.route("/admin/reload", methods=["POST"])
+@app.route("/admin/models/<version>/reload", methods=["POST"])
+def admin_reload(version=None):
+    """
+    Reload models
+    Rescans MODEL_DIR and swaps in new or changed model files (or one
+    version, if given) without dropping in-flight requests. Requires the
+    X-Admin-Token header to match ADMIN_TOKEN.
+    ---
+    tags:
+      - Admin
+    parameters:
+      - in: header
+        name: X-Admin-Token
+        type: string
+        required: true
+      - in: query
+        name: force
+        type: boolean
+        required: false
+        description: Reload even if the file has not changed.
+    responses:
+      200:
+        description: Reload summary (loaded, unloaded and failed versions).
+      403:
+        description: Missing or wrong admin token.
     """
-    json_data = request.get_json()
-    if not json_data:
-        logger.warning("v2/predict called with no input data")
-        return jsonify({"error": "No input data provided"}), 400
-    return run_prediction(model_v2, "v2", json_data)
+    body, status = service.admin_reload(
+        request.headers.get("X-Admin-Token"), version,
+        force=service.parse_flag(request.args.get("force")),
+    )
+    return json_response(body, status)
 
 
 if __name__ == "__main__":
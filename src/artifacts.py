@@ -0,0 +1,296 @@
+"""
+artifacts.py — Memory-mappable model artifacts.
+
+A plain pickle stores every NumPy array inline, so each gunicorn worker that
+unpickles a model decodes and owns a private copy of every array. The
+``.mmap`` format pickles the model with its large numeric arrays pulled out
+into an aligned data section of the same file. Loading maps that section
+read-only and rebuilds the arrays as views into it; only arrays that stay
+views come from the page cache and are shared by every process that loads
+the same file.
+
+File layout::
+
+    8 bytes   magic b"CHURNMM1"
+    8 bytes   little-endian length of the pickle stream
+    ...       pickle stream (arrays replaced by references)
+    ...       array data, each array aligned to 64 bytes
+
+For the pipelines tune.py deploys that is almost nothing: sklearn's Cython
+``Tree`` copies its node and value arrays into its own buffers when
+unpickled, and the scaler and encoder arrays are below
+``MIN_EXTERNAL_BYTES`` and stay inline, so a plain artifact costs each
+process about as much private memory as the pickle. ``convert`` warns when
+less than ``MIN_SHARED_FRACTION`` of a file stays memory-mapped once loaded.
+
+``--compact`` replaces a gradient-boosting or random-forest classifier with
+its flattened ``treeinfer.FlatEnsemble`` (float32 thresholds, narrow integer
+indices, leaf values only). Its arrays are plain NumPy arrays, so unlike
+sklearn trees they stay memory-mapped and shared. Whatever is still copied
+on load is only shared if gunicorn runs with ``--preload`` (see
+``gunicorn.conf.py``), so it is built once in the master and inherited
+copy-on-write by the workers.
+``--report`` compares file size and the memory a process needs to load and
+score the pickle and the artifact.
+
+Usage:
+    python src/artifacts.py models/model_v1.pkl models/model_v2.pkl
+    python src/artifacts.py --compact --report models/model_v1.pkl models/model_v2.pkl
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import pickle
+import struct
+import subprocess
+import sys
+import weakref
+
+import numpy as np
+from numpy.lib.format import descr_to_dtype, dtype_to_descr
+
+MAGIC = b"CHURNMM1"
+ALIGNMENT = 64
+HEADER = struct.Struct("<8sQ")
+
+# Arrays smaller than this stay inline in the pickle stream
+MIN_EXTERNAL_BYTES = 1024
+
+# convert() warns when less than this fraction of an artifact stays memory-mapped
+MIN_SHARED_FRACTION = 0.5
+
+logger = logging.getLogger(__name__)
+
+
+class _ArrayPickler(pickle.Pickler):
+    """Pickler that replaces large numeric arrays with references."""
+
+    def __init__(self, file, arrays):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.arrays = arrays
+        self.offset = 0
+
+    def persistent_id(self, obj):
+        if (type(obj) is not np.ndarray or obj.dtype.hasobject
+                or obj.nbytes < MIN_EXTERNAL_BYTES):
+            return None
+
+        order = "F" if obj.flags.f_contiguous and not obj.flags.c_contiguous else "C"
+        self.offset = -(-self.offset // ALIGNMENT) * ALIGNMENT
+        ref = ("ndarray", self.offset, dtype_to_descr(obj.dtype), obj.shape, order)
+        self.arrays.append((self.offset, obj, order))
+        self.offset += obj.nbytes
+        return ref
+
+
+class _ArrayUnpickler(pickle.Unpickler):
+    """Unpickler that rebuilds array references as read-only views of a memmap."""
+
+    def __init__(self, file, data):
+        super().__init__(file)
+        self.data = data
+        # Weak references to every view handed out, for mapped_fraction
+        self.views = []
+
+    def persistent_load(self, pid):
+        kind, offset, descr, shape, order = pid
+        if kind != "ndarray":
+            raise pickle.UnpicklingError(f"Unknown persistent id {kind!r}")
+        view = np.ndarray(shape, dtype=descr_to_dtype(descr), buffer=self.data,
+                          offset=offset, order=order)
+        self.views.append(weakref.ref(view))
+        return view
+
+
+def save_artifact(obj, path):
+    """Write ``obj`` to ``path`` in the memory-mappable format."""
+    stream = io.BytesIO()
+    arrays = []
+    _ArrayPickler(stream, arrays).dump(obj)
+    payload = stream.getvalue()
+
+    data_start = -(-(HEADER.size + len(payload)) // ALIGNMENT) * ALIGNMENT
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(payload)))
+        f.write(payload)
+        for offset, array, order in arrays:
+            f.seek(data_start + offset)
+            f.write(array.tobytes(order=order))
+    # Replace atomically so processes that mapped the old file keep it intact
+    os.replace(tmp_path, path)
+
+
+def load_artifact(path):
+    """Load an object written by ``save_artifact``, mapping its arrays read-only."""
+    return _unpickler(path).load()
+
+
+def mapped_fraction(path):
+    """
+    Fraction of an artifact's bytes that are still memory-mapped once it is
+    loaded. Arrays the model copies while unpickling (sklearn trees) do not count.
+    """
+    unpickler = _unpickler(path)
+    model = unpickler.load()
+    views = unpickler.views
+    # The unpickler's memo keeps every view alive until it is gone
+    del unpickler
+    mapped = sum(view().nbytes for view in views if view() is not None)
+    del model
+    return mapped / os.path.getsize(path)
+
+
+def _unpickler(path):
+    with open(path, "rb") as f:
+        magic, length = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a memory-mapped model artifact")
+        payload = f.read(length)
+
+    data_start = -(-(HEADER.size + length) // ALIGNMENT) * ALIGNMENT
+    if os.path.getsize(path) > data_start:
+        data = np.memmap(path, dtype=np.uint8, mode="r", offset=data_start)
+    else:
+        data = None
+    return _ArrayUnpickler(io.BytesIO(payload), data)
+
+
+def is_artifact(path):
+    """True if ``path`` starts with the artifact magic bytes."""
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def convert(pkl_path, out_path=None, compact=False):
+    """
+    Convert a pickled pipeline (as written by tune.py) to a ``.mmap`` artifact.
+    With compact=True a supported tree ensemble is stored as a
+    ``treeinfer.FlatEnsemble``; other models are converted unchanged.
+    """
+    out_path = out_path or os.path.splitext(pkl_path)[0] + ".mmap"
+    with open(pkl_path, "rb") as f:
+        obj = pickle.load(f)
+    if compact:
+        from treeinfer import compact_pipeline
+
+        obj = compact_pipeline(obj) or obj
+    save_artifact(obj, out_path)
+    shared = mapped_fraction(out_path)
+    if shared < MIN_SHARED_FRACTION:
+        logger.warning("Only %.0f%% of %s stays memory-mapped; the rest is copied into every "
+                       "process that loads it%s", shared * 100, out_path,
+                       "" if compact else " (try --compact)")
+    return out_path
+
+
+# Run in a fresh interpreter per model file: load it, score a batch so its
+# arrays are paged in, and report how much memory that cost.
+MEMORY_PROBE = """
+import json, pickle, sys
+import numpy as np, pandas, psutil, sklearn.ensemble, sklearn.pipeline
+from artifacts import is_artifact, load_artifact, sample_frame
+
+process = psutil.Process()
+before = process.memory_full_info()
+path = sys.argv[1]
+if is_artifact(path):
+    model = load_artifact(path)
+else:
+    with open(path, "rb") as f:
+        model = pickle.load(f)
+model.predict_proba(sample_frame(model, 1000))
+after = process.memory_full_info()
+print(json.dumps({"rss": after.rss - before.rss,
+                  "private": (after.rss - after.shared) - (before.rss - before.shared)}))
+"""
+
+
+def sample_frame(pipeline, n, seed=0):
+    """``n`` random rows in the input schema of a fitted deployment pipeline."""
+    import pandas as pd
+
+    rng = np.random.RandomState(seed)
+    columns = {}
+    for _, transformer, cols in pipeline.steps[0][1].transformers_:
+        if hasattr(transformer, "categories_"):
+            for col, categories in zip(cols, transformer.categories_):
+                columns[col] = rng.choice(categories, n)
+        elif hasattr(transformer, "mean_"):
+            for col, mean, scale in zip(cols, transformer.mean_, transformer.scale_):
+                columns[col] = rng.normal(mean, scale, n)
+    return pd.DataFrame(columns)
+
+
+def memory_cost(path):
+    """{"rss": bytes, "private": bytes} added by loading and scoring a model file."""
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.run([sys.executable, "-c", MEMORY_PROBE, os.path.abspath(path)],
+                          cwd=src_dir, capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def size_report(pkl_path, artifact_path):
+    """File sizes and per-process memory of a pickled model and its artifact."""
+    pickle_memory, artifact_memory = memory_cost(pkl_path), memory_cost(artifact_path)
+    return {
+        "model": os.path.basename(pkl_path),
+        "pickle_bytes": os.path.getsize(pkl_path),
+        "artifact_bytes": os.path.getsize(artifact_path),
+        "pickle_rss_bytes": pickle_memory["rss"],
+        "pickle_private_bytes": pickle_memory["private"],
+        "artifact_rss_bytes": artifact_memory["rss"],
+        "artifact_private_bytes": artifact_memory["private"],
+    }
+
+
+def print_report(rows):
+    mb = 1024 * 1024
+    print(f"{'model':<18} {'pickle MB':>10} {'artifact MB':>12} {'RSS MB':>15} {'private MB':>15}")
+    for r in rows:
+        rss = f"{r['pickle_rss_bytes'] / mb:.1f} → {r['artifact_rss_bytes'] / mb:.1f}"
+        private = f"{r['pickle_private_bytes'] / mb:.1f} → {r['artifact_private_bytes'] / mb:.1f}"
+        print(f"{r['model']:<18} {r['pickle_bytes'] / mb:>10.2f} {r['artifact_bytes'] / mb:>12.2f} "
+              f"{rss:>15} {private:>15}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Convert pickled pipelines to memory-mapped artifacts.")
+    parser.add_argument("models", nargs="+", help="Pickled pipelines to convert")
+    parser.add_argument("--compact", action="store_true",
+                        help="Store tree ensembles in the compact flattened form")
+    parser.add_argument("--report", action="store_true",
+                        help="Compare file size and per-process memory of pickle and artifact")
+    parser.add_argument("--output", default=None, help="Write the report as JSON")
+    return parser.parse_args()
+
+
+def main():
+    from treeinfer import is_compact
+
+    args = parse_args()
+    rows = []
+    for pkl_path in args.models:
+        out_path = convert(pkl_path, compact=args.compact)
+        compacted = args.compact and is_compact(load_artifact(out_path))
+        form = " (compact)" if compacted else ""
+        print(f"{pkl_path} ({os.path.getsize(pkl_path)} bytes) → "
+              f"{out_path}{form} ({os.path.getsize(out_path)} bytes)")
+        if args.report:
+            rows.append({**size_report(pkl_path, out_path), "compact": compacted})
+
+    if args.report:
+        print_report(rows)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+asgi.py — Asyncio (ASGI) entry point for the churn prediction service.
+
+Serves the same /health, /ready, /info, /metrics, /models, /admin, /predict,
+/<version>/predict and /<version>/predict/stream endpoints as app.py, using
+the same service.py code, so response bodies are byte-for-byte identical. Request bodies are read
+asynchronously, so a slow client uploading a large batch holds no thread;
+only CPU-bound scoring is dispatched to a bounded thread pool.
+
+Run with:
+    uvicorn asgi:app --app-dir src --host 0.0.0.0 --port 5000
+"""
+
+import asyncio
+import contextlib
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from prometheus_client import CONTENT_TYPE_LATEST
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+
+import multimodel
+import service
+from serialization import dumps
+from service import logger, registry
+
+# Scoring threads per process; requests beyond this wait on the event loop
+# without holding a thread.
+SCORING_THREADS = int(os.environ.get("ASGI_SCORING_THREADS", os.cpu_count() or 4))
+
+
+def json_response(body, status=200):
+    """Serialise a response body exactly as app.py does."""
+    return Response(dumps(body), status_code=status, media_type="application/json",
+                    headers=service.response_headers(status))
+
+
+async def run_scoring(request, fn, *args, **kwargs):
+    """Run a blocking scoring call on the app's bounded executor."""
+    state = request.app.state
+    async with state.scoring_slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(state.executor, functools.partial(fn, *args, **kwargs))
+
+
+class BodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose content is produced while the request body is
+    still being read. Starlette's default also reads ``receive`` to watch for
+    disconnects, which would steal body messages from the generator; here a
+    disconnect surfaces through ``request.stream()`` instead.
+    """
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.stream_response(send)
+        finally:
+            if self.background is not None:
+                await self.background()
+
+
+async def iter_line_chunks(body, size):
+    """Async counterpart of service.iter_line_chunks over raw body chunks."""
+    chunk, pending = [], b""
+    async for data in body:
+        lines = (pending + data).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            line = line.strip()
+            if line:
+                chunk.append(line)
+                if len(chunk) >= size:
+                    yield chunk
+                    chunk = []
+    if pending.strip():
+        chunk.append(pending.strip())
+    if chunk:
+        yield chunk
+
+
+async def read_body(request, model_label):
+    """
+    Read the request body, stopping at MAX_REQUEST_BYTES. Returns
+    (body, None), or (None, (body, status)) if the body is too large or
+    Content-Length is not a non-negative integer.
+    """
+    length = request.headers.get("content-length")
+    if length is not None:
+        try:
+            length = int(length)
+        except ValueError:
+            length = -1
+        if length < 0:
+            return None, ({"error": "Invalid Content-Length header"}, 400)
+    error = service.request_too_large(model_label, length)
+    if error:
+        return None, error
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if service.MAX_REQUEST_BYTES and size > service.MAX_REQUEST_BYTES:
+            return None, service.request_too_large(model_label, size)
+        chunks.append(chunk)
+    return b"".join(chunks), None
+
+
+def request_mimetype(request):
+    return request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+
+# ---- Endpoints ----
+
+async def health(request):
+    return json_response({"status": "ok"})
+
+
+async def ready(request):
+    return json_response(*service.readiness())
+
+
+async def info(request):
+    return json_response(service.api_info())
+
+
+async def metrics(request):
+    return Response(service.metrics_payload(), media_type=CONTENT_TYPE_LATEST)
+
+
+async def list_models(request):
+    return json_response(service.list_models())
+
+
+async def predict(request):
+    raw, error = await read_body(request, request.path_params["version"])
+    if error:
+        return json_response(*error)
+    body, status = await run_scoring(
+        request, service.predict_version,
+        request.path_params["version"], request_mimetype(request), raw,
+        partial=service.parse_flag(request.query_params.get("partial")),
+        shape=request.query_params.get("shape"),
+    )
+    return Response(service.encode_prediction(body, status, request.path_params["version"]),
+                    status_code=status, media_type="application/json",
+                    headers=service.response_headers(status))
+
+
+async def predict_models(request):
+    raw, error = await read_body(request, "multi")
+    if error:
+        return json_response(*error)
+    params = request.query_params
+    body, status = await run_scoring(
+        request, multimodel.predict_models,
+        params.get("models"), request_mimetype(request), raw,
+        shadow=params.get("shadow"),
+        partial=service.parse_flag(params.get("partial")),
+        shape=params.get("shape"),
+    )
+    return Response(service.encode_prediction(body, status, "multi"),
+                    status_code=status, media_type="application/json",
+                    headers=service.response_headers(status))
+
+
+async def predict_stream(request):
+    stream, error = service.open_stream(request.path_params["version"],
+                                        request_mimetype(request))
+    if error:
+        return json_response(*error)
+
+    async def results():
+        try:
+            async for chunk in iter_line_chunks(request.stream(), stream.chunk_rows):
+                yield await run_scoring(request, stream.score_lines, chunk)
+        finally:
+            stream.finish()
+
+    return BodyStreamingResponse(results(), media_type=service.NDJSON_MIMETYPE,
+                                 background=BackgroundTask(stream.release))
+
+
+async def admin_reload(request):
+    loop = asyncio.get_running_loop()
+    body, status = await loop.run_in_executor(None, functools.partial(
+        service.admin_reload,
+        request.headers.get("x-admin-token"), request.path_params.get("version"),
+        force=service.parse_flag(request.query_params.get("force")),
+    ))
+    return json_response(body, status)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    app.state.executor = ThreadPoolExecutor(max_workers=SCORING_THREADS,
+                                            thread_name_prefix="scoring")
+    app.state.scoring_slots = asyncio.Semaphore(SCORING_THREADS)
+    registry.start_watching(service.MODEL_WATCH_INTERVAL)
+    logger.info("ASGI service ready with %d scoring threads", SCORING_THREADS)
+    yield
+    app.state.executor.shutdown(wait=False)
+
+
+app = Starlette(
+    routes=[
+        Route("/health", health, methods=["GET"]),
+        Route("/ready", ready, methods=["GET"]),
+        Route("/info", info, methods=["GET"]),
+        Route("/metrics", metrics, methods=["GET"]),
+        Route("/models", list_models, methods=["GET"]),
+        Route("/admin/reload", admin_reload, methods=["POST"]),
+        Route("/admin/models/{version}/reload", admin_reload, methods=["POST"]),
+        Route("/predict", predict_models, methods=["POST"]),
+        Route("/{version}/predict", predict, methods=["POST"]),
+        Route("/{version}/predict/stream", predict_stream, methods=["POST"]),
+    ],
+    lifespan=lifespan,
+)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    logger.info("Starting prediction API service (ASGI development mode)")
+    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", 5000)))
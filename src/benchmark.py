@@ -0,0 +1,328 @@
+"""
+benchmark.py — Load-test and latency benchmark for the prediction API.
+
+Replays prediction payloads against one or more targets at a fixed
+concurrency and reports p50/p95/p99 latency, requests/s and rows/s for every
+target, model version and batch size:
+
+- ``flask``: the Flask app in this process, through its test client
+  (measures the application without any HTTP server)
+- ``gunicorn``: a local gunicorn server started with gunicorn.conf.py
+- ``asgi``: a local uvicorn server running asgi.py
+
+Payloads are synthetic records by default, or records read from an NDJSON
+file (one JSON object per line) with --payloads. Results can be written as
+JSON and compared with a stored baseline: the run fails if p95 latency or
+rows/s regress by more than --tolerance. Use --upload-delay to simulate slow
+clients that trickle their body in; it only applies to the HTTP targets, so
+it cannot be combined with the in-process flask target.
+
+Usage:
+    python src/benchmark.py --targets flask --batch-sizes 1,100 --output reports/benchmark.json
+    python src/benchmark.py --targets flask --baseline benchmarks/baseline.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+SERVERS = {
+    "gunicorn": ["gunicorn", "--config", "gunicorn.conf.py", "--chdir", "src",
+                 "--bind", "127.0.0.1:{port}", "--workers", "{workers}", "app:app"],
+    "asgi": ["uvicorn", "asgi:app", "--app-dir", "src", "--host", "127.0.0.1",
+             "--port", "{port}", "--workers", "{workers}", "--log-level", "warning"],
+}
+
+EXAMPLE_RECORD = {
+    "tenure": 12, "MonthlyCharges": 59.95, "TotalCharges": 720.50,
+    "Contract": "One year", "PaymentMethod": "Electronic check",
+    "OnlineSecurity": "No", "TechSupport": "No", "InternetService": "DSL",
+    "gender": "Female", "SeniorCitizen": "No", "Partner": "Yes",
+    "Dependents": "No", "PhoneService": "Yes", "MultipleLines": "No",
+    "PaperlessBilling": "Yes", "OnlineBackup": "Yes", "DeviceProtection": "No",
+    "StreamingTV": "No", "StreamingMovies": "No",
+}
+
+# Metrics compared against the baseline, and whether higher is better
+COMPARED_METRICS = {"p95_ms": False, "rows_per_s": True}
+
+
+# ---- Payloads ----
+
+def synthetic_records(n, seed=0):
+    """``n`` variations of EXAMPLE_RECORD with different numeric values."""
+    rng = random.Random(seed)
+    records = []
+    for _ in range(n):
+        record = dict(EXAMPLE_RECORD)
+        record["tenure"] = rng.randint(0, 72)
+        record["MonthlyCharges"] = round(rng.uniform(18, 120), 2)
+        record["TotalCharges"] = round(record["MonthlyCharges"] * max(record["tenure"], 1), 2)
+        records.append(record)
+    return records
+
+
+def load_records(path):
+    """Read one JSON record per line from an NDJSON file."""
+    records = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    if not records:
+        raise ValueError(f"No records in {path}")
+    return records
+
+
+def make_bodies(records, batch_size, n_bodies=32):
+    """Request bodies of ``batch_size`` records each, cycling through ``records``."""
+    bodies = []
+    for i in range(n_bodies):
+        batch = [records[(i * batch_size + j) % len(records)] for j in range(batch_size)]
+        bodies.append(json.dumps(batch[0] if batch_size == 1 else batch).encode())
+    return bodies
+
+
+# ---- Targets ----
+
+class FlaskTarget:
+    """The Flask app in this process, one test client per thread."""
+
+    name = "flask"
+
+    def __init__(self):
+        sys.path.insert(0, os.path.join(ROOT, "src"))
+        from app import app
+
+        self.app = app
+        self.local = threading.local()
+
+    def post(self, path, body, upload_delay=0.0):
+        """POST through the test client; there is no socket, so ``upload_delay`` must be 0."""
+        if upload_delay:
+            raise ValueError("upload_delay needs an HTTP target, not flask")
+        client = getattr(self.local, "client", None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        start = time.perf_counter()
+        response = client.post(path, data=body, content_type="application/json")
+        response.get_data()
+        return time.perf_counter() - start, response.status_code
+
+    def close(self):
+        pass
+
+
+class ServerTarget:
+    """A server process started locally; requests go over HTTP."""
+
+    def __init__(self, name, port, workers):
+        self.name = name
+        self.port = port
+        self.proc = start_server(name, port, workers)
+
+    def post(self, path, body, upload_delay=0.0):
+        return post(self.port, path, body, upload_delay)
+
+    def close(self):
+        self.proc.terminate()
+        self.proc.wait()
+
+
+def start_server(name, port, workers):
+    """Start a server process and wait until /health answers."""
+    cmd = [part.format(port=port, workers=workers) for part in SERVERS[name]]
+    env = dict(os.environ, LOG_DIR=os.path.abspath(os.environ.get("LOG_DIR", "logs")))
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{name} exited with code {proc.returncode}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"{name} did not become healthy on port {port}")
+
+
+def post(port, path, body, upload_delay=0.0, chunks=10):
+    """POST a JSON body; with upload_delay the body is sent in slow chunks."""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    start = time.perf_counter()
+    conn.putrequest("POST", path)
+    conn.putheader("Content-Type", "application/json")
+    conn.putheader("Content-Length", str(len(body)))
+    conn.endheaders()
+    if upload_delay > 0:
+        step = -(-len(body) // chunks)
+        for i in range(0, len(body), step):
+            conn.send(body[i:i + step])
+            time.sleep(upload_delay / chunks)
+    else:
+        conn.send(body)
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    return time.perf_counter() - start, response.status
+
+
+# ---- Load generation and reporting ----
+
+def run_load(target, path, bodies, concurrency, n_requests, upload_delay=0.0):
+    """Send n_requests at the given concurrency; returns (latencies, errors, wall time)."""
+    def send(i):
+        return target.post(path, bodies[i % len(bodies)], upload_delay)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(send, range(n_requests)))
+    wall = time.perf_counter() - start
+    latencies = np.array([latency for latency, _ in results])
+    errors = sum(1 for _, status in results if status != 200)
+    return latencies, errors, wall
+
+
+def summarize(latencies, errors, wall, batch_size):
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p95_ms": float(np.percentile(latencies, 95) * 1000),
+        "p99_ms": float(np.percentile(latencies, 99) * 1000),
+        "requests_per_s": len(latencies) / wall,
+        "rows_per_s": len(latencies) * batch_size / wall,
+    }
+
+
+def result_key(target, version, batch_size):
+    return f"{target}/{version}/batch={batch_size}"
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """
+    Compare results with a baseline report; returns a list of regression
+    messages for every shared key whose p95 latency rose, or whose rows/s
+    fell, by more than ``tolerance`` (a fraction).
+    """
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get("results", {}).get(key)
+        if previous is None:
+            continue
+        if current["errors"]:
+            regressions.append(f"{key}: {current['errors']} failed requests")
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = previous[metric], current[metric]
+            if higher_is_better:
+                regressed = new < old * (1 - tolerance)
+            else:
+                regressed = new > old * (1 + tolerance)
+            if regressed:
+                regressions.append(f"{key}: {metric} {old:.1f} → {new:.1f}")
+    return regressions
+
+
+def print_table(results):
+    print(f"{'target/version/batch':<32} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'req/s':>9} {'rows/s':>10} {'errors':>7}")
+    for key, r in results.items():
+        print(f"{key:<32} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} "
+              f"{r['requests_per_s']:>9.1f} {r['rows_per_s']:>10.0f} {r['errors']:>7}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the prediction API.")
+    parser.add_argument("--targets", default="flask",
+                        help="Comma-separated targets: flask, gunicorn, asgi")
+    parser.add_argument("--models", default="v1,v2", help="Comma-separated model versions")
+    parser.add_argument("--batch-sizes", default="1,100", help="Comma-separated rows per request")
+    parser.add_argument("--payloads", default=None,
+                        help="NDJSON file of records to replay (default: synthetic records)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200,
+                        help="Requests per target, model version and batch size")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=2, help="Server worker processes")
+    parser.add_argument("--upload-delay", type=float, default=0.0,
+                        help="Seconds each HTTP client spends uploading its body "
+                             "(HTTP targets only; not allowed with flask)")
+    parser.add_argument("--port", type=int, default=5100)
+    parser.add_argument("--output", default=None, help="Write results as JSON")
+    parser.add_argument("--baseline", default=None,
+                        help="Fail if results regress against this JSON report")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative regression against the baseline")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    targets = [t for t in args.targets.split(",") if t]
+    # Fail before the load test rather than after it
+    if args.baseline and not os.path.exists(args.baseline):
+        print(f"Baseline {args.baseline} not found; record one with `make bench-baseline`",
+              file=sys.stderr)
+        return 1
+    if args.upload_delay > 0 and "flask" in targets:
+        print("--upload-delay only applies to HTTP targets; the flask target has no socket "
+              "to upload through", file=sys.stderr)
+        return 1
+    records = load_records(args.payloads) if args.payloads else synthetic_records(1000)
+    versions = [v for v in args.models.split(",") if v]
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",") if b]
+
+    report = {"config": vars(args), "results": {}}
+    for i, name in enumerate(targets):
+        target = FlaskTarget() if name == "flask" else ServerTarget(name, args.port + i, args.workers)
+        try:
+            for version in versions:
+                path = f"/{version}/predict"
+                for batch_size in batch_sizes:
+                    bodies = make_bodies(records, batch_size)
+                    if args.warmup:
+                        run_load(target, path, bodies, args.concurrency, args.warmup)
+                    latencies, errors, wall = run_load(target, path, bodies, args.concurrency,
+                                                       args.requests, args.upload_delay)
+                    report["results"][result_key(name, version, batch_size)] = summarize(
+                        latencies, errors, wall, batch_size)
+        finally:
+            target.close()
+
+    print_table(report["results"])
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(report["results"], baseline, args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
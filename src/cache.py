@@ -0,0 +1,65 @@
+"""
+cache.py — Bounded in-process cache for prediction results.
+
+The same customer is often re-scored by several services within minutes.
+``PredictionCache`` keeps recent results keyed by the canonical values of a
+record, bounded by entry count (least recently used entries go first) and by
+a time-to-live. One cache is kept per loaded model, so results never outlive
+the model that produced them.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+def record_key(record, numerical_features, categorical_features):
+    """
+    Canonical, hashable key for a validated record: numerics as floats (so
+    12 and 12.0 collide) followed by categoricals, in feature order.
+    """
+    return (tuple(float(record[f]) for f in numerical_features)
+            + tuple(record[f] for f in categorical_features))
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with a per-entry time-to-live."""
+
+    def __init__(self, max_entries=10000, ttl=300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the cached value, or None if absent or expired."""
+        now = time.monotonic()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """Store a value; returns how many entries were evicted to make room."""
+        expires = time.monotonic() + self.ttl
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
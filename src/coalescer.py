@@ -0,0 +1,167 @@
+"""
+coalescer.py — Micro-batch concurrent single-record predictions.
+
+Under a threaded server every single-record request pays sklearn's per-call
+overhead on its own. A ``MicroBatcher`` sits in front of one model version:
+request threads enqueue their record and block, while one background thread
+collects whatever arrives within a short window (or until a row limit is hit),
+scores it with a single vectorised call and hands each caller its own row.
+
+A caller waits at most ``window + timeout`` seconds and then gets a
+``CoalescerTimeout``, so a stalled or lost batching thread can never hold
+request threads (and their admission slots) forever. A batching thread
+that dies fails every record still waiting for it and is restarted by the
+next request.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from prometheus_client import Histogram
+
+logger = logging.getLogger("churn_api")
+
+_STOP = object()
+
+COALESCER_QUEUE_WAIT = Histogram(
+    "prediction_coalescer_queue_wait_seconds",
+    "Time a record waited in the coalescer before its batch was scored",
+    ["model_version"],
+    buckets=[0.0001, 0.00025, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1],
+)
+
+COALESCER_BATCH_SIZE = Histogram(
+    "prediction_coalescer_batch_size",
+    "Number of records scored together by the coalescer",
+    ["model_version"],
+    buckets=[1, 2, 4, 8, 16, 32, 64, 128, 256],
+)
+
+
+class CoalescerTimeout(Exception):
+    """A coalesced record was not scored within the batcher's timeout."""
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-record predictions for one model version."""
+
+    def __init__(self, model_label, score, window=0.002, max_rows=64, timeout=5.0):
+        """
+        score: callable taking a list of records and returning (yhat, proba).
+        window: seconds to wait for more records after the first one arrives.
+        max_rows: score immediately once this many records are waiting.
+        timeout: seconds a caller waits for its batch beyond the window.
+        """
+        self.model_label = model_label
+        self.score = score
+        self.window = window
+        self.max_rows = max_rows
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._closed = False
+
+    def predict(self, record):
+        """Score one record; returns (yhat, proba) arrays with a single row."""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                # Swapped-out model finishing a late request: score it alone
+                return self.score([record])
+            self._ensure_started()
+            self._queue.put((record, future, time.perf_counter()))
+        try:
+            return future.result(timeout=self.window + self.timeout)
+        except FutureTimeout:
+            raise CoalescerTimeout(
+                f"Record not scored within {self.window + self.timeout:.3g}s by the "
+                f"coalescer for model {self.model_label}") from None
+
+    def close(self):
+        """Stop the worker thread once every record queued so far is scored."""
+        with self._lock:
+            self._closed = True
+            if self._thread is not None and self._pid == os.getpid():
+                self._queue.put(_STOP)
+
+    def _ensure_started(self):
+        # Started lazily (and again after a fork) so gunicorn's preloading
+        # master never owns the worker thread, and restarted if it died.
+        # Called with self._lock held.
+        if self._pid == os.getpid():
+            if self._thread.is_alive():
+                return
+        else:
+            self._queue = queue.Queue()
+            self._pid = os.getpid()
+        self._thread = threading.Thread(
+            target=self._run, name=f"coalescer-{self.model_label}", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        batch = []
+        try:
+            stopping = False
+            while not stopping:
+                first = self._queue.get()
+                if first is _STOP:
+                    return
+                batch = [first]
+                deadline = first[2] + self.window
+
+                while len(batch) < self.max_rows:
+                    remaining = deadline - time.perf_counter()
+                    try:
+                        if remaining > 0:
+                            item = self._queue.get(timeout=remaining)
+                        else:
+                            # Window already over: take only what is waiting
+                            item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+
+                self._score_batch(batch)
+                batch = []
+        except Exception as e:
+            logger.exception("Coalescer for model %s stopped", self.model_label)
+            self._fail_pending(batch, e)
+
+    def _fail_pending(self, batch, exc):
+        """Fail ``batch`` and every record still queued, so no caller waits on a dead thread."""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                batch.append(item)
+        for _, future, _ in batch:
+            if not future.done():
+                future.set_exception(exc)
+
+    def _score_batch(self, batch):
+        started = time.perf_counter()
+        for _, _, enqueued in batch:
+            COALESCER_QUEUE_WAIT.labels(model_version=self.model_label).observe(started - enqueued)
+        COALESCER_BATCH_SIZE.labels(model_version=self.model_label).observe(len(batch))
+
+        try:
+            yhat, proba = self.score([record for record, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        for i, (_, future, _) in enumerate(batch):
+            future.set_result((yhat[i:i + 1], proba[i:i + 1]))
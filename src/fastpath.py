@@ -0,0 +1,166 @@
+"""
+fastpath.py — Compile a fitted deployment pipeline into plain NumPy lookups.
+
+Scoring a handful of customers through the sklearn pipeline means building a
+DataFrame and running the ColumnTransformer, which costs far more than the
+classifier itself. ``compile_pipeline`` reads the fitted StandardScaler and
+OrdinalEncoder once and returns a ``CompiledPipeline`` that writes records
+straight into a float matrix and hands it to the classifier. The matrix is
+built with the same operations sklearn uses, so probabilities are identical.
+"""
+
+import numpy as np
+
+
+class CompiledPipeline:
+    """Pandas-free replacement for a fitted ``preprocessor → classifier`` pipeline."""
+
+    def __init__(self, classifier, num_cols, mean, scale, cat_cols, cat_codes,
+                 unknown_value, ensemble=None):
+        self.classifier = classifier
+        self.ensemble = ensemble
+        self.num_cols = list(num_cols)
+        self.mean = mean
+        self.scale = scale
+        self.cat_cols = list(cat_cols)
+        self.cat_codes = cat_codes
+        # Sorted categories and their codes, for binary search in transform_columns
+        # (an encoder fitted with explicit categories keeps them in the given order)
+        self.categories, self.sorted_codes = [], []
+        for codes in cat_codes:
+            categories = np.asarray(list(codes), dtype=str)
+            order = np.argsort(categories, kind="stable")
+            self.categories.append(categories[order])
+            self.sorted_codes.append(np.asarray(list(codes.values()), dtype=np.float64)[order])
+        self.unknown_value = unknown_value
+        self.n_features = len(self.num_cols) + len(self.cat_cols)
+
+    def transform(self, records):
+        """Turn a list of validated record dicts into the classifier's input matrix."""
+        n_num = len(self.num_cols)
+        X = np.empty((len(records), self.n_features), dtype=np.float64)
+
+        for i, record in enumerate(records):
+            row = X[i]
+            for j, col in enumerate(self.num_cols):
+                row[j] = record[col]
+            for j, col in enumerate(self.cat_cols):
+                code = self.cat_codes[j].get(record[col], self.unknown_value)
+                if code is None:
+                    raise ValueError(f"Found unknown category {record[col]!r} in column {col}")
+                row[n_num + j] = code
+
+        self._scale(X)
+        return X
+
+    def transform_columns(self, columns):
+        """Build the input matrix from a dict of 1-D arrays, one per feature."""
+        n_num = len(self.num_cols)
+        n_rows = len(columns[self.num_cols[0]])
+        X = np.empty((n_rows, self.n_features), dtype=np.float64)
+
+        for j, col in enumerate(self.num_cols):
+            X[:, j] = columns[col]
+
+        for j, col in enumerate(self.cat_cols):
+            categories = self.categories[j]
+            values = np.asarray(columns[col], dtype=str)
+            idx = np.searchsorted(categories, values)
+            idx[idx == len(categories)] = 0
+            known = categories[idx] == values
+            codes = X[:, n_num + j]
+            codes[:] = self.sorted_codes[j][idx]
+            if not known.all():
+                if self.unknown_value is None:
+                    raise ValueError(f"Found unknown category {values[~known][0]!r} "
+                                     f"in column {col}")
+                codes[~known] = self.unknown_value
+
+        self._scale(X)
+        return X
+
+    def _scale(self, X):
+        """Same in-place operations as StandardScaler.transform."""
+        n_num = len(self.num_cols)
+        if self.mean is not None:
+            X[:, :n_num] -= self.mean
+        if self.scale is not None:
+            X[:, :n_num] /= self.scale
+
+    def predict(self, records):
+        """Return ``(yhat, proba)`` exactly as ``pipeline.predict``/``predict_proba`` would."""
+        return self.predict_matrix(self.transform(records))
+
+    def predict_columns(self, columns):
+        """Like ``predict`` but for column-oriented input."""
+        return self.predict_matrix(self.transform_columns(columns))
+
+    def predict_matrix(self, X):
+        """Score an already-transformed input matrix."""
+        if self.ensemble is not None:
+            return self.ensemble.predict_matrix(X)
+        return self.classifier.predict(X), self.classifier.predict_proba(X)
+
+
+def compile_pipeline(pipeline, ensemble=None):
+    """
+    Compile a pipeline built by ``tune.build_deployment_pipeline``.
+    Returns None if the pipeline has a shape the fast path does not understand,
+    in which case callers should keep using the sklearn pipeline. An
+    ``ensemble`` (a ``treeinfer.FlatEnsemble``) replaces the classifier.
+    """
+    # Imported here so the API can start serving before sklearn is loaded
+    from sklearn.compose import ColumnTransformer
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OrdinalEncoder, StandardScaler
+
+    if not isinstance(pipeline, Pipeline) or len(pipeline.steps) != 2:
+        return None
+
+    preprocessor = pipeline.steps[0][1]
+    classifier = pipeline.steps[1][1]
+    if not isinstance(preprocessor, ColumnTransformer):
+        return None
+
+    scaler = encoder = None
+    for name, transformer, cols in preprocessor.transformers_:
+        if name == "remainder":
+            if transformer != "drop" and len(cols) > 0:
+                return None
+        elif isinstance(transformer, StandardScaler) and scaler is None:
+            scaler, num_cols = transformer, cols
+        elif isinstance(transformer, OrdinalEncoder) and encoder is None:
+            encoder, cat_cols = transformer, cols
+        else:
+            return None
+
+    if scaler is None or encoder is None:
+        return None
+    # The fast path writes numerics first, then categoricals
+    if [name for name, _, _ in preprocessor.transformers_[:2]] != ["num", "cat"]:
+        return None
+    if getattr(encoder, "_infrequent_enabled", False):
+        return None
+    if not all(isinstance(c, str) for cats in encoder.categories_ for c in cats):
+        return None
+
+    if encoder.handle_unknown == "use_encoded_value":
+        unknown_value = float(encoder.unknown_value)
+    else:
+        unknown_value = None
+
+    cat_codes = [
+        {category: float(code) for code, category in enumerate(categories)}
+        for categories in encoder.categories_
+    ]
+
+    return CompiledPipeline(
+        classifier=classifier,
+        num_cols=num_cols,
+        mean=scaler.mean_ if scaler.with_mean else None,
+        scale=scaler.scale_ if scaler.with_std else None,
+        cat_cols=cat_cols,
+        cat_codes=cat_codes,
+        unknown_value=unknown_value,
+        ensemble=ensemble,
+    )
@@ -0,0 +1,107 @@
+"""
+formats.py — Decode column-oriented batch bodies for the predict endpoints.
+
+Besides the usual JSON record(s), the predict endpoints accept a batch as one
+array per feature, so large batches never become per-record Python dicts:
+
+- ``application/json`` with an object whose values are all arrays
+- ``application/x-npz``: a NumPy ``.npz`` archive with one array per feature
+- ``application/vnd.apache.arrow.stream``: an Arrow IPC stream (needs pyarrow)
+
+Every decoder returns a dict mapping feature name to a 1-D NumPy array.
+"""
+
+import io
+import numpy as np
+
+NPZ_MIMETYPE = "application/x-npz"
+ARROW_MIMETYPE = "application/vnd.apache.arrow.stream"
+
+BINARY_MIMETYPES = (NPZ_MIMETYPE, ARROW_MIMETYPE)
+
+NUMBER_TYPES = {int, float, bool}
+
+
+def is_columnar_json(json_data):
+    """True if a parsed JSON body is an object of arrays rather than a record."""
+    return (isinstance(json_data, dict) and len(json_data) > 0
+            and all(isinstance(v, list) for v in json_data.values()))
+
+
+def decode_columnar_json(json_data, numerical_features):
+    """
+    Convert an object of JSON arrays into NumPy columns.
+    Returns (columns, error_message); JSON has no dtypes, so element types
+    are checked here while the lists are still Python objects.
+    """
+    columns = {}
+    for name, values in json_data.items():
+        kinds = set(map(type, values))
+        if name in numerical_features:
+            if not kinds <= NUMBER_TYPES:
+                bad = next(k for k in kinds if k not in NUMBER_TYPES)
+                return None, (f"Invalid type for {name}: expected a number, "
+                              f"got {bad.__name__}")
+            columns[name] = np.asarray(values, dtype=np.float64)
+        else:
+            if not kinds <= {str}:
+                bad = next(k for k in kinds if k is not str)
+                return None, (f"Invalid type for {name}: expected a string, "
+                              f"got {bad.__name__}")
+            columns[name] = np.asarray(values, dtype=str)
+    return columns, None
+
+
+def decode_npz(raw):
+    """Read a ``.npz`` archive (pickled object arrays are refused)."""
+    with np.load(io.BytesIO(raw), allow_pickle=False) as archive:
+        return {name: archive[name] for name in archive.files}
+
+
+def decode_arrow(raw):
+    """Read an Arrow IPC stream into NumPy columns (ImportError without pyarrow)."""
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise ImportError("Arrow input requires the pyarrow package") from e
+
+    table = pa.ipc.open_stream(pa.py_buffer(raw)).read_all()
+    return {name: table.column(name).to_numpy()
+            for name in table.column_names}
+
+
+def check_columns(columns, numerical_features, categorical_features):
+    """
+    Check presence, lengths and dtypes of decoded columns.
+    Returns an error message, or None if the columns can be scored.
+    """
+    missing = [f for f in numerical_features + categorical_features
+               if f not in columns]
+    if missing:
+        return f"Missing required features: {', '.join(missing)}"
+
+    lengths = {len(columns[f]) for f in numerical_features + categorical_features}
+    if len(lengths) != 1:
+        return "All feature columns must have the same length"
+    if lengths == {0}:
+        return "No input data provided"
+
+    for feat in numerical_features:
+        if columns[feat].ndim != 1 or columns[feat].dtype.kind not in "biuf":
+            return (f"Invalid type for {feat}: expected a number, "
+                    f"got {columns[feat].dtype}")
+
+    for feat in categorical_features:
+        col = columns[feat]
+        if col.ndim != 1:
+            return f"Invalid type for {feat}: expected a string, got {col.dtype}"
+        if col.dtype.kind == "O":
+            kinds = set(map(type, col))
+            if not kinds <= {str}:
+                bad = next(k for k in kinds if k is not str)
+                return (f"Invalid type for {feat}: expected a string, "
+                        f"got {bad.__name__}")
+        elif col.dtype.kind != "U":
+            return f"Invalid type for {feat}: expected a string, got {col.dtype}"
+
+    return None
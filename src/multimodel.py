@@ -0,0 +1,275 @@
+"""
+multimodel.py — Score one request with several model versions.
+
+``POST /predict?models=v1,v2`` decodes and validates the body once, builds
+the input DataFrame once and scores every requested version on it, in
+parallel threads when the batch is large. Versions listed in ``shadow`` are
+scored in the background once the response has been built; only their
+agreement with the first requested model is recorded, as a metric.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from prometheus_client import Counter
+
+import service
+from formats import check_columns, decode_columnar_json, is_columnar_json
+from service import (
+    CATEGORICAL_FEATURES, NUMERICAL_FEATURES, REQUIRED_FEATURES, logger, registry,
+    stage_timer,
+)
+from validation import SchemaValidator
+
+# Batches with at least this many rows score their models in parallel threads.
+MULTI_MODEL_PARALLEL_ROWS = int(os.environ.get("MULTI_MODEL_PARALLEL_ROWS", 1000))
+MULTI_MODEL_THREADS = int(os.environ.get("MULTI_MODEL_THREADS", 4))
+
+# Shadow jobs allowed to be queued or running at once; further requests skip
+# shadow scoring rather than build up a backlog.
+SHADOW_MAX_PENDING = int(os.environ.get("SHADOW_MAX_PENDING", 32))
+
+SHADOW_PREDICTIONS = Counter(
+    "shadow_predictions_total",
+    "Records scored by shadow models, by agreement with the primary model",
+    ["model_version", "primary_version", "outcome"],
+)
+
+_pools = {}
+_pools_lock = threading.Lock()
+_shadow_slots = threading.BoundedSemaphore(SHADOW_MAX_PENDING)
+
+
+def _pool(name, max_workers):
+    """Thread pool created lazily in each process (never in a preloading master)."""
+    key = (name, os.getpid())
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ThreadPoolExecutor(max_workers=max_workers,
+                                                    thread_name_prefix=name)
+    return pool
+
+
+def parse_versions(value):
+    """Split "v1,v2" into ["v1", "v2"], dropping blanks and duplicates."""
+    return list(dict.fromkeys(v.strip() for v in (value or "").split(",") if v.strip()))
+
+
+def shared_validator(entries):
+    """A validator accepting only the categories every entry was fitted on."""
+    vocabulary = {}
+    for feat in CATEGORICAL_FEATURES:
+        known = [e.validator.vocabulary[feat] for e in entries if feat in e.validator.vocabulary]
+        if known:
+            vocabulary[feat] = set.intersection(*known)
+    return SchemaValidator(NUMERICAL_FEATURES, CATEGORICAL_FEATURES, vocabulary)
+
+
+class SharedInput:
+    """Validated rows (records or columns), converted for the models at most once."""
+
+    def __init__(self, records=None, columns=None):
+        self.records = records
+        self.columns = columns
+        if records is not None:
+            self.n_rows = len(records)
+        else:
+            self.n_rows = len(columns[REQUIRED_FEATURES[0]])
+        self._frame = None
+
+    def uses_frame(self, entry):
+        """Whether ``entry`` scores from the shared DataFrame (else its fast path)."""
+        if entry.compiled is None:
+            return True
+        return self.records is not None and self.n_rows > service.FAST_PATH_MAX_ROWS
+
+    def frame(self, model_label):
+        if self._frame is None:
+            with stage_timer(model_label, "frame"):
+                if self.records is not None:
+                    self._frame = service.input_frame(self.records)
+                else:
+                    self._frame = service.input_frame(
+                        {f: self.columns[f] for f in REQUIRED_FEATURES})
+        return self._frame
+
+    def score(self, entry):
+        """Score the rows with one model version; returns (yhat, proba)."""
+        model_label = entry.version
+        if not self.uses_frame(entry):
+            with stage_timer(model_label, "frame"):
+                if self.records is not None:
+                    X = entry.compiled.transform(self.records)
+                else:
+                    X = entry.compiled.transform_columns(self.columns)
+            with stage_timer(model_label, "predict_proba"):
+                return entry.compiled.predict_matrix(X)
+        frame = self.frame(model_label)
+        with stage_timer(model_label, "predict_proba"):
+            return service.predict_frame(entry, frame)
+
+
+def score_entries(shared, entries):
+    """Score every entry on the shared input, in parallel for large batches."""
+    if any(shared.uses_frame(e) for e in entries):
+        # Build the frame here so parallel scorers never race to build it
+        shared.frame(entries[0].version)
+    if len(entries) > 1 and shared.n_rows >= MULTI_MODEL_PARALLEL_ROWS:
+        pool = _pool("multimodel", MULTI_MODEL_THREADS)
+        futures = [pool.submit(shared.score, entry) for entry in entries]
+        return [future.result() for future in futures]
+    return [shared.score(entry) for entry in entries]
+
+
+def submit_shadow(shared, entries, primary_version, primary_yhat):
+    """Score shadow models in the background; never delays or fails the request."""
+    if not _shadow_slots.acquire(blocking=False):
+        for entry in entries:
+            SHADOW_PREDICTIONS.labels(model_version=entry.version, primary_version=primary_version,
+                                      outcome="dropped").inc(shared.n_rows)
+        logger.warning("Shadow scoring skipped: %d jobs already pending", SHADOW_MAX_PENDING)
+        return None
+
+    def run():
+        try:
+            for entry in entries:
+                counter = SHADOW_PREDICTIONS.labels
+                try:
+                    yhat, _ = shared.score(entry)
+                except Exception as e:
+                    logger.error("Shadow scoring failed for %s: %s", entry.version, str(e))
+                    counter(model_version=entry.version, primary_version=primary_version,
+                            outcome="error").inc(shared.n_rows)
+                    continue
+                agree = int(np.count_nonzero(np.asarray(yhat) == np.asarray(primary_yhat)))
+                counter(model_version=entry.version, primary_version=primary_version,
+                        outcome="agree").inc(agree)
+                counter(model_version=entry.version, primary_version=primary_version,
+                        outcome="disagree").inc(shared.n_rows - agree)
+        finally:
+            _shadow_slots.release()
+
+    return _pool("shadow", 1).submit(run)
+
+
+def drain_shadow():
+    """Block until every shadow job queued so far in this process has finished."""
+    _pool("shadow", 1).submit(lambda: None).result()
+
+
+def predict_models(models, mimetype, raw, shadow=None, partial=False, shape=None):
+    """
+    Score a request body with every version in ``models`` ("v1,v2").
+    Returns {"models": [...], "predictions": {version: results}} (plus
+    "errors" with partial=True and "shadow" when shadow versions were queued).
+    """
+    versions = parse_versions(models)
+    if not versions:
+        return {"error": "Query parameter 'models' must list at least one model "
+                         "version, e.g. ?models=v1,v2"}, 400
+    shadow_versions = [v for v in parse_versions(shadow) if v not in versions]
+
+    entries = []
+    for version in versions + shadow_versions:
+        entry = registry.get(version)
+        if entry is None:
+            return service.unknown_version(version)
+        entries.append(entry)
+    primaries, shadows = entries[:len(versions)], entries[len(versions):]
+
+    shape = shape or "records"
+    if shape not in service.RESPONSE_SHAPES:
+        return {"error": f"Unknown response shape: {shape} "
+                         f"(expected one of {', '.join(service.RESPONSE_SHAPES)})"}, 400
+    compact = shape == "compact"
+
+    with service.in_flight(versions) as rejected:
+        if rejected:
+            return rejected
+        json_data, columns, error = service.decode_body(versions[0], mimetype, raw)
+        if error:
+            return error
+        n_rows = service.count_rows(json_data, columns)
+        error = service.too_many_rows(versions[0], n_rows)
+        if error:
+            return error
+        with service.bulk_slot(versions, n_rows) as rejected:
+            if rejected:
+                return rejected
+            return score_models(versions, primaries, shadows, shadow_versions,
+                                json_data, columns, partial, compact)
+
+
+def score_models(versions, primaries, shadows, shadow_versions, json_data, columns,
+                 partial, compact):
+    """Validate and score a decoded body with every primary model (see predict_models)."""
+    model_label = versions[0]
+    start_time = time.time()
+
+    if json_data is not None and is_columnar_json(json_data):
+        columns, error = decode_columnar_json(json_data, NUMERICAL_FEATURES)
+        if error:
+            return service.validation_failed(model_label, error)
+
+    # Validate once against the categories known to every requested model
+    validator = shared_validator(primaries)
+    with stage_timer(model_label, "validation"):
+        if columns is not None:
+            error = check_columns(columns, NUMERICAL_FEATURES, CATEGORICAL_FEATURES)
+            if error:
+                return service.validation_failed(model_label, error)
+            is_batch = True
+            row_errors = validator.validate_columns(columns)
+        else:
+            is_batch = isinstance(json_data, list)
+            records = json_data if is_batch else [json_data]
+            row_errors = validator.validate_records(records)
+
+    partial = partial and is_batch
+    indices = [i for i, error in enumerate(row_errors) if error is None]
+    if partial:
+        if not indices:
+            return service.validation_failed(model_label, "No valid records", row_errors=row_errors)
+    else:
+        error = next((e for e in row_errors if e is not None), None)
+        if error:
+            return service.validation_failed(model_label, error)
+
+    if columns is not None:
+        if len(indices) < len(row_errors):
+            columns = {f: np.asarray(columns[f])[indices] for f in REQUIRED_FEATURES}
+        shared = SharedInput(columns=columns)
+    else:
+        if len(indices) < len(records):
+            records = [records[i] for i in indices]
+        shared = SharedInput(records=records)
+
+    for entry in primaries:
+        service.PREDICTION_BATCH_SIZE.labels(model_version=entry.version).observe(shared.n_rows)
+    try:
+        scored = score_entries(shared, primaries)
+    except Exception as e:
+        return service.prediction_failed(model_label, e)
+
+    predictions = {}
+    for entry, (yhat, proba) in zip(primaries, scored):
+        if partial:
+            body, _ = service.partial_response(entry.version, start_time, yhat, proba,
+                                               indices, row_errors, compact)
+            predictions[entry.version] = body["predictions"]
+        else:
+            body, _ = service.prediction_response(entry.version, start_time, yhat, proba,
+                                                  is_batch, compact)
+            predictions[entry.version] = body
+
+    response = {"models": versions, "predictions": predictions}
+    if partial:
+        response["errors"] = service.indexed_errors(row_errors)
+    if shadows:
+        submit_shadow(shared, shadows, model_label, scored[0][0])
+        response["shadow"] = shadow_versions
+    return response, 200
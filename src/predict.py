@@ -6,6 +6,7 @@ import argparse
 import pickle
 import pandas as pd
 
+from treeinfer import compile_model
 from utils.config import load_config
 
 
@@ -15,6 +16,9 @@ def parse_args():
                         help="Path to YAML config file")
     parser.add_argument("--data", default=None, help="Override input data path")
     parser.add_argument("--model", default=None, help="Override model path")
+    parser.add_argument("--engine", choices=["sklearn", "flat"], default="sklearn",
+                        help="Inference engine: the sklearn pipeline, or the flattened "
+                             "NumPy tree engine (same predictions, faster)")
     return parser.parse_args()
 
 
@@ -35,6 +39,13 @@ def main():
     if "Churn" in df.columns:
         df = df.drop(columns=["Churn"])
 
+    if args.engine == "flat":
+        flat = compile_model(pipeline)
+        if flat is None:
+            print("Flat engine does not support this model; using sklearn.")
+        else:
+            pipeline = flat
+
     yhat = pipeline.predict(df)
 
     print("Predictions:")
@@ -0,0 +1,206 @@
+"""
+registry.py — Discover, load and hot-swap model versions from MODEL_DIR.
+
+Every ``model_<version>.mmap`` or ``model_<version>.pkl`` file in the model
+directory is served as ``<version>``. If both exist the newer one wins (the
+``.mmap`` artifact on a tie), so a retrained ``.pkl`` is not shadowed by an
+artifact converted from the previous model. A reload builds the new ``ModelEntry`` completely before swapping it
+into the registry, and readers always see either the old or the new entry,
+so requests in flight keep using the model they started with.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("churn_api")
+
+MODEL_FILE = re.compile(r"^model_(?P<version>[A-Za-z0-9_-]+)\.(?P<ext>mmap|pkl)$")
+
+
+class ModelEntry:
+    """A loaded model version plus the per-model helpers built for it."""
+
+    def __init__(self, version, path, model, compiled=None, validator=None,
+                 cache=None, batcher=None, engine=None):
+        self.version = version
+        self.path = path
+        self.model = model
+        self.compiled = compiled
+        self.engine = engine
+        self.validator = validator
+        self.cache = cache
+        self.batcher = batcher
+        self.mtime = os.path.getmtime(path)
+        self.loaded_at = time.time()
+
+    def describe(self):
+        """JSON-serialisable summary for the /models endpoint."""
+        return {
+            "version": self.version,
+            "path": os.path.basename(self.path),
+            "model": type(self.model).__name__,
+            "loaded_at": self.loaded_at,
+            "fast_path": self.compiled is not None,
+            "engine": "flat" if self.engine is not None else "sklearn",
+        }
+
+    def close(self):
+        """Release background helpers once the entry has been swapped out."""
+        if self.batcher is not None:
+            self.batcher.close()
+
+
+def scan_model_dir(model_dir):
+    """Return {version: path} for every model file in ``model_dir``."""
+    found, newest = {}, {}
+    # Sorted names put .mmap before .pkl, so a .pkl must be strictly newer
+    for name in sorted(os.listdir(model_dir)):
+        match = MODEL_FILE.match(name)
+        if not match:
+            continue
+        version = match.group("version")
+        path = os.path.join(model_dir, name)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            continue
+        if version in found and mtime <= newest[version]:
+            continue
+        found[version], newest[version] = path, mtime
+    return found
+
+
+class ModelRegistry:
+    """Thread-safe map of model version → ``ModelEntry`` with atomic swaps."""
+
+    def __init__(self, model_dir, build_entry, on_change=None):
+        """
+        build_entry: callable(version, path) returning a loaded ModelEntry.
+        on_change: optional callable(registry) run after every swap.
+        """
+        self.model_dir = model_dir
+        self.build_entry = build_entry
+        self.on_change = on_change
+        self._entries = {}
+        # {version: error} for files whose latest load failed and have not been
+        # loaded or removed since
+        self.failed = {}
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._watcher_pid = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, version):
+        """Return the current entry for ``version``, or None."""
+        return self._entries.get(version)
+
+    def versions(self):
+        return sorted(self._entries)
+
+    def entries(self):
+        return [self._entries[v] for v in self.versions()]
+
+    def reload(self, version=None, force=False, max_workers=1):
+        """
+        Rescan the model directory and load new or changed files (all of
+        them with force=True). With ``version`` only that version is
+        considered. Versions whose files disappeared are unloaded. Up to
+        ``max_workers`` files are loaded concurrently.
+        Returns {"loaded": [...], "unloaded": [...], "failed": {version: error}}.
+        """
+        summary = {"loaded": [], "unloaded": [], "failed": {}}
+        with self._reload_lock:
+            found = scan_model_dir(self.model_dir)
+            targets = [version] if version is not None else sorted(set(found) | set(self._entries))
+
+            to_load = []
+            for v in targets:
+                current = self._entries.get(v)
+                path = found.get(v)
+
+                if path is None:
+                    self.failed.pop(v, None)
+                    if current is not None:
+                        self._swap(v, None)
+                        summary["unloaded"].append(v)
+                    continue
+                try:
+                    if (not force and current is not None and current.path == path
+                            and current.mtime == os.path.getmtime(path)):
+                        continue
+                except OSError as e:
+                    summary["failed"][v] = self.failed[v] = str(e)
+                    continue
+                to_load.append((v, path))
+
+            for v, path, result in self._build_all(to_load, max_workers):
+                if isinstance(result, Exception):
+                    logger.error("Failed to load model %s from %s: %s", v, path, result)
+                    summary["failed"][v] = self.failed[v] = str(result)
+                    continue
+                self.failed.pop(v, None)
+                self._swap(v, result)
+                summary["loaded"].append(v)
+                logger.info("Loaded model %s from %s", v, path)
+
+        return summary
+
+    def _build_all(self, to_load, max_workers):
+        """Build entries for [(version, path)]; yields (version, path, entry or exception)."""
+        def build(item):
+            try:
+                return self.build_entry(*item)
+            except Exception as e:
+                return e
+
+        if max_workers > 1 and len(to_load) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers,
+                                    thread_name_prefix="model-loader") as pool:
+                results = list(pool.map(build, to_load))
+        else:
+            results = [build(item) for item in to_load]
+        for (v, path), result in zip(to_load, results):
+            yield v, path, result
+
+    def _swap(self, version, entry):
+        # Replace the whole dict so lock-free readers never see a partial update
+        entries = dict(self._entries)
+        old = entries.pop(version, None)
+        if entry is not None:
+            entries[version] = entry
+        self._entries = entries
+        if old is not None:
+            old.close()
+        if self.on_change is not None:
+            self.on_change(self)
+
+    def start_watching(self, interval):
+        """
+        Poll the model directory every ``interval`` seconds and reload changed
+        files in a background thread. Safe to call repeatedly; the thread is
+        (re)started once per process, so it also works after a fork.
+        """
+        if interval <= 0 or (self._watcher is not None and self._watcher_pid == os.getpid()):
+            return
+        with self._reload_lock:
+            if self._watcher is not None and self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+            self._watcher = threading.Thread(
+                target=self._watch, args=(interval,), name="model-watcher", daemon=True
+            )
+            self._watcher.start()
+
+    def _watch(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error("Model directory scan failed: %s", e)
@@ -0,0 +1,54 @@
+"""
+serialization.py — JSON encoding for API responses.
+
+``dumps`` turns a response body into bytes laid out like Flask's jsonify
+(sorted keys, compact separators, trailing newline). It uses orjson when it
+is installed and the standard library otherwise; both accept NumPy arrays
+and scalars, so scoring results can be written without first converting
+them to Python lists.
+"""
+
+import json
+import os
+
+import numpy as np
+
+
+def _default(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def stdlib_dumps(body):
+    """Encode with the standard library json module."""
+    return (json.dumps(body, default=_default, sort_keys=True,
+                       separators=(",", ":")) + "\n").encode()
+
+
+def get_encoder(name="auto"):
+    """
+    Return (name, dumps) for the requested encoder: "orjson", "json", or
+    "auto" to prefer orjson when it can be imported.
+    """
+    if name not in ("auto", "orjson", "json"):
+        raise ValueError(f"Unknown JSON encoder: {name}")
+    if name != "json":
+        try:
+            import orjson
+        except ImportError:
+            if name == "orjson":
+                raise
+        else:
+            options = orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE
+
+            def orjson_dumps(body):
+                return orjson.dumps(body, default=_default, option=options)
+
+            return "orjson", orjson_dumps
+    return "json", stdlib_dumps
+
+
+ENCODER, dumps = get_encoder(os.environ.get("JSON_ENCODER", "auto"))
@@ -0,0 +1,992 @@
+"""
+service.py — Framework-independent core of the churn prediction service.
+
+Holds the logging setup, custom Prometheus metrics, model registry,
+validation and scoring shared by the Flask app (app.py) and the asyncio
+entry point (asgi.py). Request handlers return ``(body, status)`` tuples
+with plain Python bodies; each web layer serialises them itself.
+"""
+
+import os
+import contextlib
+import importlib
+import json
+import time
+import logging
+import pickle
+import threading
+import numpy as np
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+
+from admission import InFlightLimiter
+from artifacts import is_artifact, load_artifact
+from cache import PredictionCache, record_key
+from coalescer import CoalescerTimeout, MicroBatcher
+from fastpath import compile_pipeline
+from formats import (
+    ARROW_MIMETYPE, NPZ_MIMETYPE, check_columns, decode_arrow,
+    decode_columnar_json, decode_npz, is_columnar_json,
+)
+from registry import ModelEntry, ModelRegistry
+from treeinfer import compile_model, is_compact
+from serialization import dumps
+from utils.request_logging import SAMPLED, configure_logging
+from validation import SchemaValidator, vocabulary_from_pipeline
+
+# ---- Logging configuration ----
+
+# Request threads only enqueue log records (LOG_QUEUE=0 writes them inline).
+# Success messages are kept at LOG_SAMPLE_RATE and every message is cut to
+# LOG_MAX_CHARS; warnings and errors are always kept.
+configure_logging(
+    os.environ.get("LOG_DIR", "logs"),
+    use_queue=os.environ.get("LOG_QUEUE", "1") == "1",
+    sample_rate=float(os.environ.get("LOG_SAMPLE_RATE", 1.0)),
+    max_chars=int(os.environ.get("LOG_MAX_CHARS", 2000)),
+)
+
+logger = logging.getLogger("churn_api")
+
+_IMPORT_STARTED = time.time()
+
+
+# ---- Prometheus metrics ----
+
+# Custom application-level metrics
+PREDICTION_REQUESTS = Counter(
+    "prediction_requests_total",
+    "Total prediction requests by model version and outcome",
+    ["model_version", "status"],
+)
+
+# Sub-millisecond buckets: small requests on the fast path finish well
+# under 10 ms.
+LATENCY_BUCKETS = [0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0]
+
+PREDICTION_LATENCY = Histogram(
+    "prediction_duration_seconds",
+    "Time spent processing a prediction request",
+    ["model_version"],
+    buckets=LATENCY_BUCKETS,
+)
+
+# Where a request's time goes: decode (body parsing), validation, frame
+# (DataFrame or feature matrix), predict_proba (model), response (result
+# objects) and serialization (JSON encoding)
+PREDICTION_STAGE_LATENCY = Histogram(
+    "prediction_stage_duration_seconds",
+    "Time spent in each stage of a prediction request",
+    ["model_version", "stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+PREDICTION_BATCH_SIZE = Histogram(
+    "prediction_batch_size",
+    "Number of records per prediction request (per chunk for streams)",
+    ["model_version"],
+    buckets=[1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000],
+)
+
+PREDICTION_CACHE_EVENTS = Counter(
+    "prediction_cache_events_total",
+    "Prediction cache lookups and evictions by model version",
+    ["model_version", "event"],
+)
+
+ACTIVE_MODELS = Gauge(
+    "active_models_loaded",
+    "Number of models currently loaded in memory",
+    multiprocess_mode="livemax",
+)
+
+MODEL_RELOADS = Counter(
+    "model_reloads_total",
+    "Model loads and reloads by model version and outcome",
+    ["model_version", "status"],
+)
+
+# Requests being scored per model version; kind="all" counts every
+# prediction request, kind="bulk" those with at least BULK_ROWS records
+IN_FLIGHT = Gauge(
+    "prediction_requests_in_flight",
+    "Prediction requests currently being scored by model version",
+    ["model_version", "kind"],
+    multiprocess_mode="livesum",
+)
+
+PREDICTION_REJECTIONS = Counter(
+    "prediction_rejections_total",
+    "Prediction requests turned away by admission control",
+    ["model_version", "reason"],
+)
+
+# Seconds from this module's import until models were loaded ("models") and
+# until the process could serve predictions ("ready")
+STARTUP_DURATION = Gauge(
+    "startup_duration_seconds",
+    "Time taken by each phase of process startup",
+    ["phase"],
+    multiprocess_mode="livemax",
+)
+
+
+def stage_timer(model_label, stage):
+    """Context manager that records the duration of one request stage."""
+    return PREDICTION_STAGE_LATENCY.labels(model_version=model_label, stage=stage).time()
+
+
+def metrics_payload():
+    """
+    Prometheus exposition for GET /metrics. With PROMETHEUS_MULTIPROC_DIR set
+    (gunicorn with several workers) the samples of every worker are merged;
+    otherwise this process's registry is returned.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        collector_registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(collector_registry)
+        return generate_latest(collector_registry)
+    return generate_latest()
+
+
+# ---- Model loading ----
+
+def load_model(path):
+    """Load a pipeline from disk: a memory-mapped artifact or a plain pickle."""
+    if is_artifact(path):
+        return load_artifact(path)
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+MODEL_DIR = os.environ.get("MODEL_DIR",
+                           os.path.join(os.path.dirname(__file__), "..", "models"))
+
+# Poll MODEL_DIR every this many seconds and hot-swap new or changed models
+# (0 disables; POST /admin/reload works either way).
+MODEL_WATCH_INTERVAL = float(os.environ.get("MODEL_WATCH_INTERVAL", 0))
+
+# Load models in a background thread so the server can accept connections
+# (and answer /health) straight away; /ready and the prediction routes
+# return 503 until loading has finished. MODEL_LOAD_THREADS files are
+# unpickled concurrently.
+FAST_STARTUP = os.environ.get("FAST_STARTUP", "0") == "1"
+MODEL_LOAD_THREADS = int(os.environ.get("MODEL_LOAD_THREADS", 4))
+
+# Modules the pickled pipelines are built from. They are imported lazily, so
+# the first import would otherwise happen in several loader threads at once,
+# where Python's import lock can raise a _DeadlockError that fails the load.
+ESTIMATOR_MODULES = (
+    "sklearn.pipeline", "sklearn.compose", "sklearn.preprocessing",
+    "sklearn.ensemble", "sklearn.linear_model", "sklearn.dummy",
+)
+
+# Shared secret for the /admin endpoints (unset disables them).
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+# Requests with at most this many records skip DataFrame construction and
+# use the compiled NumPy preprocessor (0 disables the fast path).
+FAST_PATH_MAX_ROWS = int(os.environ.get("FAST_PATH_MAX_ROWS", 16))
+
+# "flat" scores gradient-boosting and random-forest models with the
+# flattened NumPy engine in treeinfer.py (same probabilities, far less
+# per-call overhead); "sklearn" uses the fitted estimator.
+INFERENCE_ENGINE = os.environ.get("INFERENCE_ENGINE", "sklearn")
+
+
+# ---- Feature definitions ----
+
+NUMERICAL_FEATURES = ["tenure", "MonthlyCharges", "TotalCharges"]
+
+CATEGORICAL_FEATURES = [
+    "gender", "SeniorCitizen", "Partner", "Dependents",
+    "PhoneService", "MultipleLines", "InternetService",
+    "OnlineSecurity", "OnlineBackup", "DeviceProtection",
+    "TechSupport", "StreamingTV", "StreamingMovies",
+    "Contract", "PaperlessBilling", "PaymentMethod",
+]
+
+REQUIRED_FEATURES = NUMERICAL_FEATURES + CATEGORICAL_FEATURES
+
+
+# ---- Validation ----
+
+# Reject categories the model was never fitted on (set to 0 to let the
+# OrdinalEncoder map them to its unknown value instead).
+CHECK_CATEGORIES = os.environ.get("CHECK_CATEGORIES", "1") == "1"
+
+schema_validator = SchemaValidator(NUMERICAL_FEATURES, CATEGORICAL_FEATURES)
+
+
+def validate_input(record):
+    """
+    Check that a single record has all required features with correct types.
+    Returns (error_message, status_code) or (None, 200) if valid.
+    """
+    error = schema_validator.validate_records([record])[0]
+    if error:
+        return error, 400
+    return None, 200
+
+
+# ---- Request coalescing ----
+
+# Single-record requests arriving within this many milliseconds of each
+# other are scored together (0 disables coalescing). Only useful when the
+# server runs several request threads per process, e.g. gunicorn --threads.
+COALESCE_WINDOW_MS = float(os.environ.get("COALESCE_WINDOW_MS", 0))
+COALESCE_MAX_ROWS = int(os.environ.get("COALESCE_MAX_ROWS", 64))
+# A coalesced request waits at most the window plus this many milliseconds
+# for its batch, then gets 503.
+COALESCE_TIMEOUT_MS = float(os.environ.get("COALESCE_TIMEOUT_MS", 5000))
+
+
+# ---- Prediction cache ----
+
+# Keep up to this many recent results per model (0 disables the cache).
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", 0))
+PREDICTION_CACHE_TTL = float(os.environ.get("PREDICTION_CACHE_TTL", 300))
+
+
+# ---- Admission control ----
+
+# Largest request body (streams are exempt) and most records accepted per
+# prediction request; larger requests get 413 (0 disables either limit).
+MAX_REQUEST_BYTES = int(os.environ.get("MAX_REQUEST_BYTES", 64 * 1024 * 1024))
+MAX_BATCH_ROWS = int(os.environ.get("MAX_BATCH_ROWS", 100_000))
+
+# Requests scored at once per model version in each process; more get 429
+# with Retry-After (0 = unlimited). Requests with at least BULK_ROWS records,
+# and streams, also need one of MAX_BULK_IN_FLIGHT bulk slots, so bulk jobs
+# can never hold every slot that interactive callers need.
+MAX_IN_FLIGHT = int(os.environ.get("MAX_IN_FLIGHT", 0))
+MAX_BULK_IN_FLIGHT = int(os.environ.get("MAX_BULK_IN_FLIGHT", 0))
+BULK_ROWS = int(os.environ.get("BULK_ROWS", 1000))
+
+limiters = {"all": InFlightLimiter(MAX_IN_FLIGHT), "bulk": InFlightLimiter(MAX_BULK_IN_FLIGHT)}
+
+
+def reject(model_label, reason, status, message):
+    """Count and log a request turned away by admission control."""
+    PREDICTION_REJECTIONS.labels(model_version=model_label, reason=reason).inc()
+    logger.warning("Rejected %s request (%s): %s", model_label, reason, message)
+    return {"error": message}, status
+
+
+def request_too_large(model_label, content_length):
+    """413 response if a body of ``content_length`` bytes is over the limit, else None."""
+    if MAX_REQUEST_BYTES and content_length is not None and content_length > MAX_REQUEST_BYTES:
+        return reject(model_label, "bytes", 413,
+                      f"Request body exceeds the limit of {MAX_REQUEST_BYTES} bytes")
+    return None
+
+
+def count_rows(json_data, columns):
+    """Number of records in a decoded body (JSON record(s) or columns)."""
+    if columns is None and is_columnar_json(json_data):
+        columns = json_data
+    if columns is not None:
+        return len(next(iter(columns.values()), ()))
+    return len(json_data) if isinstance(json_data, list) else 1
+
+
+def too_many_rows(model_label, n_rows):
+    """413 response if a request has more than MAX_BATCH_ROWS records, else None."""
+    if MAX_BATCH_ROWS and n_rows > MAX_BATCH_ROWS:
+        return reject(model_label, "rows", 413,
+                      f"Batch of {n_rows} records exceeds the limit of "
+                      f"{MAX_BATCH_ROWS} records per request")
+    return None
+
+
+@contextlib.contextmanager
+def in_flight(versions, kind="all"):
+    """
+    Hold a ``kind`` slot for every version while the block runs. Yields
+    None, or the 429 (body, status) to return if a version has no free slot.
+    """
+    limiter = limiters[kind]
+    acquired = []
+    try:
+        for version in versions:
+            if not limiter.try_acquire(version):
+                yield reject(version, f"{kind}_in_flight", 429,
+                             f"Too many {'bulk ' if kind == 'bulk' else ''}requests in "
+                             f"flight for model {version}, retry shortly")
+                return
+            acquired.append(version)
+            IN_FLIGHT.labels(model_version=version, kind=kind).inc()
+        yield None
+    finally:
+        for version in acquired:
+            IN_FLIGHT.labels(model_version=version, kind=kind).dec()
+            limiter.release(version)
+
+
+def bulk_slot(versions, n_rows):
+    """``in_flight(versions, "bulk")`` for bulk requests; a no-op for small ones."""
+    if n_rows >= BULK_ROWS:
+        return in_flight(versions, "bulk")
+    return contextlib.nullcontext()
+
+
+# ---- Model registry ----
+
+def build_entry(version, path):
+    """Load a model file and build the fast path, validator, cache and coalescer for it."""
+    start_time = time.time()
+    model = load_model(path)
+
+    # Compact models only contain the flattened ensemble
+    use_engine = INFERENCE_ENGINE == "flat" or is_compact(model)
+    engine = compile_model(model) if use_engine else None
+    if engine is None and use_engine:
+        logger.warning("Flat inference engine unavailable for %s: unsupported model", version)
+    ensemble = engine.ensemble if engine is not None else None
+
+    compiled = compile_pipeline(model, ensemble) if FAST_PATH_MAX_ROWS > 0 else None
+    if compiled is None and FAST_PATH_MAX_ROWS > 0:
+        logger.warning("Fast path unavailable for %s: unsupported pipeline", version)
+
+    vocabulary = vocabulary_from_pipeline(model) if CHECK_CATEGORIES else None
+    entry = ModelEntry(
+        version, path, model,
+        compiled=compiled,
+        engine=engine,
+        validator=SchemaValidator(NUMERICAL_FEATURES, CATEGORICAL_FEATURES, vocabulary),
+    )
+    if PREDICTION_CACHE_SIZE > 0:
+        entry.cache = PredictionCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL)
+    if COALESCE_WINDOW_MS > 0:
+        entry.batcher = MicroBatcher(
+            version,
+            lambda records: score_records(entry, records),
+            window=COALESCE_WINDOW_MS / 1000,
+            max_rows=COALESCE_MAX_ROWS,
+            timeout=COALESCE_TIMEOUT_MS / 1000,
+        )
+
+    logger.info("Built model %s in %.2fs", version, time.time() - start_time)
+    return entry
+
+
+def on_registry_change(reg):
+    ACTIVE_MODELS.set(len(reg))
+
+
+registry = ModelRegistry(MODEL_DIR, build_entry, on_change=on_registry_change)
+
+
+def reload_models(version=None, force=False, max_workers=1):
+    """Reload models from MODEL_DIR and count the outcome per version."""
+    if max_workers > 1:
+        for name in ESTIMATOR_MODULES:
+            importlib.import_module(name)
+    summary = registry.reload(version, force=force, max_workers=max_workers)
+    for v in summary["loaded"]:
+        MODEL_RELOADS.labels(model_version=v, status="success").inc()
+    for v in summary["failed"]:
+        MODEL_RELOADS.labels(model_version=v, status="error").inc()
+    return summary
+
+
+_models_ready = threading.Event()
+
+
+def load_initial_models():
+    """Load every model in MODEL_DIR concurrently and open the readiness gate."""
+    start_time = time.time()
+    try:
+        reload_models(max_workers=MODEL_LOAD_THREADS)
+    finally:
+        STARTUP_DURATION.labels(phase="models").set(time.time() - start_time)
+        STARTUP_DURATION.labels(phase="ready").set(time.time() - _IMPORT_STARTED)
+        _models_ready.set()
+    logger.info("Loaded models %s from %s in %.2fs",
+                registry.versions(), MODEL_DIR, time.time() - start_time)
+
+
+def models_ready():
+    return _models_ready.is_set()
+
+
+if FAST_STARTUP:
+    threading.Thread(target=load_initial_models, name="model-loader", daemon=True).start()
+else:
+    load_initial_models()
+
+
+# ---- Prediction helper ----
+
+def run_prediction(entry, json_data, partial=False, compact=False):
+    """
+    Validate, predict, and format results.
+    Handles single records, batches of records and column-oriented batches.
+    With partial=True a batch is scored even if some rows are invalid, and
+    the invalid rows are reported by index instead of failing the request.
+    With compact=True batch results are returned as parallel arrays.
+    """
+    model_label = entry.version
+
+    if is_columnar_json(json_data):
+        columns, error = decode_columnar_json(json_data, NUMERICAL_FEATURES)
+        if error:
+            return validation_failed(model_label, error)
+        return run_columnar_prediction(entry, columns, partial, compact)
+
+    start_time = time.time()
+
+    is_batch = isinstance(json_data, list)
+    records = json_data if is_batch else [json_data]
+    partial = partial and is_batch
+
+    PREDICTION_BATCH_SIZE.labels(model_version=model_label).observe(len(records))
+
+    # Validate the whole batch column-wise before touching the model
+    with stage_timer(model_label, "validation"):
+        row_errors = entry.validator.validate_records(records)
+    if partial:
+        indices = [i for i, error in enumerate(row_errors) if error is None]
+        if not indices:
+            return validation_failed(model_label, "No valid records", row_errors=row_errors)
+        if len(indices) < len(records):
+            records = [records[i] for i in indices]
+    else:
+        error = next((e for e in row_errors if e is not None), None)
+        if error:
+            return validation_failed(model_label, error)
+
+    try:
+        yhat, proba = predict_records(entry, records, is_batch)
+    except CoalescerTimeout as e:
+        return reject(model_label, "coalescer_timeout", 503, str(e))
+    except Exception as e:
+        return prediction_failed(model_label, e)
+
+    if partial:
+        return partial_response(model_label, start_time, yhat, proba, indices, row_errors,
+                                compact)
+    return prediction_response(model_label, start_time, yhat, proba, is_batch, compact)
+
+
+def predict_records(entry, records, is_batch):
+    """
+    Score validated records, serving repeated rows from the prediction cache.
+    Identical rows within a batch are scored once.
+    """
+    model_label = entry.version
+    cache = entry.cache
+    if cache is None:
+        return score_uncached(entry, records, is_batch)
+
+    keys = [record_key(r, NUMERICAL_FEATURES, CATEGORICAL_FEATURES) for r in records]
+    found = {}
+    misses = {}
+    hits = 0
+    for key, record in zip(keys, records):
+        if key in found or key in misses:
+            hits += 1
+            continue
+        value = cache.get(key)
+        if value is None:
+            misses[key] = record
+        else:
+            found[key] = value
+            hits += 1
+
+    if misses:
+        yhat, proba = score_uncached(entry, list(misses.values()),
+                                     is_batch or len(misses) > 1)
+        evicted = 0
+        for i, key in enumerate(misses):
+            found[key] = (yhat[i], proba[i])
+            evicted += cache.put(key, found[key])
+        PREDICTION_CACHE_EVENTS.labels(model_version=model_label, event="miss").inc(len(misses))
+        if evicted:
+            PREDICTION_CACHE_EVENTS.labels(model_version=model_label, event="eviction").inc(evicted)
+    if hits:
+        PREDICTION_CACHE_EVENTS.labels(model_version=model_label, event="hit").inc(hits)
+
+    yhat = np.array([found[key][0] for key in keys])
+    proba = np.vstack([found[key][1] for key in keys])
+    return yhat, proba
+
+
+def score_uncached(entry, records, is_batch):
+    """Score records through the coalescer (single records) or directly."""
+    if entry.batcher is not None and not is_batch:
+        return entry.batcher.predict(records[0])
+    return score_records(entry, records)
+
+
+def input_frame(data):
+    """Model input DataFrame from records or columns (pandas is imported on first use)."""
+    import pandas as pd
+
+    return pd.DataFrame(data)[REQUIRED_FEATURES]
+
+
+def predict_frame(entry, frame):
+    """Score a model input DataFrame; returns (yhat, proba)."""
+    if entry.engine is not None:
+        return entry.engine.predict_frame(frame)
+    return entry.model.predict(frame), entry.model.predict_proba(frame)
+
+
+def score_records(entry, records):
+    """Score validated records; returns (yhat, proba)."""
+    model_label = entry.version
+    if entry.compiled is not None and len(records) <= FAST_PATH_MAX_ROWS:
+        with stage_timer(model_label, "frame"):
+            X = entry.compiled.transform(records)
+        with stage_timer(model_label, "predict_proba"):
+            return entry.compiled.predict_matrix(X)
+    with stage_timer(model_label, "frame"):
+        input_df = input_frame(records)
+    with stage_timer(model_label, "predict_proba"):
+        return predict_frame(entry, input_df)
+
+
+def run_columnar_prediction(entry, columns, partial=False, compact=False):
+    """
+    Validate and predict a batch given as one array per feature.
+    The compiled pipeline builds the model matrix straight from the arrays;
+    otherwise the columns become a DataFrame without per-record dicts.
+    """
+    start_time = time.time()
+    model_label = entry.version
+
+    with stage_timer(model_label, "validation"):
+        error = check_columns(columns, NUMERICAL_FEATURES, CATEGORICAL_FEATURES)
+        if error:
+            return validation_failed(model_label, error)
+        row_errors = entry.validator.validate_columns(columns)
+    PREDICTION_BATCH_SIZE.labels(model_version=model_label).observe(len(row_errors))
+
+    if partial:
+        indices = [i for i, error in enumerate(row_errors) if error is None]
+        if not indices:
+            return validation_failed(model_label, "No valid records", row_errors=row_errors)
+        if len(indices) < len(row_errors):
+            columns = {f: np.asarray(columns[f])[indices] for f in REQUIRED_FEATURES}
+    else:
+        error = next((e for e in row_errors if e is not None), None)
+        if error:
+            return validation_failed(model_label, error)
+
+    try:
+        if entry.compiled is not None:
+            with stage_timer(model_label, "frame"):
+                X = entry.compiled.transform_columns(columns)
+            with stage_timer(model_label, "predict_proba"):
+                yhat, proba = entry.compiled.predict_matrix(X)
+        else:
+            with stage_timer(model_label, "frame"):
+                input_df = input_frame({f: columns[f] for f in REQUIRED_FEATURES})
+            with stage_timer(model_label, "predict_proba"):
+                yhat, proba = predict_frame(entry, input_df)
+    except Exception as e:
+        return prediction_failed(model_label, e)
+
+    if partial:
+        return partial_response(model_label, start_time, yhat, proba, indices, row_errors,
+                                compact)
+    return prediction_response(model_label, start_time, yhat, proba, True, compact)
+
+
+def validation_failed(model_label, error, status=400, row_errors=None):
+    """Count, log and report a request rejected by validation."""
+    PREDICTION_REQUESTS.labels(model_version=model_label, status="validation_error").inc()
+    logger.warning("Validation failed for %s: %s", model_label, error)
+    body = {"error": error}
+    if row_errors is not None:
+        body["errors"] = indexed_errors(row_errors)
+    return body, status
+
+
+def prediction_failed(model_label, exc):
+    """Count, log and report an exception raised while scoring."""
+    PREDICTION_REQUESTS.labels(model_version=model_label, status="error").inc()
+    logger.error("Prediction failed for %s: %s", model_label, str(exc))
+    return {"error": f"Prediction failed: {str(exc)}"}, 500
+
+
+def select_probabilities(yhat, proba):
+    """Probability of each row's predicted class, gathered in one indexing call."""
+    yhat = np.asarray(yhat)
+    return np.asarray(proba)[np.arange(len(yhat)), yhat]
+
+
+def format_results(model_label, yhat, proba, compact=False):
+    """
+    One result dict per scored row, or with compact=True a single dict of
+    parallel "prediction" and "probability" arrays.
+    """
+    yhat = np.asarray(yhat)
+    probability = select_probabilities(yhat, proba)
+    labels = np.where(yhat == 1, "Yes", "No").tolist()
+    if compact:
+        return {"prediction": labels, "probability": probability, "model_version": model_label}
+    return [{"prediction": label, "probability": p, "model_version": model_label}
+            for label, p in zip(labels, probability.tolist())]
+
+
+def indexed_errors(row_errors):
+    """[{"index": i, "error": message}] for every invalid row."""
+    return [{"index": i, "error": error}
+            for i, error in enumerate(row_errors) if error is not None]
+
+
+def prediction_response(model_label, start_time, yhat, proba, is_batch, compact=False):
+    """Record success metrics and build the JSON response."""
+    duration = time.time() - start_time
+    PREDICTION_REQUESTS.labels(model_version=model_label, status="success").inc()
+    PREDICTION_LATENCY.labels(model_version=model_label).observe(duration)
+
+    with stage_timer(model_label, "response"):
+        results = format_results(model_label, yhat, proba, compact and is_batch)
+
+    logger.info("Prediction successful: %s, %d record(s), %d predicted to churn",
+                model_label, len(yhat), int(np.count_nonzero(np.asarray(yhat) == 1)),
+                extra=SAMPLED)
+
+    return (results if is_batch else results[0]), 200
+
+
+def partial_response(model_label, start_time, yhat, proba, indices, row_errors,
+                     compact=False):
+    """Build a partial-success response: scored rows and rejected rows, by index."""
+    duration = time.time() - start_time
+    errors = indexed_errors(row_errors)
+    status = "partial" if errors else "success"
+    PREDICTION_REQUESTS.labels(model_version=model_label, status=status).inc()
+    PREDICTION_LATENCY.labels(model_version=model_label).observe(duration)
+
+    with stage_timer(model_label, "response"):
+        results = format_results(model_label, yhat, proba, compact)
+    if compact:
+        results["index"] = indices
+    else:
+        for index, result in zip(indices, results):
+            result["index"] = index
+
+    logger.info("Prediction %s: %s, %d record(s) scored, %d rejected",
+                status, model_label, len(indices), len(errors), extra=SAMPLED)
+
+    return {"predictions": results, "errors": errors}, 200
+
+
+def is_json_mimetype(mimetype):
+    """Same rule as Flask's ``request.is_json``."""
+    return mimetype == "application/json" or (
+        mimetype.startswith("application/") and mimetype.endswith("+json"))
+
+
+def parse_flag(value):
+    """Interpret a query-string flag such as ?partial=true."""
+    return (value or "false").lower() in ("1", "true", "yes")
+
+
+def decode_body(model_label, mimetype, raw):
+    """
+    Decode a raw request body according to its Content-Type.
+    Returns (json_data, columns, error): exactly one of them is set, and
+    error is a (body, status) response.
+    """
+    if mimetype in (NPZ_MIMETYPE, ARROW_MIMETYPE):
+        decode = decode_npz if mimetype == NPZ_MIMETYPE else decode_arrow
+        try:
+            with stage_timer(model_label, "decode"):
+                columns = decode(raw)
+        except ImportError as e:
+            logger.warning("%s/predict cannot decode %s: %s", model_label, mimetype, e)
+            return None, None, ({"error": f"Unsupported input format: {e}"}, 415)
+        except Exception as e:
+            return None, None, validation_failed(
+                model_label, f"Could not decode {mimetype} body: {e}")
+        return None, columns, None
+
+    if not is_json_mimetype(mimetype):
+        logger.warning("%s/predict called with unsupported Content-Type %r", model_label, mimetype)
+        return None, None, ({"error": f"Unsupported Content-Type: {mimetype or 'none'}"}, 415)
+
+    try:
+        with stage_timer(model_label, "decode"):
+            json_data = json.loads(raw) if raw else None
+    except ValueError:
+        json_data = None
+        if raw.strip():
+            logger.warning("%s/predict called with malformed JSON", model_label)
+            return None, None, ({"error": "Request body is not valid JSON"}, 400)
+    if not json_data:
+        logger.warning("%s/predict called with no input data", model_label)
+        return None, None, ({"error": "No input data provided"}, 400)
+    return json_data, None, None
+
+
+def predict_body(entry, mimetype, raw, partial=False, compact=False):
+    """Decode a raw request body according to its Content-Type and score it."""
+    json_data, columns, error = decode_body(entry.version, mimetype, raw)
+    if error:
+        return error
+    n_rows = count_rows(json_data, columns)
+    error = too_many_rows(entry.version, n_rows)
+    if error:
+        return error
+    with bulk_slot([entry.version], n_rows) as rejected:
+        if rejected:
+            return rejected
+        if columns is not None:
+            return run_columnar_prediction(entry, columns, partial, compact)
+        return run_prediction(entry, json_data, partial, compact)
+
+
+def unknown_version(version):
+    """404 response for a model version that is not loaded (503 while loading)."""
+    if not models_ready():
+        return {"error": "Models are still loading"}, 503
+    logger.warning("Prediction requested for unknown model version %s", version)
+    return {"error": f"Unknown model version: {version}",
+            "available_versions": registry.versions()}, 404
+
+
+def encode_prediction(body, status, model_label):
+    """Serialise a prediction response body, timing successful ones."""
+    if status != 200:
+        return dumps(body)
+    with stage_timer(model_label, "serialization"):
+        return dumps(body)
+
+
+RESPONSE_SHAPES = ("records", "compact")
+
+
+def predict_version(version, mimetype, raw, partial=False, shape=None):
+    """
+    Score a request body with the given model version. ``shape`` selects
+    the batch response layout: "records" (one object per row, the default)
+    or "compact" (parallel arrays).
+    """
+    entry = registry.get(version)
+    if entry is None:
+        return unknown_version(version)
+    shape = shape or "records"
+    if shape not in RESPONSE_SHAPES:
+        return {"error": f"Unknown response shape: {shape} "
+                         f"(expected one of {', '.join(RESPONSE_SHAPES)})"}, 400
+    with in_flight([version]) as rejected:
+        if rejected:
+            return rejected
+        return predict_body(entry, mimetype, raw, partial, compact=shape == "compact")
+
+
+# ---- Streaming predictions ----
+
+# Records scored per chunk by /<version>/predict/stream. Peak memory grows
+# with this, not with the size of the upload.
+STREAM_CHUNK_ROWS = int(os.environ.get("STREAM_CHUNK_ROWS", 1000))
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+STREAM_MIMETYPES = {NDJSON_MIMETYPE, "application/jsonl", "application/x-jsonlines"}
+
+
+class PredictionStream:
+    """
+    Scores a newline-delimited JSON upload chunk by chunk for one model.
+    Every non-blank input line produces one output line carrying its 0-based
+    ``index``: the prediction, or an ``error`` if the line is malformed or
+    invalid, so one bad record never aborts a long job.
+    """
+
+    def __init__(self, entry, chunk_rows=None):
+        self.entry = entry
+        self.chunk_rows = max(1, chunk_rows or STREAM_CHUNK_ROWS)
+        self.start_time = time.time()
+        self.index = 0
+        self.scored = 0
+        self.rejected = 0
+        self.slots = contextlib.ExitStack()
+
+    def score_lines(self, lines):
+        """Score one chunk of NDJSON lines; returns the NDJSON result bytes."""
+        model_label = self.entry.version
+        PREDICTION_BATCH_SIZE.labels(model_version=model_label).observe(len(lines))
+        records, errors = [], []
+        with stage_timer(model_label, "decode"):
+            for line in lines:
+                try:
+                    records.append(json.loads(line))
+                    errors.append(None)
+                except ValueError:
+                    records.append(None)
+                    errors.append("Line is not valid JSON")
+        with stage_timer(model_label, "validation"):
+            row_errors = self.entry.validator.validate_records(records)
+        errors = [e or r for e, r in zip(errors, row_errors)]
+
+        results = {}
+        valid = [i for i, error in enumerate(errors) if error is None]
+        if valid:
+            try:
+                yhat, proba = score_records(self.entry, [records[i] for i in valid])
+            except Exception as e:
+                logger.error("Prediction failed for %s: %s", model_label, str(e))
+                for i in valid:
+                    errors[i] = f"Prediction failed: {str(e)}"
+            else:
+                results = dict(zip(valid, format_results(model_label, yhat, proba)))
+
+        out = []
+        with stage_timer(model_label, "serialization"):
+            for i, error in enumerate(errors):
+                body = results.get(i) or {"error": error}
+                body["index"] = self.index + i
+                out.append(dumps(body))
+        self.index += len(lines)
+        self.scored += len(results)
+        self.rejected += len(lines) - len(results)
+        return b"".join(out)
+
+    def finish(self):
+        """Record metrics and log once the whole stream has been answered."""
+        model_label = self.entry.version
+        status = "partial" if self.rejected else "success"
+        PREDICTION_REQUESTS.labels(model_version=model_label, status=status).inc()
+        PREDICTION_LATENCY.labels(model_version=model_label).observe(time.time() - self.start_time)
+        logger.info("Stream prediction %s: %s, %d record(s) scored, %d rejected",
+                    status, model_label, self.scored, self.rejected, extra=SAMPLED)
+        self.release()
+
+    def release(self):
+        """Give back the stream's admission slots (safe to call more than once)."""
+        self.slots.close()
+
+
+def open_stream(version, mimetype):
+    """
+    Start a streaming prediction. Returns (PredictionStream, None), or
+    (None, (body, status)) if the version or Content-Type is not accepted or
+    admission control turns the stream away. The stream holds an in-flight
+    and a bulk slot until ``release`` (called by ``finish``).
+    """
+    entry = registry.get(version)
+    if entry is None:
+        return None, unknown_version(version)
+    if mimetype not in STREAM_MIMETYPES:
+        logger.warning("%s/predict/stream called with unsupported Content-Type %r",
+                       version, mimetype)
+        return None, ({"error": f"Unsupported Content-Type: {mimetype or 'none'}, "
+                                f"expected {NDJSON_MIMETYPE}"}, 415)
+    stream = PredictionStream(entry)
+    for kind in ("all", "bulk"):
+        rejected = stream.slots.enter_context(in_flight([version], kind))
+        if rejected:
+            stream.release()
+            return None, rejected
+    return stream, None
+
+
+def iter_line_chunks(lines, size):
+    """Group the non-blank lines of an iterable into lists of at most ``size``."""
+    chunk = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        chunk.append(line)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def stream_predictions(stream, lines):
+    """Yield NDJSON result bytes for every chunk of ``lines``."""
+    try:
+        for chunk in iter_line_chunks(lines, stream.chunk_rows):
+            yield stream.score_lines(chunk)
+    finally:
+        stream.finish()
+
+
+def admin_reload(token, version=None, force=False):
+    """Reload models if ``token`` matches ADMIN_TOKEN; returns (body, status)."""
+    if not ADMIN_TOKEN or token != ADMIN_TOKEN:
+        return {"error": "Forbidden"}, 403
+    summary = reload_models(version, force=force)
+    logger.info("Admin reload: %s", summary)
+    status = 500 if summary["failed"] else 200
+    return {**summary, "versions": registry.versions()}, status
+
+
+def readiness():
+    """
+    Body and status for GET /ready: 200 once models are loaded, else 503.
+    A model file that failed to load keeps it at 503 until a reload succeeds.
+    """
+    if not models_ready():
+        return {"status": "loading"}, 503
+    if registry.failed:
+        return {"status": "model load failed", "failed": dict(registry.failed)}, 503
+    if not len(registry):
+        return {"status": "no models loaded"}, 503
+    return {"status": "ready", "models": registry.versions()}, 200
+
+
+def response_headers(status):
+    """Extra headers for a response: clients should retry 429 and 503 shortly."""
+    if status in (429, 503):
+        return {"Retry-After": "1"}
+    return {}
+
+
+def list_models():
+    """Body for GET /models."""
+    return {"models": [entry.describe() for entry in registry.entries()]}
+
+
+def api_info():
+    """Body for GET /info."""
+    return {
+        "message": "Telco Customer Churn Prediction API",
+        "available_versions": registry.versions(),
+        "endpoints": {
+            "health": "GET /health",
+            "ready": "GET /ready",
+            "info": "GET /info",
+            "predict": "POST /<version>/predict",
+            "predict_models": "POST /predict?models=v1,v2",
+            "predict_stream": "POST /<version>/predict/stream",
+            "models": "GET /models",
+            "docs": "GET /apidocs/",
+            "metrics": "GET /metrics",
+        },
+        "required_input_format": {
+            "numerical_features": NUMERICAL_FEATURES,
+            "categorical_features": CATEGORICAL_FEATURES,
+            "example": {
+                "tenure": 12,
+                "MonthlyCharges": 59.95,
+                "TotalCharges": 720.50,
+                "Contract": "One year",
+                "PaymentMethod": "Electronic check",
+                "OnlineSecurity": "No",
+                "TechSupport": "No",
+                "InternetService": "DSL",
+                "gender": "Female",
+                "SeniorCitizen": "No",
+                "Partner": "Yes",
+                "Dependents": "No",
+                "PhoneService": "Yes",
+                "MultipleLines": "No",
+                "PaperlessBilling": "Yes",
+                "OnlineBackup": "Yes",
+                "DeviceProtection": "No",
+                "StreamingTV": "No",
+                "StreamingMovies": "No",
+            },
+        },
+    }
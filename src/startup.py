@@ -0,0 +1,128 @@
+"""
+startup.py — Cold-start report and OpenAPI spec export for the prediction API.
+
+Report mode starts a fresh interpreter that imports app.py under
+``python -X importtime`` and waits for the readiness gate, then reports how long
+the import took, how long until models were loaded, and the modules that
+cost the most to import (grouped by top-level package). Run it once per release (``make startup-report``)
+and compare the JSON reports to track cold start.
+
+``--export-spec`` writes the Swagger/OpenAPI spec that flasgger builds from
+the route docstrings, so FAST_STARTUP=1 deployments can serve it without
+importing flasgger.
+
+Usage:
+    python src/startup.py --output reports/startup.json
+    python src/startup.py --fast --output reports/startup_fast.json
+    python src/startup.py --export-spec apispec.json
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Run in the child interpreter: import the app, then wait for the models.
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app, service
+imported = time.perf_counter() - start
+service._models_ready.wait()
+ready = time.perf_counter() - start
+print(json.dumps({"import_s": imported, "ready_s": ready,
+                  "models": service.registry.versions()}))
+"""
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def parse_importtime(stderr):
+    """
+    Parse ``-X importtime`` output into {package: seconds}, where a
+    package's time is the cumulative time of its most expensive import
+    (normally the first one, which pulls in its submodules).
+    """
+    packages = {}
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match is None:
+            continue
+        _, cumulative, _, name = match.groups()
+        package = name.split(".")[0]
+        packages[package] = max(packages.get(package, 0), int(cumulative) / 1e6)
+    return packages
+
+
+def measure_startup(fast=False, env=None):
+    """Import the app in a fresh interpreter; returns the startup report."""
+    env = dict(os.environ if env is None else env)
+    env["FAST_STARTUP"] = "1" if fast else "0"
+    env.setdefault("LOG_DIR", os.path.abspath(os.path.join(ROOT, "logs")))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=os.path.join(ROOT, "src"), env=env, capture_output=True, text=True, check=True,
+    )
+    report = json.loads(proc.stdout.strip().splitlines()[-1])
+    modules = parse_importtime(proc.stderr)
+    report["fast_startup"] = fast
+    report["slowest_imports"] = dict(sorted(modules.items(), key=lambda kv: -kv[1])[:15])
+    return report
+
+
+def export_spec(path):
+    """Write the OpenAPI spec flasgger generates for app.py to ``path``."""
+    os.environ["FAST_STARTUP"] = "0"
+    sys.path.insert(0, os.path.join(ROOT, "src"))
+    from app import app
+
+    with app.test_client() as client:
+        response = client.get("/apispec_1.json")
+        if response.status_code != 200:
+            raise RuntimeError(f"Spec generation failed with status {response.status_code}")
+        spec = response.get_json()
+    with open(path, "w") as f:
+        json.dump(spec, f, indent=2, sort_keys=True)
+    return spec
+
+
+def print_report(report):
+    mode = "FAST_STARTUP=1" if report["fast_startup"] else "FAST_STARTUP=0"
+    print(f"{mode}: import {report['import_s']:.2f}s, ready {report['ready_s']:.2f}s, "
+          f"models {report['models']}")
+    for name, seconds in report["slowest_imports"].items():
+        print(f"  {seconds * 1000:>8.1f} ms  {name}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure API cold start or export its spec.")
+    parser.add_argument("--fast", action="store_true",
+                        help="Measure with FAST_STARTUP=1 (background model loading)")
+    parser.add_argument("--output", default=None, help="Write the report as JSON")
+    parser.add_argument("--export-spec", default=None, metavar="PATH",
+                        help="Write the OpenAPI spec to PATH instead of measuring")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.export_spec:
+        spec = export_spec(args.export_spec)
+        print(f"Wrote {len(spec.get('paths', {}))} paths to {args.export_spec}")
+        return 0
+
+    report = measure_startup(fast=args.fast)
+    print_report(report)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
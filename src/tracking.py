@@ -0,0 +1,89 @@
+"""
+tracking.py — Background, batched MLflow run logging for tune.py.
+
+``RunLogger`` writes runs from one background thread, in the order they
+were queued, so a tuning loop never waits on the tracking store. Each run
+is created with all of its params and metrics in a single ``log_batch``
+call instead of one request per value. Model artifacts are the expensive
+part, so they are only written for the runs ``log_model`` is called for
+(tune.py calls it for the top-ranked pipelines once the search is done).
+"""
+
+import queue
+import threading
+import time
+
+import mlflow
+from mlflow.entities import Metric, Param
+from mlflow.tracking import MlflowClient
+
+
+class LoggedRun:
+    """A run queued with ``RunLogger.log_run``; ``run_id`` is set once it is written."""
+
+    def __init__(self, run_name):
+        self.run_name = run_name
+        self.run_id = None
+
+
+class RunLogger:
+    """MLflow runs written by a background thread; use as a context manager."""
+
+    def __init__(self, experiment_id):
+        self.experiment_id = experiment_id
+        self.client = MlflowClient()
+        self.errors = []
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._work, name="mlflow-logger", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def log_run(self, run_name, params, metrics):
+        """Queue a finished run; returns its ``LoggedRun`` handle."""
+        run = LoggedRun(run_name)
+        self._queue.put((self._write_run, (run, dict(params), dict(metrics))))
+        return run
+
+    def log_model(self, run, model, artifact_path="model"):
+        """Queue ``model`` as an artifact of a run queued earlier."""
+        self._queue.put((self._write_model, (run, model, artifact_path)))
+
+    def close(self):
+        """Wait until everything queued so far has been written."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _work(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            write, args = task
+            try:
+                write(*args)
+            except Exception as e:
+                # Tracking failures are reported at the end, never raised into tuning
+                self.errors.append(f"{args[0].run_name}: {e}")
+
+    def _write_run(self, run, params, metrics):
+        timestamp = int(time.time() * 1000)
+        created = self.client.create_run(self.experiment_id, run_name=run.run_name)
+        run.run_id = created.info.run_id
+        self.client.log_batch(
+            run.run_id,
+            metrics=[Metric(k, float(v), timestamp, 0) for k, v in metrics.items()],
+            params=[Param(k, str(v)) for k, v in params.items()],
+        )
+        self.client.set_terminated(run.run_id)
+
+    def _write_model(self, run, model, artifact_path):
+        if run.run_id is None:
+            raise RuntimeError("run was not created")
+        with mlflow.start_run(run_id=run.run_id):
+            # Newer MLflow defaults to skops, which refuses to save tree models
+            mlflow.sklearn.log_model(model, artifact_path, serialization_format="cloudpickle")
@@ -11,21 +11,39 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
-from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.ensemble import GradientBoostingClassifier, HistGradientBoostingClassifier
 from sklearn.metrics import accuracy_score, classification_report, f1_score
 
 from utils.config import load_config
 
 
-def build_pipeline(num_cols, model_params):
-    """Construct a pipeline: scale numerics, pass-through the rest, then classify."""
+# Classifiers selectable with model.name in the config
+MODELS = {
+    "GradientBoostingClassifier": GradientBoostingClassifier,
+    "HistGradientBoostingClassifier": HistGradientBoostingClassifier,
+}
+
+
+def build_pipeline(num_cols, model_params, model_name="GradientBoostingClassifier", cat_cols=()):
+    """
+    Construct a pipeline: scale numerics, pass-through the rest, then classify.
+    ``cat_cols`` are the passed-through (label-encoded) columns, in order;
+    HistGradientBoostingClassifier treats them as native categorical features.
+    """
+    if model_name not in MODELS:
+        raise ValueError(f"Unknown model.name {model_name!r} "
+                         f"(expected one of {', '.join(MODELS)})")
+    params = dict(model_params)
+    if model_name == "HistGradientBoostingClassifier" and cat_cols:
+        params.setdefault("categorical_features",
+                          [False] * len(num_cols) + [True] * len(cat_cols))
     preprocessor = ColumnTransformer(
         transformers=[("num", StandardScaler(), num_cols)],
         remainder="passthrough",
     )
     return Pipeline([
         ("preprocessor", preprocessor),
-        ("classifier", GradientBoostingClassifier(**model_params)),
+        ("classifier", MODELS[model_name](**params)),
     ])
 
 
@@ -47,6 +65,7 @@ def main():
     num_cols = cfg["features"]["numerical"]
     test_size = cfg["training"]["test_size"]
     random_state = cfg["training"]["random_state"]
+    model_name = cfg["model"]["name"]
     model_params = cfg["model"]["params"]
 
     # --- MLflow setup ---
@@ -67,13 +86,14 @@ def main():
         # Log parameters
         mlflow.log_param("test_size", test_size)
         mlflow.log_param("random_state", random_state)
-        mlflow.log_param("model", cfg["model"]["name"])
+        mlflow.log_param("model", model_name)
         for k, v in model_params.items():
             mlflow.log_param(f"model_{k}", v)
 
         # Train
         print("Training pipeline ...")
-        pipeline = build_pipeline(num_cols, model_params)
+        cat_cols = [c for c in X_train.columns if c not in num_cols]
+        pipeline = build_pipeline(num_cols, model_params, model_name, cat_cols)
         pipeline.fit(X_train, y_train)
 
         # Evaluate
@@ -0,0 +1,276 @@
+"""
+treeinfer.py — Flattened NumPy inference for the tree ensembles tune.py deploys.
+
+``GradientBoostingClassifier`` and ``RandomForestClassifier`` score a batch by
+validating the input and then walking every tree separately, so for small
+batches the per-call checks and per-tree dispatch cost more than the tree
+walks themselves. ``compile_ensemble`` copies the node tables of all trees
+into one set of flat arrays (feature, threshold, children, leaf value) and
+``FlatEnsemble`` walks every tree for every row at once, one tree level per
+NumPy step. Inputs are rounded to float32 and leaf values are summed in tree
+order exactly as sklearn does, so probabilities are identical to
+``predict_proba``.
+
+``compile_model`` wraps a fitted ``preprocessor → classifier`` pipeline; the
+files written by train.py and tune.py are unchanged and the engine is built
+when a model is loaded. ``compact_pipeline`` swaps the ensemble for its
+``FlatEnsemble`` so the compact form itself can be saved (see
+``artifacts.py --compact``) and served without the sklearn trees, which take
+several times more memory.
+"""
+
+import numpy as np
+
+# Rows walked at once; bounds the (rows × trees) node index matrix.
+CHUNK_ROWS = 4096
+
+
+class FlatEnsemble:
+    """All trees of a fitted ensemble in compact flat arrays, scored together."""
+
+    def __init__(self, kind, classes, trees, learning_rate=1.0, init_raw=0.0):
+        """
+        kind: "gradient_boosting" (binary log-loss) or "random_forest".
+        trees: fitted sklearn ``Tree`` objects, in the estimator's order.
+        """
+        self.kind = kind
+        self.classes = classes
+        self.learning_rate = learning_rate
+        self.init_raw = init_raw
+        self.n_trees = len(trees)
+        # sklearn's gradient boosting rejects NaN inputs; forests route them
+        self.allow_nan = kind == "random_forest"
+
+        # Number every tree's split nodes first and its leaves after all
+        # split nodes, so the split arrays hold no leaf entries and the leaf
+        # values hold no split entries.
+        is_leaf = [tree.children_left == -1 for tree in trees]
+        self.n_internal = sum(int((~leaf).sum()) for leaf in is_leaf)
+        n_nodes = self.n_internal + sum(int(leaf.sum()) for leaf in is_leaf)
+        renumbered, next_split, next_leaf = [], 0, self.n_internal
+        for leaf in is_leaf:
+            ids = np.empty(len(leaf), dtype=np.int64)
+            ids[~leaf] = np.arange(next_split, next_split + int((~leaf).sum()))
+            ids[leaf] = np.arange(next_leaf, next_leaf + int(leaf.sum()))
+            next_split += int((~leaf).sum())
+            next_leaf += int(leaf.sum())
+            renumbered.append(ids)
+
+        index_dtype = np.int16 if n_nodes <= np.iinfo(np.int16).max else np.int32
+        n_features = max([int(tree.feature.max()) + 1 for tree in trees] + [1])
+        feature_dtype = np.uint8 if n_features <= 256 else np.uint16
+
+        splits = [~leaf for leaf in is_leaf]
+        self.roots = np.array([ids[0] for ids in renumbered], dtype=np.intp)
+        self.feature = np.concatenate(
+            [tree.feature[split] for tree, split in zip(trees, splits)]).astype(feature_dtype)
+        self.threshold = _round_down_float32(np.concatenate(
+            [tree.threshold[split] for tree, split in zip(trees, splits)]))
+        self.left = np.concatenate(
+            [ids[tree.children_left[split]] for tree, ids, split in zip(trees, renumbered, splits)]
+        ).astype(index_dtype)
+        self.right = np.concatenate(
+            [ids[tree.children_right[split]] for tree, ids, split in zip(trees, renumbered, splits)]
+        ).astype(index_dtype)
+        missing = [getattr(tree, "missing_go_to_left", None) for tree in trees]
+        if any(m is not None and m[split].any() for m, split in zip(missing, splits)):
+            self.missing_go_to_left = np.concatenate(
+                [m[split] for m, split in zip(missing, splits)]).astype(bool)
+        else:
+            self.missing_go_to_left = None
+        if kind == "gradient_boosting":
+            values = [tree.value[leaf, 0, 0] for tree, leaf in zip(trees, is_leaf)]
+        else:
+            values = [tree.value[leaf, 0, :] for tree, leaf in zip(trees, is_leaf)]
+        self.value = np.concatenate(values).astype(np.float64)
+        self.max_depth = max(tree.max_depth for tree in trees)
+
+    # Lets a FlatEnsemble be the final step of a fitted sklearn Pipeline. It
+    # cannot be trained, so refitting such a pipeline is a usage error.
+    def fit(self, X, y=None):
+        raise TypeError("FlatEnsemble is built from a fitted ensemble by compile_ensemble")
+
+    def __sklearn_is_fitted__(self):
+        return True
+
+    def __sklearn_tags__(self):
+        from sklearn.utils import ClassifierTags, Tags, TargetTags
+
+        return Tags(estimator_type="classifier", target_tags=TargetTags(required=True),
+                    classifier_tags=ClassifierTags())
+
+    @property
+    def nbytes(self):
+        arrays = [self.roots, self.feature, self.threshold, self.left, self.right, self.value]
+        if self.missing_go_to_left is not None:
+            arrays.append(self.missing_go_to_left)
+        return sum(a.nbytes for a in arrays)
+
+    @property
+    def n_nodes(self):
+        return self.n_internal + len(self.value)
+
+    def apply(self, X):
+        """Leaf number (index into ``value``) of every row in every tree."""
+        # sklearn compares float32 inputs against float64 thresholds; the
+        # thresholds are rounded down to float32, which gives the same result
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        flat_X = X.ravel()
+        row_offsets = (np.arange(len(X)) * X.shape[1])[:, None]
+        nodes = np.repeat(self.roots[None, :], len(X), axis=0)
+        has_nan = np.isnan(flat_X).any()
+        if has_nan and not self.allow_nan:
+            raise ValueError("Input X contains NaN")
+        has_nan = has_nan and self.missing_go_to_left is not None
+        for _ in range(self.max_depth):
+            is_split = nodes < self.n_internal
+            # Rows already at a leaf look up an arbitrary split and keep their node
+            split = np.minimum(nodes, self.n_internal - 1)
+            x = flat_X.take(row_offsets + self.feature.take(split))
+            go_left = x <= self.threshold.take(split)
+            if has_nan:
+                go_left |= np.isnan(x) & self.missing_go_to_left.take(split)
+            nodes = np.where(is_split, np.where(go_left, self.left.take(split),
+                                                self.right.take(split)), nodes)
+        return nodes - self.n_internal
+
+    def predict_matrix(self, X):
+        """Return ``(yhat, proba)`` for a preprocessed input matrix."""
+        X = np.asarray(X)
+        if len(X) <= CHUNK_ROWS:
+            return self._predict_chunk(X)
+        parts = [self._predict_chunk(X[i:i + CHUNK_ROWS]) for i in range(0, len(X), CHUNK_ROWS)]
+        return (np.concatenate([yhat for yhat, _ in parts]),
+                np.concatenate([proba for _, proba in parts]))
+
+    def _predict_chunk(self, X):
+        leaf_values = self.value.take(self.apply(X), axis=0)
+        if self.kind == "gradient_boosting":
+            # Same order of operations as sklearn's predict_stages: start from
+            # the init estimator and add learning_rate * value tree by tree
+            steps = np.empty((len(X), self.n_trees + 1))
+            steps[:, 0] = self.init_raw
+            np.multiply(leaf_values, self.learning_rate, out=steps[:, 1:])
+            raw = np.cumsum(steps, axis=1)[:, -1]
+            proba = np.empty((len(X), 2))
+            proba[:, 1] = _expit(raw)
+            proba[:, 0] = 1 - proba[:, 1]
+            return self.classes[(raw >= 0).astype(int)], proba
+
+        # Forest: running sum of the trees' class fractions, then the mean
+        proba = np.cumsum(leaf_values, axis=1)[:, -1]
+        proba /= self.n_trees
+        return self.classes.take(np.argmax(proba, axis=1)), proba
+
+    def predict(self, X):
+        return self.predict_matrix(X)[0]
+
+    def predict_proba(self, X):
+        return self.predict_matrix(X)[1]
+
+
+class FlatPipeline:
+    """A fitted pipeline whose final classifier is scored by a ``FlatEnsemble``."""
+
+    def __init__(self, preprocessor, ensemble):
+        self.preprocessor = preprocessor
+        self.ensemble = ensemble
+
+    def predict_frame(self, df):
+        """Return ``(yhat, proba)`` for a DataFrame of raw features."""
+        return self.ensemble.predict_matrix(self.preprocessor.transform(df))
+
+    def predict(self, df):
+        return self.predict_frame(df)[0]
+
+    def predict_proba(self, df):
+        return self.predict_frame(df)[1]
+
+
+def _round_down_float32(values):
+    """
+    Largest float32 not above each value. For any float32 x,
+    ``x <= value`` exactly when ``x <= result``.
+    """
+    rounded = values.astype(np.float32)
+    above = rounded.astype(np.float64) > values
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+def _expit(x):
+    from scipy.special import expit
+
+    return expit(x)
+
+
+def compile_ensemble(classifier):
+    """
+    Flatten a fitted binary log-loss ``GradientBoostingClassifier`` or a
+    ``RandomForestClassifier``. Returns None for anything else, in which
+    case callers should keep using the sklearn estimator.
+    """
+    # Imported here so the API can start serving before sklearn is loaded
+    from sklearn.dummy import DummyClassifier
+    from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+
+    if isinstance(classifier, GradientBoostingClassifier):
+        if classifier.loss != "log_loss" or classifier.estimators_.shape[1] != 1:
+            return None
+        # Only a "zero" or class-prior init gives the same raw score for every row
+        init = classifier.init_
+        if not (isinstance(init, str) and init == "zero"
+                or isinstance(init, DummyClassifier) and init.strategy == "prior"):
+            return None
+        init_raw = float(classifier._raw_predict_init(
+            np.zeros((1, classifier.n_features_in_)))[0, 0])
+        trees = [estimator.tree_ for estimator in classifier.estimators_[:, 0]]
+        return FlatEnsemble("gradient_boosting", classifier.classes_, trees,
+                            learning_rate=classifier.learning_rate, init_raw=init_raw)
+
+    if isinstance(classifier, RandomForestClassifier):
+        if classifier.n_outputs_ != 1:
+            return None
+        trees = [estimator.tree_ for estimator in classifier.estimators_]
+        return FlatEnsemble("random_forest", classifier.classes_, trees)
+
+    return None
+
+
+def compile_model(pipeline):
+    """
+    Build a ``FlatPipeline`` for a fitted ``Pipeline`` ending in a supported
+    ensemble (or in a ``FlatEnsemble``, for compact models). Returns None if
+    the final step cannot be flattened.
+    """
+    from sklearn.pipeline import Pipeline
+
+    if not isinstance(pipeline, Pipeline) or len(pipeline.steps) < 2:
+        return None
+    classifier = pipeline.steps[-1][1]
+    ensemble = classifier if isinstance(classifier, FlatEnsemble) else compile_ensemble(classifier)
+    if ensemble is None:
+        return None
+    return FlatPipeline(pipeline[:-1], ensemble)
+
+
+def compact_pipeline(pipeline):
+    """
+    The same fitted pipeline with its final ensemble replaced by a
+    ``FlatEnsemble``: float32 thresholds, the narrowest integer types for
+    feature and child indices, and no impurities, sample counts or
+    split-node values. Returns None if the ensemble is not supported.
+    """
+    from sklearn.pipeline import Pipeline
+
+    flat = compile_model(pipeline)
+    if flat is None:
+        return None
+    name = pipeline.steps[-1][0]
+    return Pipeline(pipeline.steps[:-1] + [(name, flat.ensemble)])
+
+
+def is_compact(pipeline):
+    """True for pipelines written by ``compact_pipeline``."""
+    steps = getattr(pipeline, "steps", None)
+    return bool(steps) and isinstance(steps[-1][1], FlatEnsemble)
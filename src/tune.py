@@ -1,24 +1,81 @@
 """
 tune.py — Hyperparameter search across model families.
 Produces deployment-ready pipelines that handle full preprocessing internally.
+
+Grid points are fitted in parallel worker processes (``--n-jobs``, default
+``tuning.n_jobs`` from the config). Each worker receives the preprocessed split
+once, when it starts, rather than with every task; MLflow runs are logged by
+the parent process, in grid order, so results and the saved models are the
+same as with ``--n-jobs 1``.
+
+The preprocessor does not depend on the grid point, so it is fitted once per
+data split and only the classifiers are
+fitted on the transformed matrices. Each result is still a complete
+``preprocessor → classifier`` pipeline. The transformed splits are kept in
+a ``cache`` dict that belongs to the caller of a search, so they are freed
+with it; searches that share one reuse the splits they have in common.
+
+Grid points of a ``warm_start`` family that differ only in their number of
+trees (``n_estimators``, or ``max_iter`` for histogram gradient boosting)
+are fitted as one task: the smallest ensemble is fitted first and the
+larger ones are grown from it by adding trees, snapshotting the model at
+every size. The trees are the same as those of separate fits (sklearn
+keeps the random state across warm starts), so the scores and the saved
+models do not change, but every tree is fitted once.
+
+``HistGradientBoostingClassifier`` bins the inputs and is much faster to
+fit than exact-split gradient boosting on large data. Its pipelines use the
+same preprocessor, and the ordinal category codes are declared as
+categorical features, so the model splits on sets of categories instead of
+treating the codes as ordered numbers.
+
+``--strategy halving`` replaces the exhaustive grid with successive halving:
+every point is fitted on a small stratified sample of the training rows,
+only the best 1/factor move on to a sample ``factor`` times larger, and the
+last candidates (at least two) are fitted on the full training split, from
+which v1 and v2 are saved. ``--time-budget`` ends the rounds early and
+sends the best two straight to the full split.
+
+``--cv-folds K`` ranks the grid by mean F1 over stratified K-fold
+cross-validation on the training split instead of by the single holdout.
+Every (grid group, fold) pair is a separate task; the preprocessed folds are
+placed in shared memory, which the workers map instead of receiving copies.
+The best candidates are then refitted on the whole training split.
+
+MLflow runs are written in the background by ``tracking.RunLogger``; model
+artifacts are written only for the top ``--log-models`` runs.
 """
 
 import argparse
+import contextlib
+import copy
+import functools
+import hashlib
+import itertools
+import math
 import os
 import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product as cartesian_product
+from multiprocessing import shared_memory
+
 import pandas as pd
 import numpy as np
 import mlflow
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import StratifiedKFold, train_test_split
 from sklearn.preprocessing import StandardScaler, OrdinalEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
-from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.ensemble import (
+    GradientBoostingClassifier, HistGradientBoostingClassifier, RandomForestClassifier,
+)
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import accuracy_score, f1_score
 
 from utils.config import load_config
 from preprocess import load_and_clean
+from tracking import RunLogger
 
 
 # --- Column definitions ---
@@ -33,25 +90,35 @@ CAT_COLS = [
 ]
 
 
-def build_deployment_pipeline(classifier, num_cols, cat_cols):
-    """Build a pipeline that accepts cleaned (not encoded) data."""
-    preprocessor = ColumnTransformer(
+def build_preprocessor(num_cols, cat_cols):
+    """Scale numeric columns and ordinal-encode categorical ones."""
+    return ColumnTransformer(
         transformers=[
             ("num", StandardScaler(), num_cols),
             ("cat", OrdinalEncoder(handle_unknown="use_encoded_value",
                                    unknown_value=-1), cat_cols),
         ]
     )
+
+
+def build_deployment_pipeline(classifier, num_cols, cat_cols):
+    """Build a pipeline that accepts cleaned (not encoded) data."""
     return Pipeline([
-        ("preprocessor", preprocessor),
+        ("preprocessor", build_preprocessor(num_cols, cat_cols)),
         ("classifier", classifier),
     ])
 
 
+# Columns of the preprocessor output (numerics first) that hold category codes
+CATEGORICAL_MASK = [False] * len(NUM_COLS) + [True] * len(CAT_COLS)
+
 # --- Candidate models and grids ---
+# "warm_start": the parameter a fitted ensemble can be grown along with warm_start
+# "params": fixed parameters added to every grid point of the family
 CANDIDATES = {
     "GradientBoosting": {
         "class": GradientBoostingClassifier,
+        "warm_start": "n_estimators",
         "grid": {
             "n_estimators": [100, 200],
             "max_depth": [3, 5],
@@ -60,11 +127,24 @@ CANDIDATES = {
     },
     "RandomForest": {
         "class": RandomForestClassifier,
+        "warm_start": "n_estimators",
         "grid": {
             "n_estimators": [100, 200, 300],
             "max_depth": [10, 20, None],
         },
     },
+    "HistGradientBoosting": {
+        "class": HistGradientBoostingClassifier,
+        "warm_start": "max_iter",
+        # Split on the encoded categories as sets, not as ordered numbers;
+        # no early stopping, so max_iter is the number of trees fitted
+        "params": {"categorical_features": CATEGORICAL_MASK, "early_stopping": False},
+        "grid": {
+            "max_iter": [100, 200],
+            "learning_rate": [0.05, 0.1],
+            "max_leaf_nodes": [15, 31],
+        },
+    },
     "LogisticRegression": {
         "class": LogisticRegression,
         "grid": {
@@ -75,9 +155,429 @@ CANDIDATES = {
 }
 
 
+def grid_points(candidates):
+    """Every (model_name, params) combination, in grid order."""
+    points = []
+    for model_name, spec in candidates.items():
+        grid = spec["grid"]
+        keys = list(grid.keys())
+        for combo in cartesian_product(*grid.values()):
+            points.append((model_name, dict(zip(keys, combo))))
+    return points
+
+
+def grown_param(candidates, model_name):
+    """The parameter a family grows along with warm_start, or None."""
+    return candidates[model_name].get("warm_start")
+
+
+def fit_groups(candidates, indices=None):
+    """
+    Grid points (all, or those at ``indices``) grouped into fitting tasks, as
+    (model_name, [(index, params)]) with ``index`` the point's position in
+    grid order. Points of a warm_start family that differ only in its
+    warm_start parameter share a group, sorted by that parameter; every
+    other point is a group of its own.
+    """
+    groups = {}
+    for index, (model_name, params) in enumerate(grid_points(candidates)):
+        if indices is not None and index not in indices:
+            continue
+        grown = grown_param(candidates, model_name)
+        if grown in params:
+            key = (model_name, tuple((k, v) for k, v in params.items() if k != grown))
+        else:
+            key = (model_name, index)
+        groups.setdefault(key, (model_name, []))[1].append((index, params))
+    ordered = []
+    for model_name, members in groups.values():
+        grown = grown_param(candidates, model_name)
+        ordered.append((model_name, sorted(members, key=lambda m: m[1].get(grown, 0))))
+    return ordered
+
+
+def estimated_cost(params):
+    """Rough relative fit time, used to start the slowest tasks first."""
+    n_trees = params.get("n_estimators", params.get("max_iter", 1))
+    return n_trees * (params.get("max_depth") or 32)
+
+
+def split_key(X_train, X_test):
+    """Hash of the feature columns and the contents of both splits."""
+    digest = hashlib.sha256(repr((NUM_COLS, CAT_COLS)).encode())
+    for frame in (X_train, X_test):
+        digest.update(repr(list(frame.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(frame, index=True).values.tobytes())
+    return digest.hexdigest()
+
+
+def preprocess_split(data, cache=None):
+    """
+    Fit the preprocessor on X_train and transform both splits. Returns
+    (preprocessor, Xt_train, Xt_test, y_train, y_test). ``cache`` is a dict
+    owned by the caller, keyed by ``split_key``; a split already in it is
+    not preprocessed again.
+    """
+    X_train, X_test, y_train, y_test = data
+    key = split_key(X_train, X_test) if cache is not None else None
+    cached = cache.get(key) if key is not None else None
+    if cached is None:
+        preprocessor = build_preprocessor(NUM_COLS, CAT_COLS)
+        Xt_train = preprocessor.fit_transform(X_train)
+        cached = (preprocessor, Xt_train, preprocessor.transform(X_test))
+        if cache is not None:
+            cache[key] = cached
+    return (*cached, y_train, y_test)
+
+
+# Preprocessed split of the current worker process, set by _init_worker
+_data = None
+
+
+def _init_worker(data):
+    """Keep the split for this worker's tasks; one BLAS/OpenMP thread per process."""
+    global _data
+    _data = data
+    from threadpoolctl import threadpool_limits
+
+    threadpool_limits(1)
+
+
+def stratified_rows(y, n_rows, random_state):
+    """Sorted indices of a stratified sample of ``n_rows`` entries of ``y``."""
+    rows, _ = train_test_split(np.arange(len(y)), train_size=n_rows,
+                               random_state=random_state, stratify=y)
+    return np.sort(rows)
+
+
+def evaluate_group(model_name, members, random_state, candidates=None, rows=None, split=None):
+    """
+    Fit one group from ``fit_groups`` on the preprocessed ``split`` (default:
+    this process's split), using only the training ``rows`` if given;
+    returns [(index, result)]. A group of several sizes grows one ensemble
+    with warm_start and keeps a copy of it at every size.
+    """
+    preprocessor, Xt_train, Xt_test, y_train, y_test = _data if split is None else split
+    if rows is not None:
+        Xt_train, y_train = Xt_train[rows], y_train[rows]
+    spec = (candidates or CANDIDATES)[model_name]
+    grow = len(members) > 1
+    classifier, fit_seconds, results = None, 0.0, []
+
+    for position, (index, params) in enumerate(members):
+        if classifier is None:
+            classifier = spec["class"](**params, **spec.get("params", {}),
+                                       random_state=random_state)
+            if grow:
+                classifier.set_params(warm_start=True)
+        else:
+            grown = spec["warm_start"]
+            classifier.set_params(**{grown: params[grown]})
+
+        start = time.perf_counter()
+        classifier.fit(Xt_train, y_train)
+        # Time to fit this size from scratch: the trees added so far
+        fit_seconds += time.perf_counter() - start
+
+        fitted = classifier
+        if grow and position < len(members) - 1:
+            fitted = copy.deepcopy(classifier)
+        if grow:
+            fitted.set_params(warm_start=False)
+        yhat = fitted.predict(Xt_test)
+        results.append((index, {
+            "model_name": model_name,
+            "params": params,
+            "accuracy": accuracy_score(y_test, yhat),
+            "f1_score": f1_score(y_test, yhat),
+            "fit_seconds": fit_seconds,
+            "pipeline": Pipeline([("preprocessor", preprocessor), ("classifier", fitted)]),
+        }))
+    return results
+
+
+@contextlib.contextmanager
+def worker_pool(split, n_jobs, max_tasks):
+    """
+    Worker processes holding the preprocessed ``split``. Yields None for
+    n_jobs=1, in which case tasks run in this process.
+    """
+    global _data
+    if n_jobs == 1:
+        _data = split
+        yield None
+        return
+    with ProcessPoolExecutor(max_workers=min(n_jobs, max_tasks), initializer=_init_worker,
+                             initargs=(split,)) as pool:
+        yield pool
+
+
+def run_groups(pool, groups, random_state, candidates, rows=None):
+    """Fit ``groups`` in ``pool``; yields each group's [(index, result)] as it finishes."""
+    if pool is None:
+        for model_name, members in groups:
+            yield evaluate_group(model_name, members, random_state, candidates, rows)
+        return
+    # Slowest tasks first, so no worker is left with a long fit at the end
+    groups = sorted(groups, key=lambda group: -estimated_cost(group[1][-1][1]))
+    futures = [pool.submit(evaluate_group, model_name, members, random_state, candidates, rows)
+               for model_name, members in groups]
+    for future in as_completed(futures):
+        yield future.result()
+
+
+def search(data, random_state, n_jobs=1, candidates=None, on_result=None, cache=None):
+    """
+    Evaluate every grid point of ``candidates`` (default CANDIDATES) on
+    ``data`` = (X_train, X_test, y_train, y_test). With n_jobs > 1 the
+    groups from ``fit_groups`` are fitted in that many worker processes.
+    Results come back in grid order; ``on_result`` is called in the parent
+    with each one, in that order, as soon as it and all earlier points are done.
+    ``cache`` is passed on to ``preprocess_split``.
+    """
+    candidates = candidates or CANDIDATES
+    groups = fit_groups(candidates)
+    results, done = [], {}
+
+    with worker_pool(preprocess_split(data, cache), n_jobs, len(groups)) as pool:
+        for group_results in run_groups(pool, groups, random_state, candidates):
+            done.update(group_results)
+            while len(results) in done:
+                result = done.pop(len(results))
+                if on_result:
+                    on_result(result)
+                results.append(result)
+    return results
+
+
+def halving_search(data, random_state, n_jobs=1, candidates=None, factor=3, min_rows=500,
+                   time_budget=None, on_result=None, cache=None):
+    """
+    Successive halving over the grid points of ``candidates``. Round 0 fits
+    every point on a stratified sample of ``min_rows`` training rows; each
+    round keeps the best 1/``factor`` (at least two) by F1 and multiplies the
+    rows by ``factor``. The round that reaches the full training split, or
+    has two candidates left, is the last. Once ``time_budget`` seconds have
+    passed the best two go straight to the full split.
+
+    ``on_result`` is called with every result of every round, each tagged
+    with its "round" and "n_rows". Returns the last round's results, fitted
+    on the full training split, in grid order.
+    """
+    candidates = candidates or CANDIDATES
+    split = preprocess_split(data, cache)
+    y_train = split[3]
+    n_classes = len(np.unique(y_train))
+    survivors = list(range(len(grid_points(candidates))))
+    n_rows = min_rows
+    start = time.perf_counter()
+
+    with worker_pool(split, n_jobs, len(fit_groups(candidates))) as pool:
+        for round_number in itertools.count():
+            # A stratified sample must leave at least one row of every class out
+            last = len(y_train) - n_rows < n_classes or len(survivors) <= 2
+            n_rows = len(y_train) if last else n_rows
+            rows = None if last else stratified_rows(y_train, n_rows, random_state)
+            scored = {}
+            for group_results in run_groups(pool, fit_groups(candidates, survivors),
+                                            random_state, candidates, rows):
+                scored.update(group_results)
+
+            results = []
+            for index in sorted(scored):
+                result = scored[index]
+                result["round"], result["n_rows"] = round_number, n_rows
+                if on_result:
+                    on_result(result)
+                results.append(result)
+            if last:
+                return results
+
+            ranked = sorted(survivors, key=lambda i: -scored[i]["f1_score"])
+            if time_budget is not None and time.perf_counter() - start >= time_budget:
+                survivors, n_rows = sorted(ranked[:2]), len(y_train)
+            else:
+                survivors = sorted(ranked[:max(2, math.ceil(len(survivors) / factor))])
+                n_rows *= factor
+
+
+class SharedFolds:
+    """
+    Preprocessed CV folds copied once into shared memory blocks. Worker
+    processes receive only ``descriptors`` (block names, shapes and dtypes)
+    and map the arrays with ``attach_fold``.
+    """
+
+    def __init__(self, folds):
+        self._blocks = []
+        self.descriptors = []
+        for preprocessor, *arrays in folds:
+            self.descriptors.append((preprocessor, [self._share(a) for a in arrays]))
+
+    def _share(self, array):
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+        self._blocks.append(block)
+        return block.name, array.shape, array.dtype.str
+
+    def close(self):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+
+
+# Shared memory blocks this worker has mapped, by name
+_attached = {}
+
+
+def attach_fold(descriptor):
+    """The fold (preprocessor, Xt_train, Xt_val, y_train, y_val) as views of shared memory."""
+    preprocessor, arrays = descriptor
+    views = []
+    for name, shape, dtype in arrays:
+        block = _attached.get(name)
+        if block is None:
+            block = _attached[name] = shared_memory.SharedMemory(name=name)
+        views.append(np.ndarray(shape, dtype, buffer=block.buf))
+    return (preprocessor, *views)
+
+
+def fold_scores(fold_number, group_results):
+    """[(index, fold_number, scores)] for results of ``evaluate_group``, without the pipelines."""
+    return [(index, fold_number, {k: result[k] for k in ("accuracy", "f1_score", "fit_seconds")})
+            for index, result in group_results]
+
+
+def evaluate_shared_fold(descriptor, fold_number, model_name, members, random_state,
+                         candidates=None):
+    """Score one group on one CV fold mapped from shared memory (see fold_scores)."""
+    split = attach_fold(descriptor)
+    return fold_scores(fold_number, evaluate_group(model_name, members, random_state,
+                                                   candidates, split=split))
+
+
+def cv_folds(data, n_folds, random_state, cache=None):
+    """Preprocessed stratified K-fold splits of the training data."""
+    X_train, _, y_train, _ = data
+    splitter = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=random_state)
+    return [preprocess_split((X_train.iloc[fit_rows], X_train.iloc[val_rows],
+                              y_train[fit_rows], y_train[val_rows]), cache)
+            for fit_rows, val_rows in splitter.split(X_train, y_train)]
+
+
+def cv_search(data, random_state, n_folds=5, n_jobs=1, candidates=None, refit=2,
+              on_result=None, cache=None):
+    """
+    Rank every grid point of ``candidates`` by F1 over stratified
+    ``n_folds``-fold cross-validation on the training split of ``data``.
+    With n_jobs > 1 each (group, fold) pair is a task for the worker pool
+    and the folds are shared through ``SharedFolds``.
+
+    Returns one result per grid point, in grid order, with the mean
+    "accuracy" and "f1_score" over the folds, "f1_std" and "cv_folds";
+    ``on_result`` is called with each. The ``refit`` best by mean F1 are
+    then refitted on the whole training split and also carry that
+    "pipeline" and its "holdout_f1_score" on the test split.
+    """
+    candidates = candidates or CANDIDATES
+    points = grid_points(candidates)
+    groups = sorted(fit_groups(candidates), key=lambda group: -estimated_cost(group[1][-1][1]))
+    folds = cv_folds(data, n_folds, random_state, cache)
+    scores = {index: [None] * n_folds for index in range(len(points))}
+
+    if n_jobs == 1:
+        for fold_number, fold in enumerate(folds):
+            for model_name, members in groups:
+                group_results = evaluate_group(model_name, members, random_state, candidates,
+                                               split=fold)
+                for index, number, fold_result in fold_scores(fold_number, group_results):
+                    scores[index][number] = fold_result
+    else:
+        shared = SharedFolds(folds)
+        try:
+            with ProcessPoolExecutor(max_workers=min(n_jobs, len(groups) * n_folds),
+                                     initializer=_init_worker, initargs=(None,)) as pool:
+                futures = [pool.submit(evaluate_shared_fold, shared.descriptors[fold_number],
+                                       fold_number, model_name, members, random_state, candidates)
+                           for model_name, members in groups for fold_number in range(n_folds)]
+                for future in as_completed(futures):
+                    for index, number, fold_result in future.result():
+                        scores[index][number] = fold_result
+        finally:
+            shared.close()
+
+    results = []
+    for index, (model_name, params) in enumerate(points):
+        f1s = [fold["f1_score"] for fold in scores[index]]
+        result = {
+            "model_name": model_name,
+            "params": params,
+            "accuracy": float(np.mean([fold["accuracy"] for fold in scores[index]])),
+            "f1_score": float(np.mean(f1s)),
+            "f1_std": float(np.std(f1s)),
+            "fit_seconds": float(np.mean([fold["fit_seconds"] for fold in scores[index]])),
+            "cv_folds": n_folds,
+        }
+        if on_result:
+            on_result(result)
+        results.append(result)
+
+    best = sorted(range(len(results)), key=lambda i: -results[i]["f1_score"])[:refit]
+    refit_groups = fit_groups(candidates, best)
+    with worker_pool(preprocess_split(data, cache), n_jobs, len(refit_groups)) as pool:
+        for group_results in run_groups(pool, refit_groups, random_state, candidates):
+            for index, result in group_results:
+                results[index]["pipeline"] = result["pipeline"]
+                results[index]["holdout_f1_score"] = result["f1_score"]
+    return results
+
+
+def log_result(tracker, result):
+    """
+    Queue one grid point as an MLflow run (called in the parent process).
+    Its handle is kept in ``result["run"]`` so the model can be attached later.
+    """
+    run_name = f"{result['model_name']}_{result['params']}"
+    if "round" in result:
+        run_name += f"_round{result['round']}"
+    params = {"model_family": result["model_name"], **result["params"]}
+    for k in ("round", "n_rows", "cv_folds"):
+        if k in result:
+            params[k] = result[k]
+    metrics = {k: result[k] for k in ("accuracy", "f1_score", "f1_std", "fit_seconds")
+               if k in result}
+    result["run"] = tracker.log_run(run_name, params, metrics)
+    rows = f" [{result['n_rows']} rows]" if "n_rows" in result else ""
+    spread = f" ± {result['f1_std']:.4f}" if "f1_std" in result else ""
+    print(f"  {result['model_name']} {result['params']}{rows} → "
+          f"acc={result['accuracy']:.4f}  f1={result['f1_score']:.4f}{spread}")
+
+
+def resolve_n_jobs(n_jobs):
+    """-1 (or 0) means one worker per CPU."""
+    return n_jobs if n_jobs > 0 else os.cpu_count() or 1
+
+
 def parse_args():
     parser = argparse.ArgumentParser(description="Hyperparameter search.")
     parser.add_argument("--config", default="config/default.yaml")
+    parser.add_argument("--n-jobs", type=int, default=None,
+                        help="Worker processes (-1 = all CPUs; default: tuning.n_jobs in the config)")
+    parser.add_argument("--strategy", choices=["grid", "halving"], default=None,
+                        help="Exhaustive grid or successive halving (default: tuning.strategy)")
+    parser.add_argument("--halving-factor", type=int, default=None,
+                        help="Halving: keep the best 1/factor per round and grow rows by factor")
+    parser.add_argument("--min-rows", type=int, default=None,
+                        help="Halving: training rows in the first round")
+    parser.add_argument("--time-budget", type=float, default=None,
+                        help="Halving: seconds after which the best two go to the full split")
+    parser.add_argument("--cv-folds", type=int, default=None,
+                        help="Rank by mean F1 over K-fold cross-validation (0 = single holdout; "
+                             "default: tuning.cv_folds)")
+    parser.add_argument("--log-models", type=int, default=None,
+                        help="Write the model artifact for the top K runs only "
+                             "(-1 = every ranked run; default: tuning.log_models)")
     return parser.parse_args()
 
 
@@ -86,7 +586,7 @@ def main():
     cfg = load_config(args.config)
 
     mlflow.set_tracking_uri(os.environ.get("MLFLOW_TRACKING_URI", cfg["mlflow"]["tracking_uri"]))
-    mlflow.set_experiment("churn-tuning")
+    experiment = mlflow.set_experiment("churn-tuning")
 
     # Load raw data and apply cleaning only (no encoding)
     raw_path = cfg["paths"]["raw_data"]
@@ -102,54 +602,61 @@ def main():
         stratify=y,
     )
 
-    results = []
+    tuning = cfg.get("tuning", {})
 
-    for model_name, spec in CANDIDATES.items():
-        print(f"\n--- {model_name} ---")
-        grid = spec["grid"]
+    def setting(arg, key, default):
+        return arg if arg is not None else tuning.get(key, default)
 
-        # Generate all combinations
-        from itertools import product as cartesian_product
-        keys = list(grid.keys())
-        for combo in cartesian_product(*grid.values()):
-            params = dict(zip(keys, combo))
-            classifier = spec["class"](**params, random_state=cfg["training"]["random_state"])
-            pipeline = build_deployment_pipeline(classifier, NUM_COLS, CAT_COLS)
-
-            with mlflow.start_run(run_name=f"{model_name}_{params}"):
-                mlflow.log_param("model_family", model_name)
-                for k, v in params.items():
-                    mlflow.log_param(k, v)
-
-                pipeline.fit(X_train, y_train)
-                yhat = pipeline.predict(X_test)
-
-                acc = accuracy_score(y_test, yhat)
-                f1 = f1_score(y_test, yhat)
-
-                mlflow.log_metric("accuracy", acc)
-                mlflow.log_metric("f1_score", f1)
-                mlflow.sklearn.log_model(pipeline, "model")
-
-                print(f"  {params} → acc={acc:.4f}  f1={f1:.4f}")
-                results.append({
-                    "model_name": model_name,
-                    "params": params,
-                    "accuracy": acc,
-                    "f1_score": f1,
-                    "pipeline": pipeline,
-                })
-
-    # Rank by F1 and save top two
-    results.sort(key=lambda r: r["f1_score"], reverse=True)
-
-    for rank, label in [(0, "v1"), (1, "v2")]:
-        best = results[rank]
-        out_path = f"models/model_{label}.pkl"
-        with open(out_path, "wb") as f:
-            pickle.dump(best["pipeline"], f)
-        print(f"\nSaved {label}: {best['model_name']} "
-              f"(f1={best['f1_score']:.4f}) → {out_path}")
+    n_jobs = resolve_n_jobs(setting(args.n_jobs, "n_jobs", 1))
+    strategy = setting(args.strategy, "strategy", "grid")
+    n_points, n_groups = len(grid_points(CANDIDATES)), len(fit_groups(CANDIDATES))
+    print(f"Evaluating {n_points} grid points ({strategy}, {n_groups} fits per round) "
+          f"with {n_jobs} worker process(es)")
+
+    data = (X_train, X_test, y_train, y_test)
+    random_state = cfg["training"]["random_state"]
+    log_models = setting(args.log_models, "log_models", 2)
+    n_folds = setting(args.cv_folds, "cv_folds", 0)
+    if n_folds and strategy == "halving":
+        raise SystemExit("--cv-folds cannot be combined with --strategy halving")
+
+    with RunLogger(experiment.experiment_id) as tracker:
+        on_result = functools.partial(log_result, tracker)
+        start = time.perf_counter()
+        if strategy == "halving":
+            results = halving_search(
+                data, random_state, n_jobs=n_jobs, on_result=on_result,
+                factor=setting(args.halving_factor, "halving_factor", 3),
+                min_rows=setting(args.min_rows, "min_rows", 500),
+                time_budget=setting(args.time_budget, "time_budget", None),
+            )
+        elif n_folds:
+            refit = n_points if log_models < 0 else max(2, log_models)
+            results = cv_search(data, random_state, n_folds=n_folds, n_jobs=n_jobs,
+                                refit=refit, on_result=on_result)
+        else:
+            results = search(data, random_state, n_jobs=n_jobs, on_result=on_result)
+        print(f"\nSearch took {time.perf_counter() - start:.1f}s")
+
+        # Rank by F1 and save top two
+        results.sort(key=lambda r: r["f1_score"], reverse=True)
+
+        for rank, label in [(0, "v1"), (1, "v2")]:
+            best = results[rank]
+            out_path = f"models/model_{label}.pkl"
+            with open(out_path, "wb") as f:
+                pickle.dump(best["pipeline"], f)
+            holdout = (f", holdout f1={best['holdout_f1_score']:.4f}"
+                       if "holdout_f1_score" in best else "")
+            print(f"\nSaved {label}: {best['model_name']} "
+                  f"(f1={best['f1_score']:.4f}{holdout}) → {out_path}")
+
+        for result in results if log_models < 0 else results[:log_models]:
+            tracker.log_model(result["run"], result["pipeline"])
+        print("\nWaiting for MLflow logging to finish ...")
+
+    for error in tracker.errors:
+        print(f"MLflow logging failed for {error}")
 
 
 if __name__ == "__main__":
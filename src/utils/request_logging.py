@@ -0,0 +1,111 @@
+"""
+request_logging.py — Non-blocking, sampled logging for the prediction API.
+
+Request threads only put log records on a queue; a background
+``QueueListener`` writes them to the console and the log file. Routine
+success messages, logged with ``extra=SAMPLED``, can be sampled, and long
+messages are truncated before they are queued. Warnings and errors are never
+sampled, and when the queue is full they wait for room instead of being
+dropped.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Pass as ``extra=SAMPLED`` to mark a message as subject to sampling
+SAMPLED = {"sampled": True}
+
+
+class SamplingFilter(logging.Filter):
+    """Sample routine success messages and truncate long messages."""
+
+    def __init__(self, sample_rate=1.0, max_chars=2000):
+        """
+        sample_rate: fraction of ``SAMPLED`` records below WARNING to keep.
+        max_chars: truncate messages longer than this (0 disables).
+        """
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.max_chars = max_chars
+
+    def filter(self, record):
+        if (record.levelno < logging.WARNING and getattr(record, "sampled", False)
+                and self.sample_rate < 1.0 and random.random() >= self.sample_rate):
+            return False
+        if self.max_chars:
+            message = record.getMessage()
+            if len(message) > self.max_chars:
+                record.msg = (f"{message[:self.max_chars]}... "
+                              f"[{len(message) - self.max_chars} more chars]")
+                record.args = None
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler for a bounded queue: records below WARNING are dropped (and
+    counted) when the queue is full, so a stalled disk never blocks a
+    request; warnings and errors wait for room.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        if record.levelno >= logging.WARNING:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _start_listener(handler, targets, queue_size):
+    handler.queue = queue.Queue(queue_size)
+    listener = logging.handlers.QueueListener(handler.queue, *targets,
+                                              respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def configure_logging(log_dir, use_queue=True, sample_rate=1.0, max_chars=2000,
+                      queue_size=10000, logger=None):
+    """
+    Log to the console and ``<log_dir>/api.log`` at INFO level. Like
+    ``logging.basicConfig`` this does nothing if ``logger`` (the root logger
+    by default) already has handlers. Returns the installed handler or None.
+    """
+    logger = logger or logging.getLogger()
+    if logger.handlers:
+        return None
+
+    os.makedirs(log_dir, exist_ok=True)
+    formatter = logging.Formatter(LOG_FORMAT)
+    targets = [logging.StreamHandler(), logging.FileHandler(os.path.join(log_dir, "api.log"))]
+    for target in targets:
+        target.setFormatter(formatter)
+
+    if use_queue:
+        handler = NonBlockingQueueHandler(queue.Queue(queue_size))
+        _start_listener(handler, targets, queue_size)
+        # The listener thread does not survive a fork (gunicorn --preload):
+        # give every child process its own queue and listener.
+        os.register_at_fork(after_in_child=lambda: _start_listener(handler, targets, queue_size))
+        handlers = [handler]
+    else:
+        handlers = targets
+
+    for handler in handlers:
+        handler.addFilter(SamplingFilter(sample_rate, max_chars))
+        logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    return handlers[0]
@@ -0,0 +1,121 @@
+"""
+validation.py — Column-wise schema validation for prediction batches.
+
+``SchemaValidator`` checks a whole batch one feature at a time: presence,
+numeric/string types and, when built from a loaded model, the category
+vocabulary its OrdinalEncoder was fitted on. Each check first tests the whole
+column at once and only walks individual rows when the column contains a
+problem, so valid batches never pay a per-record cost.
+
+Validation returns one error message (or None) per row, which lets callers
+either reject the batch on the first bad row or score the valid rows only.
+"""
+
+from collections import defaultdict
+
+import numpy as np
+
+NUMBER_TYPES = {int, float, bool}
+
+_MISSING = object()
+
+
+def vocabulary_from_pipeline(pipeline):
+    """
+    Return {categorical feature: set of known categories} taken from the
+    OrdinalEncoder of a fitted deployment pipeline, or None if there is none.
+    """
+    from sklearn.compose import ColumnTransformer
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OrdinalEncoder
+
+    if not isinstance(pipeline, Pipeline):
+        return None
+    preprocessor = pipeline.steps[0][1]
+    if not isinstance(preprocessor, ColumnTransformer):
+        return None
+
+    for _, transformer, cols in preprocessor.transformers_:
+        if isinstance(transformer, OrdinalEncoder):
+            return {col: set(categories.tolist())
+                    for col, categories in zip(cols, transformer.categories_)}
+    return None
+
+
+class SchemaValidator:
+    """Validates record batches and columnar batches against the API schema."""
+
+    def __init__(self, numerical_features, categorical_features, vocabulary=None):
+        self.numerical_features = list(numerical_features)
+        self.categorical_features = list(categorical_features)
+        self.required_features = self.numerical_features + self.categorical_features
+        self.vocabulary = vocabulary or {}
+
+    def validate_records(self, records):
+        """Return a list with an error message (or None) for every record."""
+        n = len(records)
+        errors = [None] * n
+
+        for i, record in enumerate(records):
+            if not isinstance(record, dict):
+                errors[i] = "Each record must be a JSON object"
+        rows = [r if isinstance(r, dict) else {} for r in records]
+
+        columns = {f: [r.get(f, _MISSING) for r in rows] for f in self.required_features}
+
+        missing = defaultdict(list)
+        for feat, col in columns.items():
+            if col.count(_MISSING):
+                for i, value in enumerate(col):
+                    if value is _MISSING:
+                        missing[i].append(feat)
+        for i, feats in missing.items():
+            if errors[i] is None:
+                errors[i] = f"Missing required features: {', '.join(feats)}"
+
+        for feat in self.numerical_features:
+            col = columns[feat]
+            if not set(map(type, col)) <= NUMBER_TYPES:
+                for i, value in enumerate(col):
+                    if errors[i] is None and type(value) not in NUMBER_TYPES:
+                        errors[i] = (f"Invalid type for {feat}: expected a number, "
+                                     f"got {type(value).__name__}")
+
+        for feat in self.categorical_features:
+            col = columns[feat]
+            if not set(map(type, col)) <= {str}:
+                for i, value in enumerate(col):
+                    if errors[i] is None and type(value) is not str:
+                        errors[i] = (f"Invalid type for {feat}: expected a string, "
+                                     f"got {type(value).__name__}")
+
+        for feat, known in self.vocabulary.items():
+            col = columns[feat]
+            if not {v for v in col if type(v) is str} <= known:
+                for i, value in enumerate(col):
+                    if errors[i] is None and value not in known:
+                        errors[i] = self._unknown_category(feat, value)
+
+        return errors
+
+    def validate_columns(self, columns):
+        """
+        Return a list with an error message (or None) for every row of an
+        already type-checked columnar batch (see ``formats.check_columns``).
+        Only the category vocabulary can fail per row here.
+        """
+        n = len(columns[self.required_features[0]])
+        errors = [None] * n
+
+        for feat, known in self.vocabulary.items():
+            values = np.asarray(columns[feat], dtype=str)
+            ok = np.isin(values, np.asarray(sorted(known), dtype=str))
+            for i in np.flatnonzero(~ok):
+                if errors[i] is None:
+                    errors[i] = self._unknown_category(feat, str(values[i]))
+
+        return errors
+
+    def _unknown_category(self, feat, value):
+        allowed = ", ".join(sorted(self.vocabulary[feat]))
+        return f"Invalid value for {feat}: {value!r} is not one of {allowed}"
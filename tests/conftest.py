@@ -0,0 +1,77 @@
+"""
+conftest.py — Fixture models and log directory for the test suite.
+
+service.py loads every model in MODEL_DIR when it is first imported, so the
+models are trained on synthetic data into a temporary directory before any
+test module is collected. Logs go to the same temporary directory.
+"""
+
+import os
+import pickle
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+
+from tune import CAT_COLS, NUM_COLS, build_deployment_pipeline
+
+# Category values of the Telco churn data set, as the API validates them
+VOCABULARY = {
+    "gender": ["Female", "Male"],
+    "MultipleLines": ["No", "No phone service", "Yes"],
+    "InternetService": ["DSL", "Fiber optic", "No"],
+    "Contract": ["Month-to-month", "One year", "Two year"],
+    "PaymentMethod": ["Bank transfer (automatic)", "Credit card (automatic)",
+                      "Electronic check", "Mailed check"],
+    **{col: ["No", "No internet service", "Yes"] for col in [
+        "OnlineSecurity", "OnlineBackup", "DeviceProtection",
+        "TechSupport", "StreamingTV", "StreamingMovies"]},
+}
+
+FIXTURE_MODELS = {
+    "v1": GradientBoostingClassifier(n_estimators=50, random_state=0),
+    "v2": RandomForestClassifier(n_estimators=50, max_depth=8, random_state=0),
+}
+
+_tmp_dir = None
+
+
+def _training_frame(n=400, seed=0):
+    """Synthetic cleaned customers with churn driven by tenure and contract."""
+    rng = np.random.RandomState(seed)
+    df = pd.DataFrame({
+        "tenure": rng.randint(1, 72, n),
+        "MonthlyCharges": rng.uniform(20, 100, n),
+        "TotalCharges": rng.uniform(100, 5000, n),
+    })
+    for col in CAT_COLS:
+        df[col] = rng.choice(VOCABULARY.get(col, ["No", "Yes"]), n)
+    churn = (df["tenure"] < 24) & (df["Contract"] == "Month-to-month")
+    y = (churn | (rng.uniform(size=n) < 0.1)).astype(int).to_numpy()
+    return df, y
+
+
+def write_fixture_models(model_dir):
+    """Train the fixture models and save them as ``model_<version>.pkl``."""
+    df, y = _training_frame()
+    for version, classifier in FIXTURE_MODELS.items():
+        pipeline = build_deployment_pipeline(classifier, NUM_COLS, CAT_COLS).fit(df, y)
+        with open(os.path.join(model_dir, f"model_{version}.pkl"), "wb") as f:
+            pickle.dump(pipeline, f)
+
+
+def pytest_configure(config):
+    global _tmp_dir
+    _tmp_dir = tempfile.mkdtemp(prefix="churn-tests-")
+    model_dir = os.path.join(_tmp_dir, "models")
+    os.makedirs(model_dir)
+    write_fixture_models(model_dir)
+    os.environ["MODEL_DIR"] = model_dir
+    os.environ["LOG_DIR"] = os.path.join(_tmp_dir, "logs")
+
+
+def pytest_unconfigure(config):
+    if _tmp_dir is not None:
+        shutil.rmtree(_tmp_dir, ignore_errors=True)
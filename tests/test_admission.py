@@ -0,0 +1,23 @@
+"""
+test_admission.py — Tests for the in-flight limiter used for load shedding.
+"""
+
+from admission import InFlightLimiter
+
+
+def test_limiter_rejects_at_limit_per_key():
+    limiter = InFlightLimiter(2)
+    assert limiter.try_acquire("v1") and limiter.try_acquire("v1")
+    assert not limiter.try_acquire("v1")
+    assert limiter.try_acquire("v2")
+    limiter.release("v1")
+    assert limiter.in_flight("v1") == 1
+    assert limiter.try_acquire("v1")
+
+
+def test_limiter_zero_is_unlimited():
+    limiter = InFlightLimiter(0)
+    assert all(limiter.try_acquire("v1") for _ in range(100))
+    for _ in range(100):
+        limiter.release("v1")
+    assert limiter.in_flight("v1") == 0
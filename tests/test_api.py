@@ -2,8 +2,17 @@
 test_api.py — Automated tests for the Flask API endpoints.
 """
 
+import io
+import json
+import os
+import sys
+import threading
+import numpy as np
 import pytest
+import service
+import src.app as app_module
 from src.app import app as flask_app
+from cache import PredictionCache
 
 
 @pytest.fixture
@@ -102,6 +111,224 @@ def test_v2_single_prediction(client):
     assert response.json["prediction"] in ("Yes", "No")
 
 
+def test_v1_unknown_category(client):
+    """Categories the model was not fitted on are rejected."""
+    bad = VALID_PAYLOAD.copy()
+    bad["Contract"] = "Ten year"
+    response = client.post("/v1/predict", json=bad)
+    assert response.status_code == 400
+    assert "Invalid value for Contract" in response.json["error"]
+
+
+def test_v1_partial_batch(client):
+    """With ?partial=true valid rows are scored and invalid ones reported by index."""
+    bad = VALID_PAYLOAD.copy()
+    bad["tenure"] = "twelve"
+    response = client.post("/v1/predict?partial=true",
+                           json=[VALID_PAYLOAD, bad, VALID_PAYLOAD])
+    assert response.status_code == 200
+    assert [p["index"] for p in response.json["predictions"]] == [0, 2]
+    assert response.json["errors"][0]["index"] == 1
+    assert "Invalid type for tenure" in response.json["errors"][0]["error"]
+
+
+def test_v1_prediction_cache(client, monkeypatch):
+    """Repeated rows are served from the cache with the same result."""
+    entry = app_module.registry.get("v1")
+    monkeypatch.setattr(entry, "cache", PredictionCache(max_entries=10))
+    first = client.post("/v1/predict", json=[VALID_PAYLOAD, VALID_PAYLOAD])
+    second = client.post("/v1/predict", json=VALID_PAYLOAD)
+    assert first.status_code == 200 and second.status_code == 200
+    assert first.json[0] == first.json[1] == second.json
+    assert len(entry.cache) == 1
+    metrics = client.get("/metrics").data
+    assert b'prediction_cache_events_total{event="hit",model_version="v1"}' in metrics
+
+
+def test_v1_compact_batch(client):
+    """?shape=compact returns parallel arrays with the same values."""
+    bad = VALID_PAYLOAD.copy()
+    bad["Contract"] = "Decade"
+    records = client.post("/v1/predict", json=[VALID_PAYLOAD, VALID_PAYLOAD]).json
+    response = client.post("/v1/predict?shape=compact", json=[VALID_PAYLOAD, VALID_PAYLOAD])
+    assert response.status_code == 200
+    assert response.json["prediction"] == [r["prediction"] for r in records]
+    assert response.json["probability"] == [r["probability"] for r in records]
+    assert response.json["model_version"] == "v1"
+
+    partial = client.post("/v1/predict?shape=compact&partial=true",
+                          json=[bad, VALID_PAYLOAD]).json
+    assert partial["predictions"]["index"] == [1]
+    assert partial["errors"][0]["index"] == 0
+
+
+def test_v1_unknown_shape(client):
+    response = client.post("/v1/predict?shape=columns", json=VALID_PAYLOAD)
+    assert response.status_code == 400
+
+
+# ---- Columnar batch formats ----
+
+def _columns(n):
+    """VALID_PAYLOAD repeated n times, one list per feature."""
+    return {k: [v] * n for k, v in VALID_PAYLOAD.items()}
+
+
+def test_v1_columnar_json(client):
+    """POST /v1/predict with one array per feature returns a list."""
+    response = client.post("/v1/predict", json=_columns(3))
+    assert response.status_code == 200
+    assert len(response.json) == 3
+    single = client.post("/v1/predict", json=VALID_PAYLOAD).json
+    assert response.json[0] == single
+
+
+def test_v1_columnar_json_wrong_type(client):
+    """Columnar JSON with a string in a numeric column returns 400."""
+    columns = _columns(2)
+    columns["tenure"] = [12, "twelve"]
+    response = client.post("/v1/predict", json=columns)
+    assert response.status_code == 400
+    assert "Invalid type for tenure" in response.json["error"]
+
+
+def test_v2_npz_batch(client):
+    """POST /v2/predict accepts a NumPy .npz archive."""
+    buf = io.BytesIO()
+    np.savez(buf, **{k: np.asarray(v) for k, v in _columns(4).items()})
+    response = client.post("/v2/predict", data=buf.getvalue(),
+                           content_type="application/x-npz")
+    assert response.status_code == 200
+    assert len(response.json) == 4
+    assert response.json[0]["model_version"] == "v2"
+
+
+def test_v1_arrow_batch(client):
+    """POST /v1/predict accepts an Arrow IPC stream."""
+    pa = pytest.importorskip("pyarrow")
+    table = pa.table(_columns(2))
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    response = client.post("/v1/predict", data=sink.getvalue().to_pybytes(),
+                           content_type="application/vnd.apache.arrow.stream")
+    assert response.status_code == 200
+    assert len(response.json) == 2
+
+
+def test_arrow_batch_without_pyarrow(client, monkeypatch):
+    """Without pyarrow, Arrow bodies are an unsupported format (415), not invalid input."""
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    response = client.post("/v1/predict", data=b"arrow",
+                           content_type="application/vnd.apache.arrow.stream")
+    assert response.status_code == 415
+    assert "requires the pyarrow package" in response.json["error"]
+
+
+# ---- Streaming predictions ----
+
+def test_v1_predict_stream(client, monkeypatch):
+    """NDJSON in, one NDJSON result per line out, scored in chunks."""
+    monkeypatch.setattr(service, "STREAM_CHUNK_ROWS", 2)
+    bad = VALID_PAYLOAD.copy()
+    bad["tenure"] = "twelve"
+    lines = [json.dumps(VALID_PAYLOAD), "{not json", "", json.dumps(bad), json.dumps(VALID_PAYLOAD)]
+    response = client.post("/v1/predict/stream", data="\n".join(lines) + "\n",
+                           content_type="application/x-ndjson")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    results = [json.loads(line) for line in response.data.splitlines()]
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    single = client.post("/v1/predict", json=VALID_PAYLOAD).json
+    assert {k: results[0][k] for k in single} == single
+    assert results[1]["error"] == "Line is not valid JSON"
+    assert "Invalid type for tenure" in results[2]["error"]
+    assert results[3]["prediction"] == single["prediction"]
+
+
+def test_predict_stream_rejects_json_content_type(client):
+    """The streaming endpoint only accepts NDJSON bodies."""
+    response = client.post("/v1/predict/stream", json=VALID_PAYLOAD)
+    assert response.status_code == 415
+
+
+# ---- Model registry ----
+
+def test_unknown_version(client):
+    """POST to a version that is not loaded returns 404."""
+    response = client.post("/v9/predict", json=VALID_PAYLOAD)
+    assert response.status_code == 404
+    assert "v1" in response.json["available_versions"]
+
+
+def test_ready_gate(client, monkeypatch):
+    """/ready and predictions return 503 with Retry-After until models are loaded."""
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert "v1" in response.json["models"]
+
+    monkeypatch.setattr(service, "_models_ready", service.threading.Event())
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    response = client.post("/v9/predict", json=VALID_PAYLOAD)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_ready_reports_failed_load(client):
+    """A model file that fails to load keeps /ready at 503 until it is fixed."""
+    bad_path = os.path.join(service.MODEL_DIR, "model_vbad.pkl")
+    with open(bad_path, "wb") as f:
+        f.write(b"not a pickle")
+    try:
+        assert service.reload_models("vbad")["failed"]
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert "vbad" in response.json["failed"]
+    finally:
+        os.remove(bad_path)
+    service.reload_models("vbad")
+    assert client.get("/ready").status_code == 200
+
+
+def test_coalescer_timeout_is_503(client, monkeypatch):
+    """A coalesced record that is never scored gets 503 instead of hanging."""
+    from coalescer import MicroBatcher
+
+    entry = service.registry.get("v1")
+    stalled = MicroBatcher("v1", lambda records: threading.Event().wait(1), window=0.001,
+                           timeout=0.01)
+    monkeypatch.setattr(entry, "batcher", stalled)
+    monkeypatch.setattr(entry, "cache", None)
+    response = client.post("/v1/predict", json=VALID_PAYLOAD)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert "not scored" in response.json["error"]
+
+
+def test_models_endpoint(client):
+    """GET /models lists the loaded versions."""
+    response = client.get("/models")
+    assert response.status_code == 200
+    versions = [m["version"] for m in response.json["models"]]
+    assert "v1" in versions and "v2" in versions
+
+
+def test_admin_reload_requires_token(client, monkeypatch):
+    """Reload is refused without the admin token and swaps models with it."""
+    monkeypatch.setattr(service, "ADMIN_TOKEN", "secret")
+    assert client.post("/admin/reload").status_code == 403
+
+    before = app_module.registry.get("v1")
+    response = client.post("/admin/models/v1/reload?force=true",
+                           headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.json["loaded"] == ["v1"]
+    assert app_module.registry.get("v1") is not before
+    assert client.post("/v1/predict", json=VALID_PAYLOAD).status_code == 200
+
+
 # ---- Step 11: Info / documentation ----
 
 def test_info(client):
@@ -129,3 +356,73 @@ def test_custom_prediction_counter(client):
     client.post("/v1/predict", json=VALID_PAYLOAD)
     response = client.get("/metrics")
     assert b"prediction_requests_total" in response.data
+
+
+def test_stage_and_batch_size_metrics(client):
+    """A batch prediction records per-stage latencies and its batch size."""
+    client.post("/v2/predict", json=[VALID_PAYLOAD] * 3)
+    metrics = client.get("/metrics").data
+    for stage in (b"decode", b"validation", b"frame", b"predict_proba", b"serialization"):
+        assert (b'prediction_stage_duration_seconds_count{model_version="v2",stage="'
+                + stage + b'"}') in metrics
+    assert b'prediction_batch_size_bucket{le="5.0",model_version="v2"}' in metrics
+
+
+# ---- Admission control ----
+
+def test_predict_rejects_large_body(client, monkeypatch):
+    """Bodies over MAX_REQUEST_BYTES are refused with 413 before parsing."""
+    monkeypatch.setattr(service, "MAX_REQUEST_BYTES", 1000)
+    response = client.post("/v1/predict", json=[VALID_PAYLOAD] * 10)
+    assert response.status_code == 413
+    assert "exceeds the limit of 1000 bytes" in response.json["error"]
+    assert client.post("/v1/predict", json=VALID_PAYLOAD).status_code == 200
+
+
+def test_predict_rejects_too_many_rows(client, monkeypatch):
+    monkeypatch.setattr(service, "MAX_BATCH_ROWS", 2)
+    response = client.post("/v1/predict", json=[VALID_PAYLOAD] * 3)
+    assert response.status_code == 413
+    assert "Batch of 3 records" in response.json["error"]
+    response = client.post("/predict?models=v1,v2", json=[VALID_PAYLOAD] * 3)
+    assert response.status_code == 413
+
+
+def test_predict_sheds_load_at_in_flight_limit(client, monkeypatch):
+    """A version at its in-flight limit answers 429 with Retry-After."""
+    limiter = service.limiters["all"]
+    monkeypatch.setattr(limiter, "limit", 1)
+    assert limiter.try_acquire("v1")
+    try:
+        response = client.post("/v1/predict", json=VALID_PAYLOAD)
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "1"
+        assert client.post("/v2/predict", json=VALID_PAYLOAD).status_code == 200
+        assert client.post("/predict?models=v1,v2", json=VALID_PAYLOAD).status_code == 429
+    finally:
+        limiter.release("v1")
+    assert client.post("/v1/predict", json=VALID_PAYLOAD).status_code == 200
+    metrics = client.get("/metrics").data
+    assert (b'prediction_rejections_total{model_version="v1",reason="all_in_flight"}'
+            in metrics)
+
+
+def test_bulk_limit_only_applies_to_large_batches(client, monkeypatch):
+    limiter = service.limiters["bulk"]
+    monkeypatch.setattr(service, "BULK_ROWS", 2)
+    monkeypatch.setattr(limiter, "limit", 1)
+    assert limiter.try_acquire("v2")
+    try:
+        assert client.post("/v2/predict", json=[VALID_PAYLOAD] * 2).status_code == 429
+        assert client.post("/v2/predict", json=VALID_PAYLOAD).status_code == 200
+    finally:
+        limiter.release("v2")
+
+
+def test_stream_releases_its_slots(client):
+    body = "\n".join([json.dumps(VALID_PAYLOAD)] * 3) + "\n"
+    response = client.post("/v1/predict/stream", data=body, content_type="application/x-ndjson")
+    assert len(response.data.splitlines()) == 3
+    response.close()
+    assert service.limiters["all"].in_flight("v1") == 0
+    assert service.limiters["bulk"].in_flight("v1") == 0
@@ -0,0 +1,53 @@
+"""Tests for memory-mapped model artifacts."""
+
+import os
+import pickle
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from artifacts import convert, is_artifact, load_artifact, mapped_fraction
+from treeinfer import is_compact
+from tune import build_deployment_pipeline, NUM_COLS, CAT_COLS
+from tests.test_fastpath import _make_frame
+
+
+def test_convert_round_trip(tmp_path, caplog):
+    """A converted pipeline predicts exactly like the pickle and maps its arrays."""
+    df, y = _make_frame(n=200)
+    pipeline = build_deployment_pipeline(
+        RandomForestClassifier(n_estimators=10, random_state=0), NUM_COLS, CAT_COLS
+    ).fit(df, y)
+    pkl_path = tmp_path / "model_v1.pkl"
+    with open(pkl_path, "wb") as f:
+        pickle.dump(pipeline, f)
+
+    out_path = convert(str(pkl_path))
+    assert out_path.endswith(".mmap")
+    assert is_artifact(out_path) and not is_artifact(str(pkl_path))
+
+    loaded = load_artifact(out_path)
+    assert np.array_equal(loaded.predict_proba(df), pipeline.predict_proba(df))
+    # sklearn trees copy their tables on load, so nothing stays shared
+    assert mapped_fraction(out_path) == 0
+    assert "try --compact" in caplog.text
+
+
+def test_compact_convert_round_trip(tmp_path, caplog):
+    """A compact artifact is smaller and still predicts exactly like the pickle."""
+    df, y = _make_frame(n=200)
+    pipeline = build_deployment_pipeline(
+        RandomForestClassifier(n_estimators=10, random_state=0), NUM_COLS, CAT_COLS
+    ).fit(df, y)
+    pkl_path = tmp_path / "model_v1.pkl"
+    with open(pkl_path, "wb") as f:
+        pickle.dump(pipeline, f)
+
+    out_path = convert(str(pkl_path), compact=True)
+    loaded = load_artifact(out_path)
+    assert is_compact(loaded)
+    assert os.path.getsize(out_path) < os.path.getsize(pkl_path)
+    assert np.array_equal(loaded.predict_proba(df), pipeline.predict_proba(df))
+    assert np.array_equal(loaded.predict(df), pipeline.predict(df))
+    assert mapped_fraction(out_path) > 0.5
+    assert "memory-mapped" not in caplog.text
@@ -0,0 +1,92 @@
+"""Tests for the asyncio (ASGI) entry point."""
+
+import json
+
+import pytest
+from starlette.testclient import TestClient
+
+from asgi import app as asgi_app
+from src.app import app as flask_app
+from tests.test_api import VALID_PAYLOAD
+
+
+@pytest.fixture
+def clients():
+    """An ASGI test client and a Flask test client over the same service."""
+    flask_app.config["TESTING"] = True
+    with TestClient(asgi_app) as asgi_client, flask_app.test_client() as flask_client:
+        yield asgi_client, flask_client
+
+
+def test_asgi_health(clients):
+    asgi_client, _ = clients
+    response = asgi_client.get("/health")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ok"
+
+
+@pytest.mark.parametrize("path, payload", [
+    ("/v1/predict", VALID_PAYLOAD),
+    ("/v2/predict", [VALID_PAYLOAD, VALID_PAYLOAD]),
+    ("/v1/predict", {"tenure": 10}),
+    ("/v9/predict", VALID_PAYLOAD),
+    ("/predict?models=v1,v2", [VALID_PAYLOAD, VALID_PAYLOAD]),
+])
+def test_asgi_matches_flask(clients, path, payload):
+    """Both entry points return the same status and the same bytes."""
+    asgi_client, flask_client = clients
+    asgi_response = asgi_client.post(path, json=payload)
+    flask_response = flask_client.post(path, json=payload)
+    assert asgi_response.status_code == flask_response.status_code
+    assert asgi_response.content == flask_response.data
+
+
+def test_asgi_stream_matches_flask(clients):
+    """Streaming responses are identical too, including lines split across reads."""
+    asgi_client, flask_client = clients
+    body = "\n".join([json.dumps(VALID_PAYLOAD)] * 5 + ["[1]"]).encode()
+
+    def chunks():
+        for i in range(0, len(body), 100):
+            yield body[i:i + 100]
+
+    headers = {"Content-Type": "application/x-ndjson"}
+    asgi_response = asgi_client.post("/v2/predict/stream", content=chunks(), headers=headers)
+    flask_response = flask_client.post("/v2/predict/stream", data=body, headers=headers)
+    assert asgi_response.status_code == flask_response.status_code == 200
+    assert asgi_response.content == flask_response.data
+    assert len(flask_response.data.splitlines()) == 6
+
+
+def test_asgi_rejections_match_flask(clients, monkeypatch):
+    """Body-size and in-flight rejections are identical on both entry points."""
+    import service
+
+    asgi_client, flask_client = clients
+    monkeypatch.setattr(service, "MAX_REQUEST_BYTES", 1000)
+    asgi_response = asgi_client.post("/v1/predict", json=[VALID_PAYLOAD] * 10)
+    flask_response = flask_client.post("/v1/predict", json=[VALID_PAYLOAD] * 10)
+    assert asgi_response.status_code == flask_response.status_code == 413
+    assert asgi_response.content == flask_response.data
+
+    limiter = service.limiters["all"]
+    monkeypatch.setattr(limiter, "limit", 1)
+    assert limiter.try_acquire("v1")
+    try:
+        asgi_response = asgi_client.post("/v1/predict", json=VALID_PAYLOAD)
+        flask_response = flask_client.post("/v1/predict", json=VALID_PAYLOAD)
+    finally:
+        limiter.release("v1")
+    assert asgi_response.status_code == flask_response.status_code == 429
+    assert asgi_response.headers["Retry-After"] == flask_response.headers["Retry-After"] == "1"
+    assert asgi_response.content == flask_response.data
+
+
+@pytest.mark.parametrize("length", ["abc", "-5"])
+def test_asgi_invalid_content_length(clients, length):
+    asgi_client, _ = clients
+    response = asgi_client.post("/v1/predict", content=json.dumps(VALID_PAYLOAD),
+                                headers={"Content-Type": "application/json",
+                                         "Content-Length": length})
+    assert response.status_code == 400
+    assert response.json() == {"error": "Invalid Content-Length header"}
@@ -0,0 +1,54 @@
+"""
+test_benchmark.py — Tests for the load-test harness.
+"""
+
+import json
+import sys
+
+import pytest
+
+from benchmark import (
+    FlaskTarget, compare_to_baseline, main, make_bodies, run_load, summarize, synthetic_records,
+)
+
+
+def _result(p95, rows, errors=0):
+    return {"p95_ms": p95, "rows_per_s": rows, "errors": errors}
+
+
+def test_make_bodies_batches_records():
+    records = synthetic_records(5)
+    single, batch = make_bodies(records, 1, 2), make_bodies(records, 3, 2)
+    assert json.loads(single[1]) == records[1]
+    assert json.loads(batch[1]) == [records[3], records[4], records[0]]
+
+
+def test_compare_to_baseline_flags_regressions():
+    baseline = {"results": {"flask/v1/batch=1": _result(10.0, 1000.0)}}
+    assert compare_to_baseline({"flask/v1/batch=1": _result(11.0, 950.0)}, baseline, 0.2) == []
+    regressions = compare_to_baseline({"flask/v1/batch=1": _result(15.0, 700.0)}, baseline, 0.2)
+    assert len(regressions) == 2
+    assert compare_to_baseline({"flask/v2/batch=1": _result(99.0, 1.0)}, baseline, 0.2) == []
+
+
+def test_flask_target_load():
+    bodies = make_bodies(synthetic_records(10), 4)
+    latencies, errors, wall = run_load(FlaskTarget(), "/v1/predict", bodies, 2, 6)
+    summary = summarize(latencies, errors, wall, 4)
+    assert summary["requests"] == 6 and summary["errors"] == 0
+    assert summary["rows_per_s"] == 4 * summary["requests_per_s"]
+
+
+def test_missing_baseline_fails_before_running(monkeypatch, tmp_path, capsys):
+    missing = tmp_path / "baseline.json"
+    monkeypatch.setattr(sys, "argv", ["benchmark.py", "--baseline", str(missing)])
+    monkeypatch.setattr("benchmark.run_load", lambda *args, **kwargs: pytest.fail("load test ran"))
+    assert main() == 1
+    assert "make bench-baseline" in capsys.readouterr().err
+
+
+def test_upload_delay_rejected_for_flask_target(monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["benchmark.py", "--targets", "flask", "--upload-delay", "0.5"])
+    monkeypatch.setattr("benchmark.run_load", lambda *args, **kwargs: pytest.fail("load test ran"))
+    assert main() == 1
+    assert "--upload-delay" in capsys.readouterr().err
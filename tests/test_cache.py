@@ -0,0 +1,25 @@
+"""Tests for the prediction result cache."""
+
+import time
+
+from cache import PredictionCache, record_key
+
+
+def test_record_key_is_canonical():
+    """Integers and floats with the same value share a key."""
+    a = record_key({"tenure": 12, "Contract": "One year"}, ["tenure"], ["Contract"])
+    b = record_key({"Contract": "One year", "tenure": 12.0}, ["tenure"], ["Contract"])
+    assert a == b
+
+
+def test_lru_eviction_and_ttl():
+    """The least recently used entry is evicted first; entries expire after the TTL."""
+    cache = PredictionCache(max_entries=2, ttl=0.05)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1          # "a" is now most recently used
+    assert cache.put("c", 3) == 1       # evicts "b"
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    time.sleep(0.06)
+    assert cache.get("a") is None
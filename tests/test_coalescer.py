@@ -0,0 +1,79 @@
+"""Tests for the micro-batching request coalescer."""
+
+import threading
+
+import numpy as np
+import pytest
+
+from coalescer import CoalescerTimeout, MicroBatcher
+
+
+def test_concurrent_records_are_scored_together():
+    """Concurrent callers share score calls and each gets its own row back."""
+    batch_sizes = []
+
+    def score(records):
+        batch_sizes.append(len(records))
+        values = np.array([r["x"] for r in records])
+        return values % 2, np.column_stack([1 - values / 100, values / 100])
+
+    batcher = MicroBatcher("test", score, window=0.05, max_rows=8)
+    results = {}
+
+    def call(x):
+        results[x] = batcher.predict({"x": x})
+
+    threads = [threading.Thread(target=call, args=(x,)) for x in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sum(batch_sizes) == 16
+    assert len(batch_sizes) < 16
+    assert max(batch_sizes) <= 8
+    for x, (yhat, proba) in results.items():
+        assert yhat.tolist() == [x % 2]
+        assert proba[0, 1] == x / 100
+
+
+def test_scoring_errors_reach_every_caller():
+    """An exception while scoring is raised in the waiting request."""
+    def score(records):
+        raise RuntimeError("boom")
+
+    batcher = MicroBatcher("test-error", score, window=0.001)
+    with pytest.raises(RuntimeError, match="boom"):
+        batcher.predict({"x": 1})
+
+
+def test_stalled_batch_times_out():
+    """A caller gives up after window + timeout instead of waiting forever."""
+    release = threading.Event()
+
+    def score(records):
+        release.wait()
+        return np.zeros(len(records)), np.zeros((len(records), 2))
+
+    batcher = MicroBatcher("test-stall", score, window=0.001, timeout=0.05)
+    try:
+        with pytest.raises(CoalescerTimeout):
+            batcher.predict({"x": 1})
+    finally:
+        release.set()
+
+
+def test_dead_batching_thread_fails_pending_and_restarts(monkeypatch):
+    """If the batching loop itself fails, waiting callers get the error and the thread restarts."""
+    def score(records):
+        return np.zeros(len(records)), np.zeros((len(records), 2))
+
+    batcher = MicroBatcher("test-dead", score, window=0.001, timeout=5)
+    monkeypatch.setattr(batcher, "_score_batch", lambda batch: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        batcher.predict({"x": 1})
+    batcher._thread.join()
+
+    monkeypatch.undo()
+    yhat, proba = batcher.predict({"x": 1})
+    assert yhat.tolist() == [0]
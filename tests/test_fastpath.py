@@ -0,0 +1,73 @@
+"""Tests for the compiled NumPy fast path."""
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OrdinalEncoder, StandardScaler
+
+from fastpath import compile_pipeline
+from train import build_pipeline
+from tune import build_deployment_pipeline, NUM_COLS, CAT_COLS
+
+
+def _make_frame(n=80, seed=0):
+    """Synthetic cleaned data with two categories per categorical column."""
+    rng = np.random.RandomState(seed)
+    df = pd.DataFrame({
+        "tenure": rng.randint(1, 72, n),
+        "MonthlyCharges": rng.uniform(20, 100, n),
+        "TotalCharges": rng.uniform(100, 5000, n),
+    })
+    for col in CAT_COLS:
+        df[col] = rng.choice(["No", "Yes"], n)
+    y = rng.randint(0, 2, n)
+    return df, y
+
+
+def test_compiled_pipeline_matches_sklearn():
+    """Compiled probabilities are bit-identical to the sklearn pipeline."""
+    df, y = _make_frame()
+    pipeline = build_deployment_pipeline(
+        GradientBoostingClassifier(n_estimators=20, random_state=0), NUM_COLS, CAT_COLS
+    ).fit(df, y)
+
+    records = df.head(10).to_dict(orient="records")
+    records[0]["Contract"] = "Never seen"  # unknown category → unknown_value
+
+    compiled = compile_pipeline(pipeline)
+    yhat, proba = compiled.predict(records)
+
+    expected_df = pd.DataFrame(records)
+    assert np.array_equal(yhat, pipeline.predict(expected_df))
+    assert np.array_equal(proba, pipeline.predict_proba(expected_df))
+
+
+def test_compile_rejects_unsupported_pipeline():
+    """Pipelines that are not deployment pipelines fall back to sklearn."""
+    df, y = _make_frame()
+    X = df[NUM_COLS].assign(extra=y)
+    pipeline = build_pipeline(NUM_COLS, {"n_estimators": 5, "random_state": 0}).fit(X, y)
+    assert compile_pipeline(pipeline) is None
+
+
+def test_compiled_columns_with_unsorted_categories():
+    """Encoders fitted with explicit, unsorted categories keep their own codes."""
+    df = pd.DataFrame({"tenure": [1.0, 2.0, 3.0, 4.0], "Contract": ["z", "a", "m", "q"]})
+    y = np.array([0, 1, 0, 1])
+    pipeline = Pipeline([
+        ("preprocessor", ColumnTransformer([
+            ("num", StandardScaler(), ["tenure"]),
+            ("cat", OrdinalEncoder(categories=[["z", "a", "m"]],
+                                   handle_unknown="use_encoded_value", unknown_value=-1),
+             ["Contract"]),
+        ])),
+        ("classifier", GradientBoostingClassifier(n_estimators=5, random_state=0)),
+    ]).fit(df, y)
+
+    compiled = compile_pipeline(pipeline)
+    columns = {"tenure": df["tenure"].to_numpy(), "Contract": df["Contract"].to_numpy()}
+    expected = pipeline[0].transform(df)
+    assert np.array_equal(compiled.transform_columns(columns), expected)
+    assert np.array_equal(compiled.transform(df.to_dict(orient="records")), expected)
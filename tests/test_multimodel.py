@@ -0,0 +1,59 @@
+"""
+test_multimodel.py — Tests for scoring one request with several model versions.
+"""
+
+import pytest
+
+import multimodel
+from src.app import app as flask_app
+from tests.test_api import VALID_PAYLOAD
+
+
+@pytest.fixture
+def client():
+    flask_app.config["TESTING"] = True
+    with flask_app.test_client() as client:
+        yield client
+
+
+def test_parse_versions():
+    assert multimodel.parse_versions(" v1, v2,,v1 ") == ["v1", "v2"]
+    assert multimodel.parse_versions(None) == []
+
+
+@pytest.mark.parametrize("payload", [VALID_PAYLOAD, [VALID_PAYLOAD] * 3])
+def test_matches_single_model_endpoints(client, payload, monkeypatch):
+    """Each model's results equal its own /<version>/predict response."""
+    monkeypatch.setattr(multimodel, "MULTI_MODEL_PARALLEL_ROWS", 2)
+    response = client.post("/predict?models=v1,v2", json=payload)
+    assert response.status_code == 200
+    assert response.json["models"] == ["v1", "v2"]
+    for version in ("v1", "v2"):
+        single = client.post(f"/{version}/predict", json=payload).json
+        assert response.json["predictions"][version] == single
+
+
+def test_partial_errors_reported_once(client):
+    bad = VALID_PAYLOAD.copy()
+    bad["tenure"] = "twelve"
+    response = client.post("/predict?models=v1,v2&partial=true", json=[bad, VALID_PAYLOAD])
+    assert response.status_code == 200
+    assert [e["index"] for e in response.json["errors"]] == [0]
+    assert response.json["predictions"]["v2"][0]["index"] == 1
+
+
+def test_requires_known_models(client):
+    assert client.post("/predict", json=VALID_PAYLOAD).status_code == 400
+    assert client.post("/predict?models=v1,v9", json=VALID_PAYLOAD).status_code == 404
+
+
+def test_shadow_model_scored_in_background(client):
+    response = client.post("/predict?models=v1&shadow=v2", json=[VALID_PAYLOAD] * 4)
+    assert response.status_code == 200
+    assert list(response.json["predictions"]) == ["v1"]
+    assert response.json["shadow"] == ["v2"]
+    multimodel.drain_shadow()
+    metrics = client.get("/metrics").data.decode()
+    agreed = [line for line in metrics.splitlines()
+              if line.startswith("shadow_predictions_total{") and 'model_version="v2"' in line]
+    assert sum(float(line.split()[-1]) for line in agreed) >= 4
@@ -0,0 +1,92 @@
+"""Tests for model discovery and hot swapping."""
+
+import os
+import shutil
+import subprocess
+import sys
+
+from registry import ModelEntry, ModelRegistry, scan_model_dir
+
+
+def _touch(path, mtime):
+    with open(path, "w") as f:
+        f.write("x")
+    os.utime(path, (mtime, mtime))
+
+
+def _registry(model_dir, built):
+    def build_entry(version, path):
+        built.append(version)
+        return ModelEntry(version, path, model=object())
+    return ModelRegistry(str(model_dir), build_entry)
+
+
+def test_scan_prefers_mmap_and_ignores_other_files(tmp_path):
+    for name in ["model_v1.pkl", "model_v1.mmap", "model_v2.pkl", "model.pkl", "notes.txt"]:
+        _touch(tmp_path / name, 1000)
+    found = scan_model_dir(str(tmp_path))
+    assert sorted(found) == ["v1", "v2"]
+    assert found["v1"].endswith("model_v1.mmap")
+
+
+def test_stale_mmap_is_replaced_by_newer_pkl(tmp_path):
+    """Retraining rewrites model_v1.pkl; the old artifact must stop being served."""
+    _touch(tmp_path / "model_v1.pkl", 1000)
+    _touch(tmp_path / "model_v1.mmap", 1500)
+    built = []
+    registry = _registry(tmp_path, built)
+    registry.reload()
+    assert registry.get("v1").path.endswith("model_v1.mmap")
+
+    _touch(tmp_path / "model_v1.pkl", 2000)
+    assert registry.reload()["loaded"] == ["v1"]
+    assert registry.get("v1").path.endswith("model_v1.pkl")
+
+
+def test_reload_swaps_changed_and_unloads_removed(tmp_path):
+    """Only new or modified files are rebuilt; deleted files are unloaded."""
+    _touch(tmp_path / "model_v1.pkl", 1000)
+    _touch(tmp_path / "model_v2.pkl", 1000)
+    built = []
+    registry = _registry(tmp_path, built)
+
+    assert registry.reload()["loaded"] == ["v1", "v2"]
+    old_v1 = registry.get("v1")
+
+    _touch(tmp_path / "model_v1.pkl", 2000)
+    os.remove(tmp_path / "model_v2.pkl")
+    summary = registry.reload()
+
+    assert summary["loaded"] == ["v1"]
+    assert summary["unloaded"] == ["v2"]
+    assert registry.get("v1") is not old_v1
+    assert registry.versions() == ["v1"]
+    assert built == ["v1", "v2", "v1"]
+
+
+def test_reload_builds_concurrently(tmp_path):
+    """With max_workers > 1 every file is built, and swapped in version order."""
+    for v in range(1, 5):
+        _touch(tmp_path / f"model_v{v}.pkl", 1000)
+    built = []
+    registry = _registry(tmp_path, built)
+
+    summary = registry.reload(max_workers=4)
+    assert summary["loaded"] == ["v1", "v2", "v3", "v4"]
+    assert sorted(built) == ["v1", "v2", "v3", "v4"]
+    assert registry.versions() == ["v1", "v2", "v3", "v4"]
+
+
+def test_concurrent_loads_in_fresh_interpreter(tmp_path):
+    """sklearn is imported lazily; loading several pickles at once must not deadlock on it."""
+    fixtures = os.environ["MODEL_DIR"]
+    for v in range(1, 5):
+        shutil.copy(os.path.join(fixtures, f"model_v{2 - v % 2}.pkl"), tmp_path / f"model_v{v}.pkl")
+    env = dict(os.environ, MODEL_DIR=str(tmp_path), MODEL_LOAD_THREADS="4",
+               LOG_DIR=str(tmp_path / "logs"))
+    probe = "import service; print(service.registry.versions(), service.readiness()[1])"
+    proc = subprocess.run([sys.executable, "-c", probe], env=env, capture_output=True,
+                          text=True, cwd=os.path.join(os.path.dirname(__file__), "..", "src"),
+                          timeout=120)
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.strip().splitlines()[-1] == "['v1', 'v2', 'v3', 'v4'] 200"
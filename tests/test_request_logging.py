@@ -0,0 +1,57 @@
+"""
+test_request_logging.py — Tests for queue-backed, sampled API logging.
+"""
+
+import logging
+import queue
+
+from utils.request_logging import (
+    SAMPLED, NonBlockingQueueHandler, SamplingFilter, configure_logging,
+)
+
+
+def _record(level, msg, sampled=False, args=None):
+    record = logging.LogRecord("churn_api", level, __file__, 1, msg, args, None)
+    if sampled:
+        record.sampled = True
+    return record
+
+
+def test_sampling_keeps_warnings_and_unsampled_messages():
+    f = SamplingFilter(sample_rate=0.0)
+    assert not f.filter(_record(logging.INFO, "ok", sampled=True))
+    assert f.filter(_record(logging.INFO, "model loaded"))
+    assert f.filter(_record(logging.WARNING, "bad input", sampled=True))
+
+
+def test_long_messages_are_truncated():
+    record = _record(logging.WARNING, "Validation failed: %s", args=("x" * 500,))
+    assert SamplingFilter(max_chars=100).filter(record)
+    assert record.getMessage().startswith("Validation failed: xxx")
+    assert record.getMessage().endswith("[419 more chars]")
+
+
+def test_full_queue_drops_info_only():
+    handler = NonBlockingQueueHandler(queue.Queue(1))
+    handler.handle(_record(logging.INFO, "first"))
+    handler.handle(_record(logging.INFO, "second"))
+    assert handler.dropped == 1
+    handler.queue.get_nowait()
+    handler.handle(_record(logging.ERROR, "kept"))
+    assert handler.queue.get_nowait().getMessage() == "kept"
+
+
+def test_queue_logging_writes_file(tmp_path):
+    logger = logging.getLogger("test_request_logging")
+    logger.propagate = False
+    handler = configure_logging(str(tmp_path), sample_rate=0.0, logger=logger)
+    try:
+        logger.info("sampled out", extra=SAMPLED)
+        logger.warning("always kept", extra=SAMPLED)
+        logger.info("startup message")
+        handler.queue.join()
+    finally:
+        logger.removeHandler(handler)
+    text = (tmp_path / "api.log").read_text()
+    assert "always kept" in text and "startup message" in text
+    assert "sampled out" not in text
@@ -0,0 +1,40 @@
+"""
+test_serialization.py — Tests for the response JSON encoders.
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from serialization import get_encoder, stdlib_dumps
+
+BODY = {
+    "model_version": "v1",
+    "prediction": ["Yes", "No"],
+    "probability": np.array([0.8125, 0.25]),
+    "count": np.int64(2),
+}
+
+
+def test_stdlib_matches_jsonify_layout():
+    """Sorted keys, compact separators and a trailing newline, NumPy converted."""
+    out = stdlib_dumps(BODY)
+    assert out.endswith(b"\n")
+    assert out == (json.dumps({**BODY, "probability": [0.8125, 0.25], "count": 2},
+                              sort_keys=True, separators=(",", ":")) + "\n").encode()
+
+
+def test_orjson_matches_stdlib():
+    """Both encoders produce the same bytes for a typical response."""
+    pytest.importorskip("orjson")
+    name, dumps = get_encoder("orjson")
+    assert name == "orjson"
+    assert dumps(BODY) == stdlib_dumps(BODY)
+    rows = [{"prediction": "No", "probability": 0.123456789, "model_version": "v2"}]
+    assert dumps(rows) == stdlib_dumps(rows)
+
+
+def test_unknown_encoder():
+    with pytest.raises(ValueError):
+        get_encoder("ujson")
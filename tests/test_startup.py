@@ -0,0 +1,21 @@
+"""
+test_startup.py — Tests for the cold-start report.
+"""
+
+from startup import parse_importtime
+
+IMPORTTIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:       300 |        300 |     pandas._libs
+import time:       500 |       1500 |   pandas
+import time:       200 |        200 |       pandas.core.frame
+import time:      1000 |       3000 | app
+"""
+
+
+def test_parse_importtime_groups_by_package():
+    packages = parse_importtime(IMPORTTIME_OUTPUT)
+    assert packages["pandas"] == 0.0015
+    assert packages["app"] == 0.003
+    assert "import" not in packages
@@ -0,0 +1,38 @@
+"""Tests for background MLflow run logging."""
+
+import mlflow
+import pytest
+from mlflow.tracking import MlflowClient
+from sklearn.tree import DecisionTreeClassifier
+
+from tracking import RunLogger
+
+
+@pytest.fixture
+def experiment_id(tmp_path, monkeypatch):
+    monkeypatch.setenv("MLFLOW_ALLOW_FILE_STORE", "true")
+    previous = mlflow.get_tracking_uri()
+    mlflow.set_tracking_uri((tmp_path / "mlruns").as_uri())
+    try:
+        yield MlflowClient().create_experiment("test-tuning")
+    finally:
+        mlflow.set_tracking_uri(previous)
+
+
+def test_runs_logged_in_background_with_selected_models(experiment_id):
+    with RunLogger(experiment_id) as tracker:
+        best = tracker.log_run("best", {"model_family": "Dummy", "max_depth": None},
+                               {"f1_score": 0.8, "accuracy": 0.9})
+        other = tracker.log_run("other", {"model_family": "Dummy"}, {"f1_score": 0.5})
+        tracker.log_model(best, DecisionTreeClassifier().fit([[0], [1]], [0, 1]))
+    assert tracker.errors == []
+
+    client = MlflowClient()
+    runs = {run.info.run_name: run for run in client.search_runs([experiment_id])}
+    assert runs["best"].data.params == {"model_family": "Dummy", "max_depth": "None"}
+    assert runs["best"].data.metrics == {"f1_score": 0.8, "accuracy": 0.9}
+    assert runs["other"].info.status == "FINISHED"
+    assert other.run_id == runs["other"].info.run_id
+    assert mlflow.sklearn.load_model(f"runs:/{best.run_id}/model").predict([[0]]).shape == (1,)
+    with pytest.raises(Exception):
+        mlflow.sklearn.load_model(f"runs:/{other.run_id}/model")
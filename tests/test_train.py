@@ -2,6 +2,7 @@
 
 import numpy as np
 import pandas as pd
+import pytest
 
 
 from train import build_pipeline
@@ -27,3 +28,27 @@ def test_pipeline_fit_predict():
 
     assert len(yhat) == n
     assert set(yhat).issubset({0, 1})
+
+
+def test_hist_gradient_boosting_pipeline_uses_native_categories():
+    rng = np.random.RandomState(0)
+    n = 100
+    X = pd.DataFrame({
+        "tenure": rng.randint(1, 72, n).astype(float),
+        "MonthlyCharges": rng.uniform(20, 100, n),
+        "TotalCharges": rng.uniform(100, 5000, n),
+        "Contract": rng.randint(0, 3, n),
+        "gender": rng.randint(0, 2, n),
+    })
+    y = rng.randint(0, 2, n)
+
+    pipeline = build_pipeline(["tenure", "MonthlyCharges", "TotalCharges"], {"random_state": 0},
+                              "HistGradientBoostingClassifier", ["Contract", "gender"])
+    pipeline.fit(X, y)
+    assert list(pipeline[-1].is_categorical_) == [False, False, False, True, True]
+    assert set(pipeline.predict(X)).issubset({0, 1})
+
+
+def test_unknown_model_name():
+    with pytest.raises(ValueError, match="Unknown model.name"):
+        build_pipeline(["tenure"], {}, "XGBClassifier")
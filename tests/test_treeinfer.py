@@ -0,0 +1,80 @@
+"""Tests for the flattened NumPy tree-ensemble engine."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+import service
+from tests.test_api import VALID_PAYLOAD
+from tests.test_fastpath import _make_frame
+from treeinfer import _round_down_float32, compile_ensemble, compile_model
+from tune import build_deployment_pipeline, NUM_COLS, CAT_COLS
+
+
+@pytest.mark.parametrize("classifier", [
+    GradientBoostingClassifier(n_estimators=30, max_depth=3, random_state=0),
+    RandomForestClassifier(n_estimators=20, random_state=0),
+])
+def test_flat_engine_matches_sklearn(classifier):
+    """Predictions and probabilities are bit-identical to the sklearn pipeline."""
+    df, y = _make_frame(n=200)
+    pipeline = build_deployment_pipeline(classifier, NUM_COLS, CAT_COLS).fit(df, y)
+
+    flat = compile_model(pipeline)
+    yhat, proba = flat.predict_frame(df)
+
+    assert np.array_equal(yhat, pipeline.predict(df))
+    assert np.array_equal(proba, pipeline.predict_proba(df))
+
+
+def test_flat_engine_chunks_large_batches(monkeypatch):
+    df, y = _make_frame(n=100)
+    pipeline = build_deployment_pipeline(
+        RandomForestClassifier(n_estimators=5, random_state=0), NUM_COLS, CAT_COLS).fit(df, y)
+    monkeypatch.setattr("treeinfer.CHUNK_ROWS", 16)
+    assert np.array_equal(compile_model(pipeline).predict_proba(df), pipeline.predict_proba(df))
+
+
+def test_float32_thresholds_keep_every_split():
+    """For float32 inputs, x <= threshold holds exactly when x <= the rounded threshold."""
+    rng = np.random.RandomState(0)
+    thresholds = rng.uniform(-100, 100, 1000)
+    rounded = _round_down_float32(thresholds)
+    x = np.concatenate([rounded, np.nextafter(rounded, np.float32(np.inf)),
+                        thresholds.astype(np.float32)])
+    for t, t32 in zip(thresholds[:50], rounded[:50]):
+        assert np.array_equal(x <= t, x <= t32)
+
+
+def test_compile_rejects_unsupported_classifiers():
+    df, _ = _make_frame()
+    X = df[NUM_COLS]
+    y = np.arange(len(X)) % 3
+    assert compile_ensemble(LogisticRegression(max_iter=1000).fit(X, y)) is None
+    # Multi-class boosting has one tree per class and a softmax link
+    assert compile_ensemble(GradientBoostingClassifier(n_estimators=3).fit(X, y)) is None
+
+
+def test_flat_ensemble_cannot_be_fitted():
+    """A compiled ensemble is inference-only; refitting it is a TypeError."""
+    df, y = _make_frame(n=100)
+    flat = compile_ensemble(RandomForestClassifier(n_estimators=5, random_state=0).fit(df[NUM_COLS], y))
+    with pytest.raises(TypeError, match="compile_ensemble"):
+        flat.fit(df[NUM_COLS], y)
+
+
+def test_service_uses_flat_engine(monkeypatch):
+    """With INFERENCE_ENGINE=flat a loaded model scores through the engine."""
+    monkeypatch.setattr(service, "INFERENCE_ENGINE", "flat")
+    path = service.registry.get("v1").path
+    entry = service.build_entry("v1", path)
+    assert entry.engine is not None
+    assert entry.describe()["engine"] == "flat"
+
+    records = [VALID_PAYLOAD] * 20
+    yhat, proba = service.score_records(entry, records)
+    frame = pd.DataFrame(records)[service.REQUIRED_FEATURES]
+    assert np.array_equal(proba, entry.model.predict_proba(frame))
+    assert list(yhat) == list(entry.model.predict(frame))
@@ -0,0 +1,179 @@
+"""Tests for the parallel hyperparameter search."""
+
+import numpy as np
+from sklearn.model_selection import cross_val_score, StratifiedKFold
+import pytest
+from sklearn.ensemble import (
+    GradientBoostingClassifier, HistGradientBoostingClassifier, RandomForestClassifier,
+)
+
+from tests.test_fastpath import _make_frame
+from tune import (
+    build_deployment_pipeline, CANDIDATES, CAT_COLS, CATEGORICAL_MASK, cv_search, fit_groups,
+    grid_points, halving_search, NUM_COLS, preprocess_split, search,
+)
+
+SMALL_CANDIDATES = {
+    "GradientBoosting": {
+        "class": GradientBoostingClassifier,
+        "warm_start": "n_estimators",
+        "grid": {"n_estimators": [10, 20], "max_depth": [2]},
+    },
+    "RandomForest": {
+        "class": RandomForestClassifier,
+        "warm_start": "n_estimators",
+        "grid": {"n_estimators": [5, 10], "max_depth": [4, None]},
+    },
+}
+
+
+def _split():
+    df, y = _make_frame(n=200)
+    return df[:150], df[150:], y[:150], y[150:]
+
+
+def test_grid_points_in_grid_order():
+    points = grid_points(SMALL_CANDIDATES)
+    assert len(points) == 6
+    assert points[0] == ("GradientBoosting", {"n_estimators": 10, "max_depth": 2})
+    assert points[-1] == ("RandomForest", {"n_estimators": 10, "max_depth": None})
+
+
+def test_parallel_search_matches_sequential():
+    """Worker processes produce the same results, in the same order."""
+    data = _split()
+    seen = []
+    sequential = search(data, 0, n_jobs=1, candidates=SMALL_CANDIDATES)
+    parallel = search(data, 0, n_jobs=2, candidates=SMALL_CANDIDATES,
+                      on_result=lambda r: seen.append(r["params"]))
+    assert seen == [r["params"] for r in sequential]
+    for a, b in zip(sequential, parallel):
+        assert (a["model_name"], a["params"], a["f1_score"]) == (b["model_name"], b["params"], b["f1_score"])
+        assert np.array_equal(a["pipeline"].predict_proba(data[1]),
+                              b["pipeline"].predict_proba(data[1]))
+
+
+def test_preprocessor_fitted_once_per_split():
+    data = _split()
+    cache = {}
+    first = preprocess_split(data, cache)
+    assert preprocess_split(tuple(part.copy() for part in data), cache)[0] is first[0]
+    assert preprocess_split((data[0][:100], data[1], data[2][:100], data[3]), cache)[0] is not first[0]
+    assert len(cache) == 2
+    # Without a cache nothing is kept between calls
+    assert preprocess_split(data)[0] is not first[0]
+
+
+def test_search_pipelines_match_full_fit():
+    """Fitting only the classifier on cached matrices gives the same pipeline."""
+    data = _split()
+    result = search(data, 0, candidates={"RandomForest": SMALL_CANDIDATES["RandomForest"]})[0]
+    full = build_deployment_pipeline(RandomForestClassifier(n_estimators=5, max_depth=4, random_state=0),
+                                     NUM_COLS, CAT_COLS).fit(data[0], data[2])
+    assert np.array_equal(result["pipeline"].predict_proba(data[1]), full.predict_proba(data[1]))
+
+
+def test_fit_groups_share_nested_n_estimators():
+    groups = fit_groups(SMALL_CANDIDATES)
+    assert [(name, [i for i, _ in members]) for name, members in groups] == [
+        ("GradientBoosting", [0, 1]), ("RandomForest", [2, 4]), ("RandomForest", [3, 5])]
+
+
+@pytest.mark.parametrize("model_name, classifier", [
+    ("GradientBoosting", GradientBoostingClassifier(n_estimators=10, max_depth=2, random_state=0)),
+    ("GradientBoosting", GradientBoostingClassifier(n_estimators=20, max_depth=2, random_state=0)),
+    ("RandomForest", RandomForestClassifier(n_estimators=5, max_depth=None, random_state=0)),
+    ("RandomForest", RandomForestClassifier(n_estimators=10, max_depth=4, random_state=0)),
+])
+def test_warm_started_sizes_match_separate_fits(model_name, classifier):
+    """A size grown from a smaller ensemble is the model a separate fit gives."""
+    data = _split()
+    results = search(data, 0, candidates={model_name: SMALL_CANDIDATES[model_name]})
+    result = next(r for r in results if r["params"] == {k: v for k, v in classifier.get_params().items()
+                                                       if k in r["params"]})
+    full = build_deployment_pipeline(classifier, NUM_COLS, CAT_COLS).fit(data[0], data[2])
+    assert np.array_equal(result["pipeline"].predict_proba(data[1]), full.predict_proba(data[1]))
+    assert result["pipeline"][-1].get_params() == full[-1].get_params()
+    assert len(result["pipeline"][-1].estimators_) == len(full[-1].estimators_)
+
+
+def test_halving_promotes_best_to_full_split():
+    data = _split()
+    seen = []
+    final = halving_search(data, 0, candidates=SMALL_CANDIDATES, factor=2, min_rows=40,
+                           on_result=lambda r: seen.append((r["round"], r["n_rows"])))
+    assert seen == [(0, 40)] * 6 + [(1, 80)] * 3 + [(2, 150)] * 2
+    assert len(final) == 2 and all(r["n_rows"] == 150 for r in final)
+
+    # The last round is an ordinary fit on the full split
+    exhaustive = {(r["model_name"], repr(r["params"])): r["f1_score"]
+                  for r in search(data, 0, candidates=SMALL_CANDIDATES)}
+    for r in final:
+        assert r["f1_score"] == exhaustive[(r["model_name"], repr(r["params"]))]
+
+
+def test_halving_time_budget_skips_to_full_split():
+    seen = []
+    final = halving_search(_split(), 0, candidates=SMALL_CANDIDATES, factor=2, min_rows=40,
+                           time_budget=0, on_result=lambda r: seen.append(r["round"]))
+    assert seen == [0] * 6 + [1] * 2
+    assert len(final) == 2
+
+
+def test_cv_search_matches_cross_val_score():
+    """Mean F1 per point is what sklearn's cross-validation of the full pipeline gives."""
+    data = _split()
+    candidates = {"RandomForest": SMALL_CANDIDATES["RandomForest"]}
+    results = cv_search(data, 0, n_folds=3, candidates=candidates, refit=1)
+    expected = cross_val_score(
+        build_deployment_pipeline(RandomForestClassifier(n_estimators=5, max_depth=4, random_state=0),
+                                  NUM_COLS, CAT_COLS),
+        data[0], data[2], scoring="f1", cv=StratifiedKFold(3, shuffle=True, random_state=0))
+    assert results[0]["params"] == {"n_estimators": 5, "max_depth": 4}
+    assert np.isclose(results[0]["f1_score"], expected.mean())
+    assert np.isclose(results[0]["f1_std"], expected.std())
+
+    best = max(results, key=lambda r: r["f1_score"])
+    assert "pipeline" in best and "holdout_f1_score" in best
+    assert sum("pipeline" in r for r in results) == 1
+
+
+def test_parallel_cv_search_with_shared_folds_matches_sequential():
+    data = _split()
+    sequential = cv_search(data, 0, n_folds=3, candidates=SMALL_CANDIDATES)
+    parallel = cv_search(data, 0, n_folds=3, n_jobs=2, candidates=SMALL_CANDIDATES)
+    assert [(r["f1_score"], r["f1_std"]) for r in sequential] == \
+        [(r["f1_score"], r["f1_std"]) for r in parallel]
+    assert [i for i, r in enumerate(parallel) if "pipeline" in r] == \
+        [i for i, r in enumerate(sequential) if "pipeline" in r]
+
+
+def test_hist_gradient_boosting_family():
+    """Category codes are native categorical features, and warm starts match separate fits."""
+    data = _split()
+    spec = dict(CANDIDATES["HistGradientBoosting"], grid={"max_iter": [5, 10], "max_leaf_nodes": [7]})
+    results = search(data, 0, candidates={"HistGradientBoosting": spec})
+    assert len(fit_groups({"HistGradientBoosting": spec})) == 1
+
+    classifier = HistGradientBoostingClassifier(max_iter=10, max_leaf_nodes=7, early_stopping=False,
+                                                categorical_features=CATEGORICAL_MASK, random_state=0)
+    full = build_deployment_pipeline(classifier, NUM_COLS, CAT_COLS).fit(data[0], data[2])
+    model = results[1]["pipeline"][-1]
+    assert model.is_categorical_.sum() == len(CAT_COLS)
+    assert np.array_equal(results[1]["pipeline"].predict_proba(data[1]), full.predict_proba(data[1]))
+
+    unknown = data[1].copy()
+    unknown["Contract"] = "Ten year"
+    assert results[0]["pipeline"].predict_proba(unknown).shape == (len(unknown), 2)
+
+
+def test_halving_sample_just_below_full_split_is_last_round():
+    """A sample that would leave fewer held-out rows than classes uses the full split."""
+    df, y = _make_frame(n=150)
+    y = np.where(np.arange(150) % 10 == 0, 1, 0)
+    data = (df[:100], df[100:], y[:100], y[100:])
+    seen = []
+    final = halving_search(data, 0, candidates=SMALL_CANDIDATES, min_rows=99,
+                           on_result=lambda r: seen.append(r["n_rows"]))
+    assert seen == [100] * 6
+    assert len(final) == 6
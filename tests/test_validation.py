@@ -0,0 +1,41 @@
+"""Tests for the column-wise schema validator."""
+
+import numpy as np
+
+from validation import SchemaValidator
+
+NUM = ["tenure", "MonthlyCharges"]
+CAT = ["Contract"]
+
+GOOD = {"tenure": 12, "MonthlyCharges": 59.95, "Contract": "One year"}
+
+
+def test_validate_records_reports_each_row():
+    """Every invalid row gets its own message; valid rows get None."""
+    validator = SchemaValidator(NUM, CAT, {"Contract": {"One year", "Two year"}})
+    records = [
+        GOOD,
+        {"tenure": 12, "Contract": "One year"},
+        {**GOOD, "tenure": "twelve"},
+        {**GOOD, "Contract": 3},
+        {**GOOD, "Contract": "Ten year"},
+    ]
+    errors = validator.validate_records(records)
+    assert errors[0] is None
+    assert errors[1] == "Missing required features: MonthlyCharges"
+    assert errors[2] == "Invalid type for tenure: expected a number, got str"
+    assert errors[3] == "Invalid type for Contract: expected a string, got int"
+    assert errors[4].startswith("Invalid value for Contract")
+
+
+def test_validate_columns_checks_vocabulary():
+    """Unknown categories in columnar input are flagged per row."""
+    validator = SchemaValidator(NUM, CAT, {"Contract": {"One year", "Two year"}})
+    columns = {
+        "tenure": np.array([1, 2, 3]),
+        "MonthlyCharges": np.array([1.0, 2.0, 3.0]),
+        "Contract": np.array(["One year", "Ten year", "Two year"]),
+    }
+    errors = validator.validate_columns(columns)
+    assert errors[0] is None and errors[2] is None
+    assert "Ten year" in errors[1]